@@ -3,70 +3,32 @@ Realt Assistant V2 — Main App
 Telegram Bot для риэлторов
 """
 
-import os
-import json
-import asyncio
-from aiohttp import web, ClientSession
-from dotenv import load_dotenv
-
-load_dotenv()
-
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
-TELEGRAM_API = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
-WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "realt-v2-secret")
-
-# Handlers
-from handlers.start import handle_start, handle_back_to_list
-from handlers.properties import handle_add_property, handle_search_property, handle_import_facility
-from handlers.property_menu import handle_property_menu, handle_about_property
-from handlers.search import (
-    handle_search_menu, handle_search_by_building, handle_select_building, handle_select_floor,
-    handle_search_area_start, handle_search_area,
-    handle_search_budget_start, handle_search_budget,
-    handle_search_code_start, handle_search_code
-)
-from handlers.lot_menu import handle_lot_menu, handle_lot_from_miniapp
-from handlers.calc_roi import handle_roi
-from handlers.calc_compare import handle_compare, handle_compare_years
-from db.database import get_user_state
-from config.settings import States
-
-
-# === Telegram API ===
-
-async def send_message(chat_id: int, text: str, parse_mode: str = None, reply_markup: dict = None):
-    """Отправить сообщение"""
-    async with ClientSession() as session:
-        payload = {"chat_id": chat_id, "text": text}
-        if parse_mode:
-            payload["parse_mode"] = parse_mode
-        if reply_markup:
-            payload["reply_markup"] = json.dumps(reply_markup)
-        
-        async with session.post(f"{TELEGRAM_API}/sendMessage", json=payload) as resp:
-            return await resp.json()
-
-
-async def edit_message(chat_id: int, message_id: int, text: str, parse_mode: str = None, reply_markup: dict = None):
-    """Редактировать сообщение"""
-    async with ClientSession() as session:
-        payload = {"chat_id": chat_id, "message_id": message_id, "text": text}
-        if parse_mode:
-            payload["parse_mode"] = parse_mode
-        if reply_markup:
-            payload["reply_markup"] = json.dumps(reply_markup)
-        
-        async with session.post(f"{TELEGRAM_API}/editMessageText", json=payload) as resp:
-            return await resp.json()
+import time
+from aiohttp import web
 
-
-async def answer_callback(callback_id: str, text: str = None):
-    """Ответить на callback"""
-    async with ClientSession() as session:
-        payload = {"callback_query_id": callback_id}
-        if text:
-            payload["text"] = text
-        await session.post(f"{TELEGRAM_API}/answerCallbackQuery", json=payload)
+# Handlers (импорт регистрирует маршруты в router)
+import handlers.properties
+import handlers.property_menu
+import handlers.search
+import handlers.calc_roi
+import handlers.calc_compare
+from handlers.start import handle_start
+from handlers.lot_menu import handle_lot_from_miniapp
+from handlers.router import router
+from db import aio
+from db.aio import get_user_state
+from db.database import close_connection
+from db.migrations import migrate
+from config.settings import (
+    WEBHOOK_SECRET, WEBHOOK_INLINE_ANSWER,
+    UPDATE_WORKERS, UPDATE_QUEUE_SIZE, UPDATE_DRAIN_TIMEOUT,
+    SCHEDULER_ENABLED, SCHEDULER_CONCURRENCY, SCHEDULER_JITTER,
+    YGROUP_CATALOG_TTL, LOT_SYNC_INTERVAL, CLEANUP_INTERVAL, CATALOG_ORPHAN_TTL
+)
+from services import telegram, ygroup, lot_sync
+from services.telegram import send_message, edit_message, answer_callback
+from services.updates import UpdateWorkerPool
+from services.scheduler import Scheduler
 
 
 # === Message Router ===
@@ -98,121 +60,114 @@ async def handle_message(message: dict):
         return
     
     # Обработка по состоянию
-    state = get_user_state(user_id)
-    current_state = state.get("state")
-    
-    if current_state == States.ADD_PROPERTY_SEARCH:
-        await handle_search_property(send_message, user_id, text)
-    
-    elif current_state == States.SEARCH_BY_AREA:
-        await handle_search_area(send_message, user_id, text)
-    
-    elif current_state == States.SEARCH_BY_BUDGET:
-        await handle_search_budget(send_message, user_id, text)
-    
-    elif current_state == States.SEARCH_BY_CODE:
-        await handle_search_code(send_message, user_id, text)
+    state = await get_user_state(user_id)
+    context = {"send_message": send_message, "edit_message": edit_message, "user_id": user_id}
     
-    else:
+    if not await router.dispatch_state(state.get("state"), text, context):
         # Неизвестное сообщение — показываем /start
         await handle_start(send_message, user_id, username, first_name)
 
 
 # === Callback Router ===
 
-async def handle_callback(callback: dict):
+async def handle_callback(callback: dict, answered: bool = False, received_at: float = None):
     """Обработка callback кнопок"""
     callback_id = callback["id"]
     user_id = callback["from"]["id"]
     message_id = callback["message"]["message_id"]
     data = callback.get("data", "")
     
-    await answer_callback(callback_id)
-    
-    # Роутинг по callback_data
-    
-    # Список ЖК
-    if data == "back_to_list":
-        await handle_back_to_list(send_message, edit_message, user_id, message_id)
-    
-    # Добавление ЖК
-    elif data == "add_property":
-        await handle_add_property(send_message, edit_message, user_id, message_id)
-    
-    elif data.startswith("import_facility:"):
-        facility_id = data.split(":")[1]
-        await handle_import_facility(send_message, edit_message, user_id, facility_id, message_id)
-    
-    # Меню ЖК
-    elif data.startswith("property:"):
-        property_id = int(data.split(":")[1])
-        await handle_property_menu(edit_message, user_id, property_id, message_id)
-    
-    elif data.startswith("about:"):
-        property_id = int(data.split(":")[1])
-        await handle_about_property(edit_message, user_id, property_id, message_id)
-    
-    # Поиск
-    elif data.startswith("search:"):
-        property_id = int(data.split(":")[1])
-        await handle_search_menu(edit_message, user_id, property_id, message_id)
-    
-    elif data.startswith("search_building:"):
-        property_id = int(data.split(":")[1])
-        await handle_search_by_building(edit_message, user_id, property_id, message_id)
+    # answered — уже ответили прямо в HTTP-ответе webhook
+    if not answered:
+        await answer_callback(callback_id)
+        if received_at is not None:
+            record_answer_latency("outbound", time.perf_counter() - received_at)
     
-    elif data.startswith("building:"):
-        parts = data.split(":")
-        property_id, building = int(parts[1]), int(parts[2])
-        await handle_select_building(edit_message, user_id, property_id, building, message_id)
-    
-    elif data.startswith("floor:"):
-        parts = data.split(":")
-        property_id, building, floor = int(parts[1]), int(parts[2]), int(parts[3])
-        await handle_select_floor(edit_message, user_id, property_id, building, floor, message_id)
-    
-    elif data.startswith("search_area:"):
-        property_id = int(data.split(":")[1])
-        await handle_search_area_start(edit_message, send_message, user_id, property_id, message_id)
-    
-    elif data.startswith("search_budget:"):
-        property_id = int(data.split(":")[1])
-        await handle_search_budget_start(edit_message, user_id, property_id, message_id)
-    
-    elif data.startswith("search_code:"):
-        property_id = int(data.split(":")[1])
-        await handle_search_code_start(edit_message, user_id, property_id, message_id)
-    
-    # Лот
-    elif data.startswith("lot:"):
-        parts = data.split(":")
-        property_id, code = int(parts[1]), parts[2]
-        await handle_lot_menu(edit_message, user_id, property_id, code, message_id)
-    
-    # TODO: KP, ROI, Compare, AI
-    elif data.startswith("kp:"):
-        await edit_message(user_id, message_id, "🚧 КП — в разработке", "HTML")
-    
-    elif data.startswith("roi:"):
-        parts = data.split(":")
-        property_id, code = int(parts[1]), parts[2]
-        await handle_roi(edit_message, user_id, property_id, code, message_id)
-    
-    elif data.startswith("compare_years:"):
-        parts = data.split(":")
-        property_id, code, years = int(parts[1]), parts[2], int(parts[3])
-        await handle_compare_years(edit_message, user_id, property_id, code, years, message_id)
-    
-    elif data.startswith("compare:"):
-        parts = data.split(":")
-        property_id, code = int(parts[1]), parts[2]
-        await handle_compare(edit_message, user_id, property_id, code, message_id)
-    
-    elif data.startswith("ai:"):
-        await edit_message(user_id, message_id, "🚧 AI — в разработке", "HTML")
-    
-    elif data == "settings":
-        await edit_message(user_id, message_id, "🚧 Настройки — в разработке", "HTML")
+    context = {
+        "send_message": send_message,
+        "edit_message": edit_message,
+        "user_id": user_id,
+        "message_id": message_id,
+    }
+    await router.dispatch_callback(data, context)
+
+
+# TODO: KP, AI, настройки
+
+@router.callback("kp", int, str)
+async def handle_kp(edit_message, user_id: int, property_id: int, code: str, message_id: int):
+    await edit_message(user_id, message_id, "🚧 КП — в разработке", "HTML")
+
+
+@router.callback("ai", int, str)
+async def handle_ai(edit_message, user_id: int, property_id: int, code: str, message_id: int):
+    await edit_message(user_id, message_id, "🚧 AI — в разработке", "HTML")
+
+
+@router.callback("settings")
+async def handle_settings(edit_message, user_id: int, message_id: int):
+    await edit_message(user_id, message_id, "🚧 Настройки — в разработке", "HTML")
+
+
+# === Update Processing ===
+
+# Задержка ответа на callback: inline (в ответе webhook) и outbound (отдельный запрос)
+answer_stats = {
+    "inline": {"count": 0, "total_time": 0.0},
+    "outbound": {"count": 0, "total_time": 0.0},
+}
+
+
+def record_answer_latency(mode: str, elapsed: float):
+    answer_stats[mode]["count"] += 1
+    answer_stats[mode]["total_time"] += elapsed
+
+
+def get_answer_stats() -> dict:
+    return {
+        mode: {
+            "count": s["count"],
+            "avg_ms": round(s["total_time"] / s["count"] * 1000, 2) if s["count"] else 0,
+        }
+        for mode, s in answer_stats.items()
+    }
+
+
+async def process_update(update: dict, answered: bool = False, received_at: float = None):
+    """Обработка одного апдейта (вызывается воркером)"""
+    with aio.count_calls():
+        if "message" in update:
+            await handle_message(update["message"])
+        elif "callback_query" in update:
+            await handle_callback(update["callback_query"], answered, received_at)
+
+
+def get_update_key(update: dict):
+    """Ключ сериализации — апдейты одного пользователя обрабатываются по порядку"""
+    for field in ("message", "callback_query"):
+        if field in update:
+            return update[field].get("from", {}).get("id")
+    return update.get("update_id")
+
+
+# === Background Jobs ===
+
+async def refresh_catalog_job() -> dict:
+    catalog = await ygroup.refresh_catalog()
+    return {"facilities": len(catalog)}
+
+
+async def cleanup_job() -> dict:
+    """ЖК, которые больше не нужны ни одному риэлтору, — из общего каталога"""
+    return {"facilities_removed": await aio.delete_orphan_facilities(CATALOG_ORPHAN_TTL)}
+
+
+def create_scheduler() -> Scheduler:
+    scheduler = Scheduler(concurrency=SCHEDULER_CONCURRENCY)
+    scheduler.add("catalog_refresh", refresh_catalog_job, YGROUP_CATALOG_TTL, jitter=SCHEDULER_JITTER)
+    scheduler.add("lot_sync", lot_sync.sync_all, LOT_SYNC_INTERVAL, jitter=SCHEDULER_JITTER, initial_delay=60)
+    scheduler.add("cleanup", cleanup_job, CLEANUP_INTERVAL, jitter=SCHEDULER_JITTER, initial_delay=300)
+    return scheduler
 
 
 # === Webhook Handler ===
@@ -224,19 +179,26 @@ async def webhook_handler(request: web.Request) -> web.Response:
     if secret != WEBHOOK_SECRET:
         return web.Response(status=403)
     
+    received_at = time.perf_counter()
     try:
         data = await request.json()
-        
-        if "message" in data:
-            await handle_message(data["message"])
-        elif "callback_query" in data:
-            await handle_callback(data["callback_query"])
-        
-        return web.Response(text="ok")
-    
     except Exception as e:
         print(f"[ERROR] {e}")
-        return web.Response(text="error", status=500)
+        return web.Response(text="error", status=400)
+    
+    # На callback отвечаем прямо в теле ответа webhook — минус один запрос к API
+    callback = data.get("callback_query")
+    answer_inline = WEBHOOK_INLINE_ANSWER and callback is not None
+    
+    # Очередь переполнена — Telegram повторит доставку позже
+    if not request.app["updates"].submit(get_update_key(data), data, answer_inline, received_at):
+        return web.Response(text="busy", status=503)
+    
+    if answer_inline:
+        record_answer_latency("inline", time.perf_counter() - received_at)
+        return web.json_response({"method": "answerCallbackQuery", "callback_query_id": callback["id"]})
+    
+    return web.Response(text="ok")
 
 
 async def health_handler(request: web.Request) -> web.Response:
@@ -244,12 +206,61 @@ async def health_handler(request: web.Request) -> web.Response:
     return web.Response(text="OK")
 
 
+async def stats_handler(request: web.Request) -> web.Response:
+    """Метрики очередей апдейтов и исходящих запросов"""
+    return web.json_response({
+        "updates": request.app["updates"].get_stats(),
+        "telegram": telegram.get_stats(),
+        "callback_answer": get_answer_stats(),
+        "router": router.get_stats(),
+        "db": aio.get_stats(),
+        "catalog": ygroup.get_catalog_stats(),
+        "lot_sync": lot_sync.get_stats(),
+        "imports": handlers.properties.import_queue.get_stats(),
+    })
+
+
+async def jobs_handler(request: web.Request) -> web.Response:
+    """Фоновые задачи: последние запуски, длительность, ошибки"""
+    return web.json_response(request.app["scheduler"].get_stats())
+
+
 # === App ===
 
+async def on_startup(app: web.Application):
+    # Схема БД — до первого запроса к базе
+    migrate()
+    await telegram.start()
+    aio.start()
+    await app["updates"].start()
+    await handlers.properties.import_queue.start()
+    # Каталог ЖК с диска (или из API) — в фоне, старт не ждёт
+    ygroup.preload_catalog()
+    if SCHEDULER_ENABLED:
+        await app["scheduler"].start()
+
+
+async def on_cleanup(app: web.Application):
+    await app["scheduler"].stop()
+    await app["updates"].stop(UPDATE_DRAIN_TIMEOUT)
+    await handlers.properties.import_queue.stop()
+    await lot_sync.stop()
+    await telegram.close()
+    await ygroup.close()
+    await aio.stop()
+    close_connection()
+
+
 def create_app() -> web.Application:
     app = web.Application()
+    app["updates"] = UpdateWorkerPool(process_update, workers=UPDATE_WORKERS, max_pending=UPDATE_QUEUE_SIZE)
+    app["scheduler"] = create_scheduler()
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
     app.router.add_post("/webhook", webhook_handler)
     app.router.add_get("/health", health_handler)
+    app.router.add_get("/stats", stats_handler)
+    app.router.add_get("/jobs", jobs_handler)
     return app
 
 
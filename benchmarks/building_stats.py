@@ -0,0 +1,77 @@
+"""
+Выбор корпуса и этажа на ЖК с 20k лотов: GROUP BY по units на каждый тап (как было)
+против сводок building_stats / floor_stats, плюс цена их пересчёта в update_facility_stats.
+
+    python -m benchmarks.building_stats
+"""
+
+import time
+
+from benchmarks.common import use_temp_db, import_synthetic, ms_per_call
+from db import database
+from db.database import FACILITY_OF_PROPERTY
+
+BUILDINGS, FLOORS, PER_FLOOR = 20, 25, 40
+
+
+def building_stats_group_by(property_id: int) -> list:
+    """Запрос get_building_stats до сводок"""
+    rows = database.get_connection().execute(f"""
+        SELECT building, COUNT(*) as count, MIN(price_rub) as min_price, MAX(price_rub) as max_price,
+               MIN(floor) as min_floor, MAX(floor) as max_floor
+        FROM units
+        WHERE facility_id = {FACILITY_OF_PROPERTY}
+        GROUP BY building
+        ORDER BY building
+    """, (property_id,)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def floors_group_by(property_id: int, building: int) -> list:
+    """Запрос get_available_floors до сводок"""
+    rows = database.get_connection().execute(f"""
+        SELECT floor, COUNT(*) as count, MIN(price_rub) as min_price
+        FROM units
+        WHERE facility_id = {FACILITY_OF_PROPERTY} AND building = ?
+        GROUP BY floor
+        ORDER BY floor
+    """, (property_id, building)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def _same(old: list, new: list) -> bool:
+    """Сводка отдаёт те же значения, что и GROUP BY (и сверх того разбивку по статусам)"""
+    return len(old) == len(new) and all(all(n[key] == value for key, value in o.items()) for o, n in zip(old, new))
+
+
+def run(n: int = 200) -> dict:
+    imported = import_synthetic(1, BUILDINGS, FLOORS, PER_FLOOR)
+    property_id = imported["property_id"]
+    facility_id = database.get_property(property_id)["facility_id"]
+    building = BUILDINGS // 2
+
+    assert _same(building_stats_group_by(property_id), database.get_building_stats(property_id))
+    assert _same(floors_group_by(property_id, building), database.get_available_floors(property_id, building))
+
+    return {
+        "lots": database.get_property(property_id)["lots_count"],
+        "building stats": (
+            ms_per_call(lambda: building_stats_group_by(property_id), n),
+            ms_per_call(lambda: database.get_building_stats(property_id), n),
+        ),
+        "floors": (
+            ms_per_call(lambda: floors_group_by(property_id, building), n),
+            ms_per_call(lambda: database.get_available_floors(property_id, building), n),
+        ),
+        "refresh": ms_per_call(lambda: database.update_facility_stats(facility_id), 20),
+    }
+
+
+if __name__ == "__main__":
+    use_temp_db()
+    results = run()
+    print(f"{results['lots']} lots ({BUILDINGS} buildings x {FLOORS} floors x {PER_FLOOR})")
+    for name in ("building stats", "floors"):
+        before, after = results[name]
+        print(f"{name:16} GROUP BY {before:7.3f} ms   summary {after:7.3f} ms")
+    print(f"update_facility_stats  {results['refresh']:.1f} ms (once per import / sync)")
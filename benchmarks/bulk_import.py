@@ -0,0 +1,96 @@
+"""
+Импорт ЖК с 10k лотов: построчно (create_building / create_unit, коммит на каждую строку)
+против import_property (одна транзакция, executemany). Плюс цена записи индексов
+подбора: import_property и sync_facility (изменились все цены) с широкими индексами
+миграции 6, узкими миграции 7 и без индексов сортировок вовсе.
+
+    python -m benchmarks.bulk_import
+"""
+
+import time
+
+from benchmarks.common import use_temp_db, synthetic_tree
+from db import database, migrations
+
+BUILDINGS, FLOORS, PER_FLOOR = 10, 25, 40
+
+
+def import_row_by_row(user_id: int, tree: tuple) -> int:
+    """Как было до bulk-пути"""
+    buildings, units_by_building = tree
+    property_id = database.create_property(user_id, {"ygroup_facility_id": "rows", "name": "ЖК построчно"})
+    for building, units in zip(buildings, units_by_building):
+        building_id = database.create_building(property_id, building)
+        for unit in units:
+            database.create_unit(property_id, building_id, unit)
+    database.update_property_stats(property_id)
+    return property_id
+
+
+def import_bulk(user_id: int, tree: tuple) -> int:
+    return database.import_property(user_id, {"ygroup_facility_id": "bulk", "name": "ЖК пачкой"}, {}, *tree)["property_id"]
+
+
+def run() -> dict:
+    results = {}
+    for seed, (name, fn) in enumerate((("row by row", import_row_by_row), ("import_property", import_bulk)), 1):
+        tree = synthetic_tree(BUILDINGS, FLOORS, PER_FLOOR, seed)
+        started = time.perf_counter()
+        property_id = fn(seed, tree)
+        results[name] = (time.perf_counter() - started, database.get_property(property_id)["lots_count"])
+    return results
+
+
+def _drop_sort_indexes(conn):
+    for name in ("idx_units_price", "idx_units_area", "idx_units_price_m2"):
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+SEARCH_INDEXES = {
+    "wide (migration 6)": migrations._search_indexes,
+    "narrow (migration 7)": migrations._narrow_search_indexes,
+    "no sort indexes": _drop_sort_indexes,
+}
+
+
+def _import_and_sync(seed: int) -> tuple:
+    tree = synthetic_tree(BUILDINGS, FLOORS, PER_FLOOR, seed)
+    started = time.perf_counter()
+    result = database.import_property(seed, {"ygroup_facility_id": f"idx-{seed}", "name": f"ЖК {seed}"}, {}, *tree)
+    imported = time.perf_counter() - started
+
+    buildings, units_by_building = tree
+    repriced = [[dict(u, price_rub=u["price_rub"] + 100_000) for u in units] for units in units_by_building]
+    started = time.perf_counter()
+    database.sync_facility(result["facility_id"], buildings, repriced)
+    synced = time.perf_counter() - started
+
+    size = database.get_connection().execute(
+        "SELECT SUM(pgsize) FROM dbstat WHERE name IN ('idx_units_price', 'idx_units_area', 'idx_units_price_m2')"
+    ).fetchone()[0]
+    return imported, synced, (size or 0) / 1024 / 1024
+
+
+def run_index_writes(rounds: int = 5) -> dict:
+    """Вариант индексов -> (лучшее время import_property, лучшее время sync_facility, МБ индексов сортировок)"""
+    results = {name: [] for name in SEARCH_INDEXES}
+    seed = 10
+    for _ in range(rounds):
+        for name, create_indexes in SEARCH_INDEXES.items():
+            # Каждый замер — в новой базе, чтобы не мешали лоты прошлых
+            use_temp_db(f"indexes-{seed}.db")
+            conn = database.get_connection()
+            create_indexes(conn)
+            conn.commit()
+            results[name].append(_import_and_sync(seed))
+            seed += 1
+    return {name: tuple(min(t) for t in zip(*times)) for name, times in results.items()}
+
+
+if __name__ == "__main__":
+    use_temp_db()
+    for name, (elapsed, lots) in run().items():
+        print(f"{name:16} {lots} lots in {elapsed:.2f} s")
+    print(f"\n{BUILDINGS * FLOORS * PER_FLOOR} lots      import_property   sync (all prices)   sort indexes")
+    for name, (imported, synced, size) in run_index_writes().items():
+        print(f"{name:22} {imported:8.3f} s {synced:13.3f} s {size:11.2f} MB")
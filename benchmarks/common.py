@@ -0,0 +1,63 @@
+"""
+Общее для бенчмарков: временная база со схемой и синтетический ЖК
+"""
+
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from db import database, migrations
+
+STATUSES = ("available", "available", "available", "booked", "sold")
+DECORATIONS = ("Без отделки", "White box", "Чистовая")
+
+
+def use_temp_db(name: str = "bench.db") -> Path:
+    """Новая пустая база во временном каталоге со всеми миграциями"""
+    path = Path(tempfile.mkdtemp(prefix="realt-bench-")) / name
+    database.close_connection()
+    database.DB_PATH = migrations.DB_PATH = path
+    migrations.migrate()
+    return path
+
+
+def synthetic_tree(buildings: int, floors: int, per_floor: int, seed: int = 1) -> Tuple[List[Dict], List[List[Dict]]]:
+    """(buildings, units_by_building) в формате transform_clusters"""
+    rnd = random.Random(seed)
+    tree_buildings, units_by_building = [], []
+    for b in range(1, buildings + 1):
+        tree_buildings.append({"ygroup_cluster_id": f"c{b}", "name": f"Корпус {b}", "number": b, "floors_count": floors})
+        units = []
+        for i in range(floors * per_floor):
+            rooms = rnd.choice((0, 1, 1, 2, 2, 3))
+            area = round(rnd.uniform(18, 30) + rooms * rnd.uniform(12, 22), 1)
+            floor = i // per_floor + 1
+            price_m2 = rnd.randrange(180_000, 420_000, 500) + floor * 2000
+            units.append({
+                "ygroup_lot_id": f"l{b}-{i}", "code": f"{b}-{i + 1}", "building": b, "floor": floor,
+                "rooms": rooms, "area_m2": area, "price_rub": int(area * price_m2), "price_per_m2": price_m2,
+                "decoration_type": rnd.choice(DECORATIONS), "status": rnd.choice(STATUSES),
+            })
+        units_by_building.append(units)
+    return tree_buildings, units_by_building
+
+
+def import_synthetic(user_id: int, buildings: int, floors: int, per_floor: int, seed: int = 1) -> Dict:
+    """Синтетический ЖК риэлтору через import_property"""
+    tree = synthetic_tree(buildings, floors, per_floor, seed)
+    return database.import_property(
+        user_id, {"ygroup_facility_id": f"bench-{seed}", "name": f"ЖК {seed}"}, {}, *tree
+    )
+
+
+def per_second(fn: Callable, n: int) -> float:
+    started = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - started)
+
+
+def ms_per_call(fn: Callable, n: int) -> float:
+    return 1000 / per_second(fn, n)
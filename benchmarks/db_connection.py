@@ -0,0 +1,45 @@
+"""
+Пропускная способность горячих запросов: новое соединение на каждый вызов
+(как до пула, без прагм) против соединения потока с WAL и прагмами.
+
+    python -m benchmarks.db_connection
+"""
+
+import sqlite3
+from unittest import mock
+
+from benchmarks.common import use_temp_db, import_synthetic, per_second
+from db import database
+
+
+def fresh_connection() -> sqlite3.Connection:
+    """Как было: connect + row_factory + foreign_keys на каждый вызов"""
+    conn = sqlite3.connect(str(database.DB_PATH))
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def run() -> dict:
+    property_id = import_synthetic(1, buildings=2, floors=10, per_floor=4)["property_id"]
+    code = database.get_property_units(property_id)[40]["code"]
+    database.set_user_state(1, property_id=property_id)
+
+    cases = {
+        "get_unit_by_code": (lambda: database.get_unit_by_code(property_id, code), 5000),
+        "get_user_state": (lambda: database.get_user_state(1), 5000),
+        "set_user_state": (lambda: database.set_user_state(1, property_id=property_id, state="x"), 1000),
+    }
+    results = {}
+    for name, (fn, n) in cases.items():
+        with mock.patch.object(database, "get_connection", fresh_connection):
+            before = per_second(fn, n)
+        after = per_second(fn, n)
+        results[name] = (before, after)
+    return results
+
+
+if __name__ == "__main__":
+    use_temp_db()
+    for name, (before, after) in run().items():
+        print(f"{name:17} {before:>9,.0f}/s -> {after:>9,.0f}/s")
@@ -0,0 +1,67 @@
+"""
+Поиск по каталогу ЖК: прежний перебор списка с подстрокой против FacilityCatalog
+(50k синтетических ЖК, 20 результатов).
+
+    python -m benchmarks.facility_catalog
+"""
+
+import random
+import time
+
+from services.facility_catalog import FacilityCatalog
+
+WORDS = ("Солнечный", "Парковый", "Ёлки", "RIZALTA", "Морской", "Зелёный", "Квартал",
+         "Сити", "Life", "Park", "Бриз", "Гранд", "Нева", "Дом")
+QUERIES = ("солнечный", "rizalta", "елки", "ЖК Ёлки", "морск", "со", "life park", "парк", "12345")
+
+
+def synthetic_facilities(n: int, seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    return [
+        {
+            "id": f"f{i}", "name": "ЖК «" + " ".join(rnd.sample(WORDS, 2)) + f" {i}»",
+            "city_name": rnd.choice(("Сочи", "Москва")), "developer_name": f"D{i % 50}",
+            "active_lots_amount": i % 300,
+        }
+        for i in range(n)
+    ]
+
+
+def scan_search(facilities: list, query: str) -> list:
+    """Как было: lower() и подстрока по всему списку"""
+    query_lower = query.lower()
+    return [f for f in facilities if query_lower in f.get("name", "").lower()][:20]
+
+
+def scan_get(facilities: list, facility_id: str):
+    for f in facilities:
+        if f.get("id") == facility_id:
+            return f
+    return None
+
+
+def ms(fn, n: int) -> float:
+    started = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - started) / n * 1000
+
+
+def main(n: int = 50000):
+    facilities = synthetic_facilities(n)
+    started = time.perf_counter()
+    catalog = FacilityCatalog(facilities)
+    print(f"{n} facilities, index built in {time.perf_counter() - started:.2f} s")
+
+    for query in QUERIES:
+        old = ms(lambda: scan_search(facilities, query), 20)
+        new = ms(lambda: catalog.search(query), 200)
+        print(f"{query!r:14} scan {old:6.2f} ms   index {new:.3f} ms   ({len(catalog.search(query))} results)")
+
+    last_id = facilities[-1]["id"]
+    print(f"get by id      scan {ms(lambda: scan_get(facilities, last_id), 20):6.2f} ms   "
+          f"index {ms(lambda: catalog.get(last_id), 2000):.4f} ms")
+
+
+if __name__ == "__main__":
+    main()
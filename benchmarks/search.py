@@ -0,0 +1,122 @@
+"""
+Подбор лотов на ЖК с 50k лотов: план по оценке db/search.py против того же запроса
+без INDEXED BY (план выбирает SQLite); «engine + total» — первая страница вместе
+с подсчётом найденных. Первая страница сверяется с полным перебором.
+
+    python -m benchmarks.search [searches]
+"""
+
+import random
+import statistics
+import sys
+import time
+
+from benchmarks.common import use_temp_db, import_synthetic, DECORATIONS
+from db import database, search
+
+BUILDINGS, FLOORS, PER_FLOOR = 25, 25, 80
+LIMIT = 15
+
+
+def random_criteria(rnd: random.Random) -> dict:
+    criteria = {}
+    if rnd.random() < 0.5:
+        criteria["rooms"] = rnd.sample(range(4), rnd.choice((1, 2)))
+    if rnd.random() < 0.4:
+        low = rnd.randrange(20, 80)
+        criteria["min_area"], criteria["max_area"] = low, low + rnd.choice((5, 10, 30))
+    if rnd.random() < 0.4:
+        criteria["max_price"] = rnd.randrange(5, 30) * 1_000_000
+    if rnd.random() < 0.2:
+        low = rnd.randrange(200, 400) * 1000
+        criteria["min_price_m2"], criteria["max_price_m2"] = low, low + 50_000
+    if rnd.random() < 0.3:
+        criteria["building"] = rnd.randrange(1, BUILDINGS + 1)
+    if rnd.random() < 0.3:
+        low = rnd.randrange(1, FLOORS)
+        criteria["min_floor"], criteria["max_floor"] = low, low + rnd.choice((0, 3, 10))
+    if rnd.random() < 0.5:
+        criteria["status"] = "available"
+    if rnd.random() < 0.15:
+        criteria["decoration"] = rnd.choice(DECORATIONS)
+    return criteria
+
+
+def brute_force(units: list, criteria: dict, sort: str) -> list:
+    """id первой страницы перебором всех лотов"""
+    def ok(u):
+        for key, column in search.RANGE_FILTERS.items():
+            low, high = criteria.get(f"min_{key}"), criteria.get(f"max_{key}")
+            if (low is not None or high is not None) and u[column] is None:
+                return False
+            if (low is not None and u[column] < low) or (high is not None and u[column] > high):
+                return False
+        for key, column in search.VALUE_FILTERS.items():
+            if criteria.get(key) is not None and u[column] not in search._as_list(criteria[key]):
+                return False
+        return True
+
+    column, direction, _ = search.SORTS[sort]
+    found = [u for u in units if ok(u) and u[column] is not None]
+    found.sort(key=lambda u: (u[column], u["id"]), reverse=direction == "DESC")
+    return [u["id"] for u in found[:LIMIT]]
+
+
+def sqlite_plan(facility_id: int, criteria: dict, sort: str) -> list:
+    column, direction, _ = search.SORTS[sort]
+    conditions, params = search._where(facility_id, criteria)
+    rows = database.get_connection().execute(
+        f"SELECT * FROM units WHERE {' AND '.join(conditions)} AND {column} IS NOT NULL "
+        f"ORDER BY {column} {direction}, id {direction} LIMIT ?", params + [LIMIT + 1]
+    ).fetchall()
+    return [r["id"] for r in rows[:LIMIT]]
+
+
+def _timed(fn) -> tuple:
+    started = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - started) * 1000, result
+
+
+def run(n: int) -> dict:
+    property_id = import_synthetic(1, BUILDINGS, FLOORS, PER_FLOOR)["property_id"]
+    facility_id = database.get_property(property_id)["facility_id"]
+    units = [dict(r) for r in database.get_connection().execute("SELECT * FROM units WHERE facility_id = ?", (facility_id,))]
+
+    rnd = random.Random(1)
+    engine_ms, sqlite_ms, with_total_ms, mismatches = [], [], [], 0
+    before = search.get_stats()
+    for _ in range(n):
+        criteria, sort = random_criteria(rnd), rnd.choice(list(search.SORTS))
+        elapsed, page = _timed(lambda: search.search_units(property_id, criteria, sort, limit=LIMIT))
+        with_total_ms.append(elapsed)
+        # Курсор до первого лота — та же первая страница без подсчёта найденных
+        start = (-1e18, 0) if search.SORTS[sort][1] == "ASC" else (1e18, 0)
+        elapsed, page = _timed(lambda: search.search_units(property_id, criteria, sort, after=start, limit=LIMIT))
+        engine_ms.append(elapsed)
+        elapsed, ids = _timed(lambda: sqlite_plan(facility_id, criteria, sort))
+        sqlite_ms.append(elapsed)
+        expected = brute_force(units, criteria, sort)
+        mismatches += [u["id"] for u in page["units"]] != expected or ids != expected
+    after = search.get_stats()
+
+    return {
+        "lots": len(units),
+        "engine": engine_ms,
+        "sqlite": sqlite_ms,
+        "engine + total": with_total_ms,
+        "mismatches": mismatches,
+        "fallbacks": after["fallbacks"] - before["fallbacks"],
+        "totals": {mode: after["totals"][mode] - before["totals"][mode] for mode in after["totals"]},
+    }
+
+
+if __name__ == "__main__":
+    use_temp_db()
+    results = run(int(sys.argv[1]) if len(sys.argv) > 1 else 400)
+    print(f"{results['lots']} lots, {len(results['engine'])} random searches, {results['mismatches']} mismatches")
+    for name in ("engine", "sqlite", "engine + total"):
+        times = sorted(results[name])
+        print(f"{name:14} median {statistics.median(times):6.2f} ms   p95 {times[int(len(times) * 0.95)]:6.2f} ms   "
+              f"max {times[-1]:6.2f} ms")
+    print(f"fallbacks {results['fallbacks']}, totals {results['totals']}")
@@ -0,0 +1,63 @@
+"""
+Задержка апдейта (answerCallbackQuery + editMessageText) на локальном фейковом Bot API:
+новая ClientSession на каждый вызов (как было) против общей keep-alive сессии.
+
+    python -m benchmarks.telegram_session [updates]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+from aiohttp import ClientSession, web
+
+HOST, PORT = "127.0.0.1", 8765
+os.environ["TELEGRAM_API_BASE"] = f"http://{HOST}:{PORT}"
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench")
+
+from config.settings import TELEGRAM_API  # noqa: E402
+from services import telegram  # noqa: E402
+
+
+async def fake_method(request: web.Request) -> web.Response:
+    await request.read()
+    return web.json_response({"ok": True, "result": True})
+
+
+async def per_call_sessions():
+    for method in ("answerCallbackQuery", "editMessageText"):
+        async with ClientSession() as session:
+            async with session.post(f"{TELEGRAM_API}/{method}", json={}) as resp:
+                await resp.json()
+
+
+async def shared_session():
+    # Напрямую, без исходящей очереди — меряем только соединения
+    await telegram.request("answerCallbackQuery", {})
+    await telegram.request("editMessageText", {})
+
+
+async def measure(update, n: int) -> float:
+    started = time.perf_counter()
+    for _ in range(n):
+        await update()
+    return (time.perf_counter() - started) / n * 1000
+
+
+async def main(n: int):
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", fake_method)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+    try:
+        print(f"per-call sessions: {await measure(per_call_sessions, n):.2f} ms/update")
+        print(f"shared session:    {await measure(shared_session, n):.2f} ms/update")
+    finally:
+        await telegram.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 300))
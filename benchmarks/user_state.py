@@ -0,0 +1,63 @@
+"""
+Состояние диалога на апдейт (прочитать + записать): функции db/database.py на
+каждый апдейт (как было), UserStateStore write_through и write_back с пакетным сбросом.
+
+    python -m benchmarks.user_state [updates] [users]
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+from benchmarks.common import use_temp_db
+from db import aio, database
+from db.user_state import UserStateStore, WRITE_BACK, WRITE_THROUGH
+
+
+def per_update_writes(updates: list) -> float:
+    started = time.perf_counter()
+    for user_id, state in updates:
+        database.get_user_state(user_id)
+        database.set_user_state(user_id, state=state)
+    return time.perf_counter() - started
+
+
+async def store_writes(updates: list, durability: str) -> tuple:
+    """(время апдейтов, время до конца последнего сброса, число сбросов)"""
+    store = UserStateStore(aio.run_read, aio.run_write, durability=durability)
+    store.start()
+    started = time.perf_counter()
+    for i, (user_id, state) in enumerate(updates):
+        await store.get(user_id)
+        await store.set(user_id, state=state)
+        if i % 100 == 0:
+            # Апдейты приходят не одним куском — даём таймеру сброса сработать
+            await asyncio.sleep(0)
+    served = time.perf_counter() - started
+    await store.stop()
+    return served, time.perf_counter() - started, store.get_stats()["flushes"]
+
+
+async def run_stores(updates: list) -> dict:
+    aio.start()
+    try:
+        return {durability: await store_writes(updates, durability) for durability in (WRITE_THROUGH, WRITE_BACK)}
+    finally:
+        await aio.stop()
+
+
+def main(n: int, users: int):
+    rnd = random.Random(1)
+    updates = [(rnd.randrange(users), f"state{i % 7}") for i in range(n)]
+
+    elapsed = per_update_writes(updates)
+    print(f"db functions per update  {n / elapsed:>9,.0f} updates/s")
+    for durability, (served, total, flushes) in asyncio.run(run_stores(updates)).items():
+        print(f"store {durability:13}      {n / served:>9,.0f} updates/s "
+              f"(with final flush {n / total:,.0f}/s, {flushes} flushes)")
+
+
+if __name__ == "__main__":
+    use_temp_db()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000, int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
@@ -11,6 +11,28 @@ load_dotenv()
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
 WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "realt-v2-secret")
+# Отвечать на callback_query прямо в HTTP-ответе webhook
+WEBHOOK_INLINE_ANSWER = os.getenv("WEBHOOK_INLINE_ANSWER", "1") == "1"
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
+TELEGRAM_API = f"{TELEGRAM_API_BASE}/bot{TELEGRAM_BOT_TOKEN}"
+
+# Пул соединений к Bot API
+TELEGRAM_POOL_LIMIT = int(os.getenv("TELEGRAM_POOL_LIMIT", "100"))
+TELEGRAM_KEEPALIVE_TIMEOUT = float(os.getenv("TELEGRAM_KEEPALIVE_TIMEOUT", "60"))
+TELEGRAM_DNS_CACHE_TTL = int(os.getenv("TELEGRAM_DNS_CACHE_TTL", "300"))
+TELEGRAM_REQUEST_TIMEOUT = float(os.getenv("TELEGRAM_REQUEST_TIMEOUT", "60"))
+
+# Исходящая очередь: лимиты Telegram (~30 msg/s всего, ~1 msg/s на чат)
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_CHAT_BURST = float(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+TELEGRAM_SENDERS = int(os.getenv("TELEGRAM_SENDERS", "8"))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+
+# Очередь апдейтов webhook
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "8"))
+UPDATE_QUEUE_SIZE = int(os.getenv("UPDATE_QUEUE_SIZE", "1000"))
+UPDATE_DRAIN_TIMEOUT = float(os.getenv("UPDATE_DRAIN_TIMEOUT", "30"))
 
 # === OpenAI ===
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
@@ -18,6 +40,65 @@ OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 
 # === YGroup ===
 YGROUP_API_TOKEN = os.getenv("YGROUP_API_TOKEN", "")
+YGROUP_API_URL = os.getenv("YGROUP_API_URL", "https://api-ru.ygroup.ru")
+YGROUP_POOL_LIMIT = int(os.getenv("YGROUP_POOL_LIMIT", "20"))
+YGROUP_MAX_RETRIES = int(os.getenv("YGROUP_MAX_RETRIES", "2"))
+# Пауза перед ретраем: база экспоненты (сек, со случайным разбросом) и потолок
+# для Retry-After из ответа 429/503
+YGROUP_RETRY_BACKOFF = float(os.getenv("YGROUP_RETRY_BACKOFF", "1"))
+YGROUP_RETRY_AFTER_MAX = float(os.getenv("YGROUP_RETRY_AFTER_MAX", "60"))
+# Сколько запросов к YGroup одновременно на один токен
+YGROUP_TOKEN_CONCURRENCY = int(os.getenv("YGROUP_TOKEN_CONCURRENCY", "5"))
+YGROUP_TIMEOUT = float(os.getenv("YGROUP_TIMEOUT", "10"))
+YGROUP_LONG_TIMEOUT = float(os.getenv("YGROUP_LONG_TIMEOUT", "30"))
+# Каталог ЖК: копия на диске, через сколько секунд обновлять в фоне,
+# и пауза перед повтором после неудачного обновления
+YGROUP_CATALOG_FILE = os.getenv(
+    "YGROUP_CATALOG_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "facilities.json")
+)
+YGROUP_CATALOG_TTL = float(os.getenv("YGROUP_CATALOG_TTL", str(6 * 3600)))
+YGROUP_CATALOG_RETRY = float(os.getenv("YGROUP_CATALOG_RETRY", "60"))
+# Страниц каталога в полёте одновременно (меньше YGROUP_TOKEN_CONCURRENCY,
+# чтобы загрузка каталога не занимала все слоты импорта)
+YGROUP_CATALOG_CONCURRENCY = int(os.getenv("YGROUP_CATALOG_CONCURRENCY", "4"))
+YGROUP_CATALOG_PAGE_SIZE = int(os.getenv("YGROUP_CATALOG_PAGE_SIZE", "100"))
+
+# Синхронизация лотов: сколько ЖК обновлять одновременно
+LOT_SYNC_CONCURRENCY = int(os.getenv("LOT_SYNC_CONCURRENCY", "2"))
+
+# Фоновые задачи: сколько одновременно, интервалы (сек), разброс интервала (доля)
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+SCHEDULER_CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "2"))
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", "0.1"))
+LOT_SYNC_INTERVAL = float(os.getenv("LOT_SYNC_INTERVAL", "3600"))
+CLEANUP_INTERVAL = float(os.getenv("CLEANUP_INTERVAL", str(6 * 3600)))
+# ЖК без риэлторов держим в каталоге ещё сутки
+CATALOG_ORPHAN_TTL = float(os.getenv("CATALOG_ORPHAN_TTL", str(24 * 3600)))
+
+# Импорт ЖК: сколько импортов одновременно, как часто править сообщение с прогрессом (сек)
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+IMPORT_PROGRESS_INTERVAL = float(os.getenv("IMPORT_PROGRESS_INTERVAL", "2"))
+
+# Поиск лотов: лотов на странице результатов
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "15"))
+# Страховка подбора (мс): план, выбранный по оценке, дольше этого прерывается
+# и запрос повторяется с планом SQLite; подсчёт найденных — заменяется оценкой
+SEARCH_TIMEOUT_MS = float(os.getenv("SEARCH_TIMEOUT_MS", "1000"))
+
+# === База данных ===
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(128 * 1024 * 1024)))
+DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "5"))
+DB_READ_THREADS = int(os.getenv("DB_READ_THREADS", "4"))
+DB_WRITE_BATCH = int(os.getenv("DB_WRITE_BATCH", "100"))
+# Состояние диалога: write_back — в памяти, в базу пачкой раз в STATE_FLUSH_INTERVAL сек
+# (при падении теряется не больше интервала); write_through — каждая запись сразу в базу
+STATE_DURABILITY = os.getenv("STATE_DURABILITY", "write_back")
+STATE_FLUSH_INTERVAL = float(os.getenv("STATE_FLUSH_INTERVAL", "1"))
+STATE_CACHE_SIZE = int(os.getenv("STATE_CACHE_SIZE", "10000"))
+# Кэш ЖК риэлтора, корпусов и параметров расчёта: записей в каждом
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "5000"))
 
 # === Mini App ===
 MINIAPP_URL = os.getenv("MINIAPP_URL", "https://realt-miniapp.vercel.app")
@@ -37,7 +118,13 @@ BTN_BY_BUILDING = "🏢 По корпусу"
 BTN_BY_AREA = "📐 По площади"
 BTN_BY_BUDGET = "💰 По бюджету"
 BTN_BY_CODE = "🔍 По номеру лота"
+BTN_BY_FILTERS = "🎯 Подбор по параметрам"
 BTN_BACK = "🔙 Назад"
+BTN_PREV_PAGE = "◀️ Пред."
+BTN_NEXT_PAGE = "След. ▶️"
+BTN_SORT_PRICE = "💰 Дешевле"
+BTN_SORT_AREA = "📐 Больше"
+BTN_SORT_PRICE_M2 = "📊 Дешевле м²"
 
 # === Меню: Лот ===
 BTN_KP = "📄 Коммерческое предложение"
@@ -74,6 +161,7 @@ class States:
     SEARCH_BY_AREA = "search_by_area"
     SEARCH_BY_BUDGET = "search_by_budget"
     SEARCH_BY_CODE = "search_by_code"
+    SEARCH_BY_FILTERS = "search_by_filters"
     
     # Лот
     LOT_MENU = "lot_menu"
@@ -0,0 +1,336 @@
+"""
+Асинхронный доступ к БД для хендлеров
+
+Чтения идут в небольшой пул потоков (WAL позволяет читать параллельно),
+записи — в один поток-писатель, который собирает накопившиеся записи
+в пачку и коммитит их одной транзакцией. Event loop не блокируется.
+
+    from db.aio import get_unit_by_code
+    unit = await get_unit_by_code(property_id, code)
+"""
+
+import asyncio
+import functools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, List, Optional
+
+from config.settings import (
+    DB_READ_THREADS, DB_WRITE_BATCH, STATE_DURABILITY, STATE_FLUSH_INTERVAL, STATE_CACHE_SIZE,
+    ENTITY_CACHE_SIZE
+)
+from db import database, search
+from db.cache import ReadThroughCache
+from db.user_state import UserStateStore
+
+_read_executor: Optional[ThreadPoolExecutor] = None
+_writer: Optional["_WriterThread"] = None
+_lock = threading.Lock()
+# После stop() потоки не поднимаются заново сами — только явным start()
+_stopped = False
+
+stats = {
+    "reads": 0, "writes": 0, "write_batches": 0, "write_errors": 0,
+    "updates": 0, "update_calls": 0, "max_update_calls": 0,
+}
+
+
+
+class DatabaseStopped(Exception):
+    """db.aio остановлен (stop()) — обращение к БД не выполнено"""
+
+
+# Обращения к БД в рамках текущего апдейта (см. count_calls)
+_update_calls: ContextVar[Optional[List[int]]] = ContextVar("db_update_calls", default=None)
+
+
+class _WriterThread(threading.Thread):
+    """Единственный писатель: пачки записей в одной транзакции"""
+
+    _STOP = object()
+
+    def __init__(self, batch_size: int):
+        super().__init__(name="db-writer", daemon=True)
+        self.batch_size = batch_size
+        self.jobs: queue.Queue = queue.Queue()
+
+    def submit(self, fn: Callable, args: tuple, kwargs: dict) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.jobs.put((fn, args, kwargs, loop, future))
+        return future
+
+    def stop(self):
+        self.jobs.put(self._STOP)
+        self.join()
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            job = self.jobs.get()
+            if job is self._STOP:
+                break
+
+            batch = [job]
+            while len(batch) < self.batch_size:
+                try:
+                    job = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is self._STOP:
+                    stopping = True
+                    break
+                batch.append(job)
+
+            self._run_batch(batch)
+
+        database.close_connection()
+
+    def _run_batch(self, batch: list):
+        results = []
+        try:
+            with database.transaction():
+                for fn, args, kwargs, _, _ in batch:
+                    # Каждая запись в своём SAVEPOINT — ошибка одной не откатывает остальные
+                    try:
+                        with database.transaction():
+                            results.append((True, fn(*args, **kwargs)))
+                    except Exception as e:
+                        results.append((False, e))
+        except Exception as e:
+            results = [(False, e)] * len(batch)
+
+        stats["write_batches"] += 1
+        for (_, _, _, loop, future), (ok, value) in zip(batch, results):
+            if not ok:
+                stats["write_errors"] += 1
+            loop.call_soon_threadsafe(_resolve, future, ok, value)
+
+
+def _resolve(future: asyncio.Future, ok: bool, value: Any):
+    if future.done():
+        return
+    if ok:
+        future.set_result(value)
+    else:
+        future.set_exception(value)
+
+
+# === Lifecycle ===
+
+def start():
+    _start(lazy=False)
+
+
+def _start(lazy: bool, caller: str = None):
+    """Ленивый запуск из run_read / run_write — только до первого stop()"""
+    global _read_executor, _writer, _stopped
+
+    with _lock:
+        if lazy and _stopped:
+            raise DatabaseStopped(caller)
+        _stopped = False
+        if _read_executor is None:
+            _read_executor = ThreadPoolExecutor(DB_READ_THREADS, thread_name_prefix="db-read")
+        if _writer is None:
+            _writer = _WriterThread(DB_WRITE_BATCH)
+            _writer.start()
+            user_states.start()
+
+
+async def stop():
+    """
+    Сбросить состояния диалогов, дождаться записей в очереди и остановить потоки.
+    Дальше run_read / run_write бросают DatabaseStopped до явного start()
+    """
+    global _read_executor, _writer, _stopped
+
+    if _writer is not None:
+        await user_states.stop()
+
+    with _lock:
+        _stopped = True
+        writer, executor = _writer, _read_executor
+        _writer = _read_executor = None
+
+    loop = asyncio.get_running_loop()
+    if writer is not None:
+        await loop.run_in_executor(None, writer.stop)
+    if executor is not None:
+        await loop.run_in_executor(None, executor.shutdown)
+
+
+def get_stats() -> dict:
+    result = dict(stats)
+    result["write_queue"] = _writer.jobs.qsize() if _writer else 0
+    result["calls_per_update"] = round(stats["update_calls"] / stats["updates"], 2) if stats["updates"] else 0
+    result["user_state"] = user_states.get_stats()
+    result["cache"] = {c.name: c.get_stats() for c in (property_cache, building_cache, custom_cache)}
+    result["search"] = search.get_stats()
+    return result
+
+
+# === Счётчик обращений на апдейт ===
+
+@contextmanager
+def count_calls():
+    """
+    Считать обращения к БД (run_read/run_write) внутри блока — в этой задаче
+    и запущенных из неё. Итог попадает в stats (calls_per_update).
+    """
+    counter = [0]
+    token = _update_calls.set(counter)
+    try:
+        yield counter
+    finally:
+        _update_calls.reset(token)
+        stats["updates"] += 1
+        stats["update_calls"] += counter[0]
+        stats["max_update_calls"] = max(stats["max_update_calls"], counter[0])
+
+
+def _count_call():
+    counter = _update_calls.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+# === Обёртки ===
+
+async def run_read(fn: Callable, *args, **kwargs) -> Any:
+    executor = _read_executor
+    if executor is None:
+        _start(lazy=True, caller=getattr(fn, "__name__", repr(fn)))
+        executor = _read_executor
+    stats["reads"] += 1
+    _count_call()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+
+async def run_write(fn: Callable, *args, **kwargs) -> Any:
+    writer = _writer
+    if writer is None:
+        _start(lazy=True, caller=getattr(fn, "__name__", repr(fn)))
+        writer = _writer
+    stats["writes"] += 1
+    _count_call()
+    return await writer.submit(fn, args, kwargs)
+
+
+def _read_op(fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_read(fn, *args, **kwargs)
+    return wrapper
+
+
+def _write_op(fn: Callable, invalidate: Optional[Callable] = None) -> Callable:
+    """invalidate(result, *args, **kwargs) — сбросить кэши после коммита записи"""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        result = await run_write(fn, *args, **kwargs)
+        if invalidate is not None:
+            invalidate(result, *args, **kwargs)
+        return result
+    return wrapper
+
+
+def _cached_read(cache: ReadThroughCache, fn: Callable) -> Callable:
+    """Чтение строки по id через кэш; вызывающий получает копию"""
+    @functools.wraps(fn)
+    async def wrapper(key):
+        value = await cache.get(key, lambda: run_read(fn, key))
+        return dict(value) if value is not None else None
+    return wrapper
+
+
+# === Кэш строк, которые меняются только при импорте, синхронизации и правке настроек ===
+
+property_cache: ReadThroughCache[int, dict] = ReadThroughCache("property", ENTITY_CACHE_SIZE)
+building_cache: ReadThroughCache[int, dict] = ReadThroughCache("building", ENTITY_CACHE_SIZE)
+custom_cache: ReadThroughCache[int, dict] = ReadThroughCache("property_custom", ENTITY_CACHE_SIZE)
+
+
+def _catalog_changed(*_, **__):
+    """Данные ЖК общего каталога общие для всех его риэлторов — сбрасываем целиком"""
+    property_cache.clear()
+    building_cache.clear()
+
+
+# Состояние диалога — в памяти, в базу пачками (db/user_state.py)
+user_states = UserStateStore(
+    run_read, run_write,
+    capacity=STATE_CACHE_SIZE, flush_interval=STATE_FLUSH_INTERVAL, durability=STATE_DURABILITY
+)
+
+
+async def get_user_state(user_id: int) -> dict:
+    return await user_states.get(user_id)
+
+
+async def set_user_state(user_id: int, property_id: int = None, lot_code: str = None,
+                         state: str = None, state_data: str = None):
+    await user_states.set(user_id, property_id, lot_code, state, state_data)
+
+
+async def clear_user_state(user_id: int):
+    await user_states.clear(user_id)
+
+
+# Users
+get_or_create_user = _write_op(database.get_or_create_user)
+
+# Properties
+create_property = _write_op(database.create_property, _catalog_changed)
+get_user_properties = _read_op(database.get_user_properties)
+get_property = _cached_read(property_cache, database.get_property)
+get_property_by_ygroup_id = _read_op(database.get_property_by_ygroup_id)
+# Статистика пишется в ЖК каталога — она общая у всех его риэлторов
+update_property_stats = _write_op(database.update_property_stats, lambda *_, **__: property_cache.clear())
+
+
+async def delete_property(property_id: int):
+    await run_write(database.delete_property, property_id)
+    property_cache.invalidate(property_id)
+    custom_cache.invalidate(property_id)
+    user_states.forget_property(property_id)
+
+
+# Общий каталог ЖК
+get_facility_by_ygroup_id = _read_op(database.get_facility_by_ygroup_id)
+get_linked_facilities = _read_op(database.get_linked_facilities)
+sync_facility = _write_op(database.sync_facility, _catalog_changed)
+delete_orphan_facilities = _write_op(database.delete_orphan_facilities, _catalog_changed)
+
+
+async def import_property(*args, **kwargs) -> dict:
+    result = await run_write(database.import_property, *args, **kwargs)
+    _catalog_changed()
+    custom_cache.invalidate(result["property_id"])
+    return result
+
+
+# Buildings
+create_building = _write_op(database.create_building)
+get_property_buildings = _read_op(database.get_property_buildings)
+get_building = _cached_read(building_cache, database.get_building)
+
+# Units
+create_unit = _write_op(database.create_unit)
+get_property_units = _read_op(database.get_property_units)
+get_unit_by_code = _read_op(database.get_unit_by_code)
+get_lot_context = _read_op(database.get_lot_context)
+get_available_floors = _read_op(database.get_available_floors)
+get_building_stats = _read_op(database.get_building_stats)
+search_units = _read_op(search.search_units)
+
+# Property custom
+get_property_custom = _cached_read(custom_cache, database.get_property_custom)
+set_property_custom = _write_op(
+    database.set_property_custom,
+    lambda _, property_id, *args, **kwargs: custom_cache.invalidate(property_id)
+)
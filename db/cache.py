@@ -0,0 +1,63 @@
+"""
+Read-through кэш редко меняющихся строк (ЖК риэлтора, корпус, параметры расчёта)
+Промах читает из базы и кладёт результат в LRU; записи в db/aio.py после
+коммита сбрасывают затронутые ключи или весь кэш.
+Чтение, начатое до сброса, может вернуть старые данные — такой результат
+отдаётся вызывающему, но в кэш не кладётся (сверка по generation).
+"""
+
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class ReadThroughCache(Generic[K, V]):
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = capacity
+        self._items: "OrderedDict[K, V]" = OrderedDict()
+        # Растёт при каждом сбросе — загрузки, начатые раньше, не попадают в кэш
+        self.generation = 0
+
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "stale_loads": 0}
+
+    async def get(self, key: K, loader: Callable[[], Awaitable[Optional[V]]]) -> Optional[V]:
+        """Значение из кэша или loader(); None (нет строки) не кэшируется"""
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.stats["hits"] += 1
+            return self._items[key]
+
+        self.stats["misses"] += 1
+        generation = self.generation
+        value = await loader()
+        if value is None:
+            return None
+        if generation != self.generation:
+            self.stats["stale_loads"] += 1
+            return value
+
+        self._items[key] = value
+        if len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+            self.stats["evictions"] += 1
+        return value
+
+    def invalidate(self, key: K):
+        self.generation += 1
+        self.stats["invalidations"] += 1
+        self._items.pop(key, None)
+
+    def clear(self):
+        self.generation += 1
+        self.stats["invalidations"] += 1
+        self._items.clear()
+
+    def get_stats(self) -> Dict:
+        result = dict(self.stats)
+        lookups = self.stats["hits"] + self.stats["misses"]
+        result["hit_rate"] = round(self.stats["hits"] / lookups, 3) if lookups else 0
+        result["size"] = len(self._items)
+        return result
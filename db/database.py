@@ -1,153 +1,96 @@
 """
 База данных Realt Assistant V2
-SQLite с таблицами: properties, buildings, units, property_custom, users, user_state
+SQLite с таблицами: facilities, buildings, units (общий каталог ЖК),
+properties (ЖК риэлтора), property_custom, users, user_state.
+Схема создаётся и меняется миграциями (db/migrations.py)
 """
 
 import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
+from config.settings import DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_BUSY_TIMEOUT
+
 DB_PATH = Path(__file__).parent.parent / "data" / "realt.db"
 
+# Одно соединение на поток, живёт всё время работы процесса
+_local = threading.local()
 
-def get_connection() -> sqlite3.Connection:
-    """Получить соединение с БД"""
+
+def _open_connection() -> sqlite3.Connection:
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(DB_PATH))
+    conn = sqlite3.connect(str(DB_PATH), timeout=DB_BUSY_TIMEOUT)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
     conn.execute("PRAGMA foreign_keys = ON")
     return conn
 
 
-def init_db():
-    """Инициализация всех таблиц"""
+def get_connection() -> sqlite3.Connection:
+    """Соединение текущего потока (открывается один раз)"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _open_connection()
+    elif conn.in_transaction and not _tx_depth():
+        # Незакоммиченный хвост от упавшего запроса — не держим write-lock
+        conn.rollback()
+    return conn
+
+
+def _tx_depth() -> int:
+    return getattr(_local, "tx_depth", 0)
+
+
+@contextmanager
+def transaction():
+    """
+    Транзакция на соединении текущего потока.
+    Вложенные вызовы — SAVEPOINT; функции внутри не коммитят сами.
+    """
     conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Пользователи
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INTEGER PRIMARY KEY,
-            username TEXT,
-            first_name TEXT,
-            last_name TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Состояние диалога
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_state (
-            user_id INTEGER PRIMARY KEY,
-            current_property_id INTEGER,
-            current_lot_code TEXT,
-            state TEXT,
-            state_data TEXT,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (current_property_id) REFERENCES properties(id) ON DELETE SET NULL
-        )
-    """)
-    
-    # ЖК риэлтора
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS properties (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            ygroup_facility_id TEXT,
-            name TEXT NOT NULL,
-            city TEXT,
-            district TEXT,
-            address TEXT,
-            developer TEXT,
-            description TEXT,
-            main_image_url TEXT,
-            lots_count INTEGER DEFAULT 0,
-            min_price INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(user_id, ygroup_facility_id)
-        )
-    """)
-    
-    # Корпуса
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS buildings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            property_id INTEGER NOT NULL,
-            ygroup_cluster_id TEXT,
-            name TEXT,
-            number INTEGER,
-            floors_count INTEGER,
-            commissioning_date TEXT,
-            commissioning_timestamp INTEGER,
-            is_completed INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (property_id) REFERENCES properties(id) ON DELETE CASCADE
-        )
-    """)
-    
-    # Квартиры/лоты
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS units (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            property_id INTEGER NOT NULL,
-            building_id INTEGER,
-            ygroup_lot_id TEXT,
-            code TEXT NOT NULL,
-            building INTEGER,
-            floor INTEGER,
-            rooms INTEGER,
-            area_m2 REAL,
-            price_rub INTEGER,
-            price_per_m2 INTEGER,
-            layout_url TEXT,
-            decoration_type TEXT,
-            status TEXT DEFAULT 'available',
-            block_section TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (property_id) REFERENCES properties(id) ON DELETE CASCADE,
-            FOREIGN KEY (building_id) REFERENCES buildings(id) ON DELETE SET NULL
-        )
-    """)
-    
-    # Индексы для units
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_units_property ON units(property_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_units_building ON units(property_id, building)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_units_price ON units(property_id, price_rub)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_units_area ON units(property_id, area_m2)")
-    
-    # Кастомные данные риэлтора
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS property_custom (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            property_id INTEGER NOT NULL UNIQUE,
-            commissioning_date TEXT,
-            rental_daily_rate INTEGER,
-            occupancy_rate REAL DEFAULT 70,
-            operating_expenses_pct REAL DEFAULT 10,
-            management_fee_pct REAL DEFAULT 20,
-            tax_rate REAL DEFAULT 4,
-            appreciation_rate REAL DEFAULT 10,
-            installment_pv REAL,
-            installment_months INTEGER,
-            installment_markup REAL DEFAULT 0,
-            commission TEXT,
-            commission_pct REAL,
-            utp TEXT,
-            notes TEXT,
-            developer_phone TEXT,
-            developer_website TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (property_id) REFERENCES properties(id) ON DELETE CASCADE
-        )
-    """)
+    depth = _tx_depth()
+    savepoint = f"sp{depth}"
     
-    conn.commit()
-    conn.close()
-    print(f"[DB] Initialized: {DB_PATH}")
+    conn.execute("BEGIN" if depth == 0 else f"SAVEPOINT {savepoint}")
+    _local.tx_depth = depth + 1
+    try:
+        yield conn
+    except BaseException:
+        if depth == 0:
+            conn.rollback()
+        else:
+            conn.execute(f"ROLLBACK TO {savepoint}")
+            conn.execute(f"RELEASE {savepoint}")
+        raise
+    else:
+        if depth == 0:
+            conn.commit()
+        else:
+            conn.execute(f"RELEASE {savepoint}")
+    finally:
+        _local.tx_depth = depth
+
+
+def _commit(conn: sqlite3.Connection):
+    """Коммит, если мы не внутри transaction()"""
+    if not _tx_depth():
+        conn.commit()
+
+
+def close_connection():
+    """Закрыть соединение текущего потока"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
 
 
 # === Users ===
@@ -166,10 +109,9 @@ def get_or_create_user(user_id: int, username: str = "", first_name: str = "", l
             "INSERT INTO users (user_id, username, first_name, last_name) VALUES (?, ?, ?, ?)",
             (user_id, username, first_name, last_name)
         )
-        conn.commit()
+        _commit(conn)
         user = {"user_id": user_id, "username": username, "first_name": first_name, "last_name": last_name}
     
-    conn.close()
     return user
 
 
@@ -180,7 +122,6 @@ def get_user_state(user_id: int) -> Dict:
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM user_state WHERE user_id = ?", (user_id,))
     row = cursor.fetchone()
-    conn.close()
     
     if row:
         return dict(row)
@@ -200,92 +141,240 @@ def set_user_state(user_id: int, property_id: int = None, lot_code: str = None,
             state_data = excluded.state_data,
             updated_at = excluded.updated_at
     """, (user_id, property_id, lot_code, state, state_data, datetime.now().isoformat()))
-    conn.commit()
-    conn.close()
+    _commit(conn)
 
 
 def clear_user_state(user_id: int):
     set_user_state(user_id, None, None, None, None)
 
 
-# === Properties ===
+def save_user_states(states: List[Dict]):
+    """
+    Записать пачку состояний (из кэша db/user_state.py) одним executemany.
+    ЖК, удалённый после записи в кэш, превращается в NULL — как ON DELETE SET NULL
+    """
+    conn = get_connection()
+    conn.executemany("""
+        INSERT INTO user_state (user_id, current_property_id, current_lot_code, state, state_data, updated_at)
+        VALUES (?, (SELECT id FROM properties WHERE id = ?), ?, ?, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+            current_property_id = excluded.current_property_id,
+            current_lot_code = excluded.current_lot_code,
+            state = excluded.state,
+            state_data = excluded.state_data,
+            updated_at = excluded.updated_at
+    """, [
+        (s["user_id"], s["current_property_id"], s["current_lot_code"], s["state"], s["state_data"], s["updated_at"])
+        for s in states
+    ])
+    _commit(conn)
+
+
+# === Facilities (общий каталог ЖК) ===
 
-def create_property(user_id: int, data: Dict) -> int:
+# Описательные поля ЖК из YGroup; lots_count/min_price считает update_facility_stats
+FACILITY_FIELDS = (
+    "name", "city", "district", "address", "developer", "description", "main_image_url",
+    "commissioning_year", "commissioning_quarter", "is_commissioned",
+    # Характеристики из детальной карточки YGroup
+    "facility_class", "facility_subtype", "territory_type", "parking_types", "payment_methods",
+    "contract_type", "has_gas", "has_electricity", "heating_type", "water_supply_type", "sewerage_type",
+)
+
+# facility_id ЖК риэлтора — подзапрос вычисляется один раз на запрос
+FACILITY_OF_PROPERTY = "(SELECT facility_id FROM properties WHERE id = ?)"
+
+
+def upsert_facility(data: Dict) -> int:
+    """
+    Добавить ЖК в общий каталог или обновить описание; вернуть его id.
+    Пишутся только переданные поля — без детальной карточки характеристики не затираются
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    fields = [f for f in FACILITY_FIELDS if f in data]
+    values = [data[f] for f in fields]
+    
+    ygroup_id = data.get("ygroup_facility_id")
+    row = None
+    if ygroup_id is not None:
+        row = cursor.execute("SELECT id FROM facilities WHERE ygroup_facility_id = ?", (ygroup_id,)).fetchone()
+    
+    if row:
+        facility_id = row["id"]
+        cursor.execute(
+            f"UPDATE facilities SET {''.join(f'{f} = ?, ' for f in fields)}updated_at = ? WHERE id = ?",
+            values + [datetime.now().isoformat(), facility_id]
+        )
+    else:
+        cursor.execute(f"""
+            INSERT INTO facilities (ygroup_facility_id, {''.join(f'{f}, ' for f in fields)}lots_count, min_price, updated_at)
+            VALUES (?, {''.join('?, ' for _ in fields)}?, ?, ?)
+        """, [ygroup_id] + values + [data.get("lots_count", 0), data.get("min_price"), datetime.now().isoformat()])
+        facility_id = cursor.lastrowid
+    
+    _commit(conn)
+    return facility_id
+
+
+def get_facility_by_ygroup_id(ygroup_facility_id: str) -> Optional[Dict]:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM facilities WHERE ygroup_facility_id = ?", (ygroup_facility_id,))
+    row = cursor.fetchone()
+    return dict(row) if row else None
+
+
+def get_linked_facilities() -> List[Dict]:
+    """ЖК из YGroup, которые есть хотя бы у одного риэлтора (их и синхронизируем)"""
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("""
-        INSERT INTO properties (user_id, ygroup_facility_id, name, city, district, address, developer, description, main_image_url, lots_count, min_price)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        user_id,
-        data.get("ygroup_facility_id"),
-        data.get("name"),
-        data.get("city"),
-        data.get("district"),
-        data.get("address"),
-        data.get("developer"),
-        data.get("description"),
-        data.get("main_image_url"),
-        data.get("lots_count", 0),
-        data.get("min_price")
-    ))
+        SELECT f.id, f.ygroup_facility_id FROM facilities f
+        WHERE f.ygroup_facility_id IS NOT NULL
+          AND EXISTS (SELECT 1 FROM properties p WHERE p.facility_id = f.id)
+        ORDER BY f.id
+    """)
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def delete_orphan_facilities(max_age: float) -> int:
+    """
+    Удалить из каталога ЖК, которые не нужны ни одному риэлтору дольше max_age секунд
+    (корпуса и лоты — каскадом). Недавние оставляем: ЖК часто удаляют и добавляют снова.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cutoff = datetime.fromtimestamp(datetime.now().timestamp() - max_age).isoformat()
+    cursor.execute("""
+        DELETE FROM facilities
+        WHERE NOT EXISTS (SELECT 1 FROM properties p WHERE p.facility_id = facilities.id)
+          AND julianday(COALESCE(synced_at, updated_at)) < julianday(?)
+    """, (cutoff,))
+    _commit(conn)
+    return cursor.rowcount
+
+
+def update_facility_stats(facility_id: int):
+    """
+    Обновить кэш lots_count и min_price и сводки building_stats / floor_stats.
+    Вызывается после любого изменения лотов ЖК (импорт, синхронизация)
+    """
+    with transaction() as conn:
+        conn.execute("""
+            UPDATE facilities SET
+                lots_count = (SELECT COUNT(*) FROM units WHERE facility_id = ?),
+                min_price = (SELECT MIN(price_rub) FROM units WHERE facility_id = ?),
+                updated_at = ?
+            WHERE id = ?
+        """, (facility_id, facility_id, datetime.now().isoformat(), facility_id))
+    
+        conn.execute("DELETE FROM building_stats WHERE facility_id = ?", (facility_id,))
+        conn.execute("""
+            INSERT INTO building_stats
+            SELECT facility_id, building, COUNT(*),
+                   SUM(status = 'available'), SUM(status = 'booked'), SUM(status = 'sold'),
+                   MIN(price_rub), MAX(price_rub), MIN(floor), MAX(floor)
+            FROM units WHERE facility_id = ?
+            GROUP BY building
+        """, (facility_id,))
+    
+        conn.execute("DELETE FROM floor_stats WHERE facility_id = ?", (facility_id,))
+        conn.execute("""
+            INSERT INTO floor_stats
+            SELECT facility_id, building, floor, COUNT(*), SUM(status = 'available'), MIN(price_rub)
+            FROM units WHERE facility_id = ?
+            GROUP BY building, floor
+        """, (facility_id,))
+
+
+# === Properties (ЖК риэлтора — ссылка на общий каталог) ===
+
+# Те же поля, что были у properties до общего каталога
+PROPERTY_COLUMNS = (
+    f"p.id, p.user_id, p.facility_id, f.ygroup_facility_id, {', '.join(f'f.{f}' for f in FACILITY_FIELDS)}, "
+    "f.lots_count, f.min_price, p.created_at, f.updated_at"
+)
+PROPERTY_SELECT = f"""
+    SELECT {PROPERTY_COLUMNS}
+    FROM properties p JOIN facilities f ON f.id = p.facility_id
+"""
+
+
+def create_property(user_id: int, data: Dict) -> int:
+    """ЖК в каталог (если ещё нет) + ссылка риэлтора на него"""
+    facility_id = upsert_facility(data)
+    return link_property(user_id, facility_id)
+
+
+def link_property(user_id: int, facility_id: int) -> int:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO properties (user_id, facility_id) VALUES (?, ?)", (user_id, facility_id))
     property_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    _commit(conn)
     return property_id
 
 
 def get_user_properties(user_id: int) -> List[Dict]:
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM properties WHERE user_id = ? ORDER BY name", (user_id,))
+    cursor.execute(f"{PROPERTY_SELECT} WHERE p.user_id = ? ORDER BY f.name", (user_id,))
     rows = cursor.fetchall()
-    conn.close()
     return [dict(row) for row in rows]
 
 
 def get_property(property_id: int) -> Optional[Dict]:
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM properties WHERE id = ?", (property_id,))
+    cursor.execute(f"{PROPERTY_SELECT} WHERE p.id = ?", (property_id,))
+    row = cursor.fetchone()
+    return dict(row) if row else None
+
+
+def get_property_by_ygroup_id(user_id: int, ygroup_facility_id: str) -> Optional[Dict]:
+    """Проверить есть ли ЖК у пользователя"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        f"{PROPERTY_SELECT} WHERE p.user_id = ? AND f.ygroup_facility_id = ?",
+        (user_id, ygroup_facility_id)
+    )
     row = cursor.fetchone()
-    conn.close()
     return dict(row) if row else None
 
 
 def delete_property(property_id: int):
+    """Удалить ЖК у риэлтора; каталог (корпуса, лоты) общий и остаётся"""
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("DELETE FROM properties WHERE id = ?", (property_id,))
-    conn.commit()
-    conn.close()
+    _commit(conn)
+
+
+def _property_facility_id(conn: sqlite3.Connection, property_id: int) -> Optional[int]:
+    row = conn.execute("SELECT facility_id FROM properties WHERE id = ?", (property_id,)).fetchone()
+    return row["facility_id"] if row else None
 
 
 def update_property_stats(property_id: int):
-    """Обновить кэш lots_count и min_price"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE properties SET
-            lots_count = (SELECT COUNT(*) FROM units WHERE property_id = ?),
-            min_price = (SELECT MIN(price_rub) FROM units WHERE property_id = ?),
-            updated_at = ?
-        WHERE id = ?
-    """, (property_id, property_id, datetime.now().isoformat(), property_id))
-    conn.commit()
-    conn.close()
+    """Обновить кэш lots_count и min_price ЖК риэлтора"""
+    facility_id = _property_facility_id(get_connection(), property_id)
+    if facility_id is not None:
+        update_facility_stats(facility_id)
 
 
 # === Buildings ===
 
-def create_building(property_id: int, data: Dict) -> int:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO buildings (property_id, ygroup_cluster_id, name, number, floors_count, commissioning_date, commissioning_timestamp, is_completed)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        property_id,
+BUILDING_INSERT_SQL = """
+    INSERT INTO buildings (facility_id, ygroup_cluster_id, name, number, floors_count, commissioning_date, commissioning_timestamp, is_completed)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _building_row(facility_id: int, data: Dict) -> tuple:
+    return (
+        facility_id,
         data.get("ygroup_cluster_id"),
         data.get("name"),
         data.get("number"),
@@ -293,19 +382,36 @@ def create_building(property_id: int, data: Dict) -> int:
         data.get("commissioning_date"),
         data.get("commissioning_timestamp"),
         data.get("is_completed", 0)
-    ))
+    )
+
+
+def create_building(property_id: int, data: Dict) -> int:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(BUILDING_INSERT_SQL, _building_row(_property_facility_id(conn, property_id), data))
     building_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    _commit(conn)
     return building_id
 
 
+def bulk_insert_buildings(facility_id: int, buildings: List[Dict]) -> List[int]:
+    """Вставить корпуса, вернуть их id в том же порядке"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    ids = []
+    # Корпусов единицы — id нужны для лотов, поэтому построчно
+    for data in buildings:
+        cursor.execute(BUILDING_INSERT_SQL, _building_row(facility_id, data))
+        ids.append(cursor.lastrowid)
+    _commit(conn)
+    return ids
+
+
 def get_property_buildings(property_id: int) -> List[Dict]:
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM buildings WHERE property_id = ? ORDER BY number", (property_id,))
+    cursor.execute(f"SELECT * FROM buildings WHERE facility_id = {FACILITY_OF_PROPERTY} ORDER BY number", (property_id,))
     rows = cursor.fetchall()
-    conn.close()
     return [dict(row) for row in rows]
 
 
@@ -314,20 +420,20 @@ def get_building(building_id: int) -> Optional[Dict]:
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM buildings WHERE id = ?", (building_id,))
     row = cursor.fetchone()
-    conn.close()
     return dict(row) if row else None
 
 
 # === Units ===
 
-def create_unit(property_id: int, building_id: int, data: Dict) -> int:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO units (property_id, building_id, ygroup_lot_id, code, building, floor, rooms, area_m2, price_rub, price_per_m2, layout_url, decoration_type, status, block_section)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        property_id,
+UNIT_INSERT_SQL = """
+    INSERT INTO units (facility_id, building_id, ygroup_lot_id, code, building, floor, rooms, area_m2, price_rub, price_per_m2, layout_url, decoration_type, status, block_section)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _unit_row(facility_id: int, building_id: int, data: Dict) -> tuple:
+    return (
+        facility_id,
         building_id,
         data.get("ygroup_lot_id"),
         data.get("code"),
@@ -341,18 +447,31 @@ def create_unit(property_id: int, building_id: int, data: Dict) -> int:
         data.get("decoration_type"),
         data.get("status", "available"),
         data.get("block_section")
-    ))
+    )
+
+
+def create_unit(property_id: int, building_id: int, data: Dict) -> int:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(UNIT_INSERT_SQL, _unit_row(_property_facility_id(conn, property_id), building_id, data))
     unit_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    _commit(conn)
     return unit_id
 
 
+def bulk_insert_units(facility_id: int, units: List[Dict]) -> int:
+    """Вставить лоты одним executemany (building_id — в самих dict)"""
+    conn = get_connection()
+    conn.executemany(UNIT_INSERT_SQL, (_unit_row(facility_id, u.get("building_id"), u) for u in units))
+    _commit(conn)
+    return len(units)
+
+
 def get_property_units(property_id: int, building: int = None, floor: int = None) -> List[Dict]:
     conn = get_connection()
     cursor = conn.cursor()
     
-    query = "SELECT * FROM units WHERE property_id = ?"
+    query = f"SELECT * FROM units WHERE facility_id = {FACILITY_OF_PROPERTY}"
     params = [property_id]
     
     if building:
@@ -365,7 +484,6 @@ def get_property_units(property_id: int, building: int = None, floor: int = None
     query += " ORDER BY building, floor, code"
     cursor.execute(query, params)
     rows = cursor.fetchall()
-    conn.close()
     return [dict(row) for row in rows]
 
 
@@ -374,74 +492,106 @@ def get_unit_by_code(property_id: int, code: str, building: int = None) -> Optio
     cursor = conn.cursor()
     
     if building:
-        cursor.execute("SELECT * FROM units WHERE property_id = ? AND code = ? AND building = ?", (property_id, code, building))
+        cursor.execute(
+            f"SELECT * FROM units WHERE facility_id = {FACILITY_OF_PROPERTY} AND code = ? AND building = ?",
+            (property_id, code, building)
+        )
     else:
-        cursor.execute("SELECT * FROM units WHERE property_id = ? AND code = ?", (property_id, code))
+        cursor.execute(f"SELECT * FROM units WHERE facility_id = {FACILITY_OF_PROPERTY} AND code = ?", (property_id, code))
     
     row = cursor.fetchone()
-    conn.close()
     return dict(row) if row else None
 
 
-def get_units_by_budget(property_id: int, min_price: int, max_price: int) -> List[Dict]:
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT * FROM units WHERE property_id = ? AND price_rub BETWEEN ? AND ? ORDER BY price_rub",
-        (property_id, min_price, max_price)
-    )
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+@dataclass
+class LotContext:
+    """Всё для экранов лота: лот, корпус (если есть), ЖК риэлтора, его параметры расчёта"""
+    unit: Dict
+    prop: Dict
+    building: Optional[Dict]
+    custom: Dict
+    
+    @property
+    def is_completed(self) -> bool:
+        return bool(self.building and self.building.get("is_completed"))
+    
+    @property
+    def commissioning_timestamp(self) -> Optional[int]:
+        return self.building.get("commissioning_timestamp") if self.building else None
+
+
+LOT_CONTEXT_SQL = f"""
+    SELECT u.*, b.*, c.*, {PROPERTY_COLUMNS}
+    FROM properties p
+    JOIN facilities f ON f.id = p.facility_id
+    JOIN units u ON u.facility_id = p.facility_id AND u.code = ?
+    LEFT JOIN buildings b ON b.id = u.building_id
+    LEFT JOIN property_custom c ON c.property_id = p.id
+    WHERE p.id = ?
+    LIMIT 1
+"""
+
+# Имена колонок таблиц — чтобы разрезать строку LOT_CONTEXT_SQL (схема не меняется после migrate)
+_columns_cache: Dict[str, List[str]] = {}
+
 
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    names = _columns_cache.get(table)
+    if names is None:
+        names = _columns_cache[table] = [row["name"] for row in conn.execute(f"PRAGMA table_info({table})")]
+    return names
 
-def get_units_by_area(property_id: int, min_area: float, max_area: float) -> List[Dict]:
+
+def get_lot_context(property_id: int, code: str) -> Optional[LotContext]:
+    """Лот, корпус, ЖК и кастомные параметры одним запросом"""
     conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT * FROM units WHERE property_id = ? AND area_m2 BETWEEN ? AND ? ORDER BY area_m2",
-        (property_id, min_area, max_area)
+    row = conn.execute(LOT_CONTEXT_SQL, (code, property_id)).fetchone()
+    if row is None:
+        return None
+    
+    values = tuple(row)
+    parts = []
+    start = 0
+    for table in ("units", "buildings", "property_custom"):
+        names = _columns(conn, table)
+        parts.append(dict(zip(names, values[start:start + len(names)])))
+        start += len(names)
+    unit, building, custom = parts
+    prop = dict(zip(row.keys()[start:], values[start:]))
+    
+    return LotContext(
+        unit=unit,
+        prop=prop,
+        building=building if building["id"] is not None else None,
+        custom=custom if custom["id"] is not None else {},
     )
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
 
 
 def get_available_floors(property_id: int, building: int) -> List[Dict]:
-    """Список этажей с количеством лотов"""
+    """Список этажей с количеством лотов (из сводки floor_stats)"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("""
-        SELECT floor, COUNT(*) as count, MIN(price_rub) as min_price
-        FROM units
-        WHERE property_id = ? AND building = ?
-        GROUP BY floor
+    cursor.execute(f"""
+        SELECT floor, count, available, min_price
+        FROM floor_stats
+        WHERE facility_id = {FACILITY_OF_PROPERTY} AND building = ?
         ORDER BY floor
     """, (property_id, building))
     rows = cursor.fetchall()
-    conn.close()
     return [dict(row) for row in rows]
 
 
 def get_building_stats(property_id: int) -> List[Dict]:
-    """Статистика по корпусам"""
+    """Статистика по корпусам (из сводки building_stats)"""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("""
-        SELECT 
-            building,
-            COUNT(*) as count,
-            MIN(price_rub) as min_price,
-            MAX(price_rub) as max_price,
-            MIN(floor) as min_floor,
-            MAX(floor) as max_floor
-        FROM units
-        WHERE property_id = ?
-        GROUP BY building
+    cursor.execute(f"""
+        SELECT building, count, available, booked, sold, min_price, max_price, min_floor, max_floor
+        FROM building_stats
+        WHERE facility_id = {FACILITY_OF_PROPERTY}
         ORDER BY building
     """, (property_id,))
     rows = cursor.fetchall()
-    conn.close()
     return [dict(row) for row in rows]
 
 
@@ -452,7 +602,6 @@ def get_property_custom(property_id: int) -> Optional[Dict]:
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM property_custom WHERE property_id = ?", (property_id,))
     row = cursor.fetchone()
-    conn.close()
     return dict(row) if row else None
 
 
@@ -478,22 +627,144 @@ def set_property_custom(property_id: int, data: Dict):
             updated_at = ?
     """, [property_id] + values + [datetime.now().isoformat()])
     
-    conn.commit()
-    conn.close()
+    _commit(conn)
 
 
-# Инициализация при импорте
-init_db()
+# === Import ===
 
-
-def get_property_by_ygroup_id(user_id: int, ygroup_facility_id: str) -> Optional[Dict]:
-    """Проверить есть ли ЖК у пользователя"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT * FROM properties WHERE user_id = ? AND ygroup_facility_id = ?",
-        (user_id, ygroup_facility_id)
-    )
-    row = cursor.fetchone()
-    conn.close()
-    return dict(row) if row else None
+def import_property(user_id: int, property_data: Dict, custom_data: Dict,
+                    buildings: Optional[List[Dict]] = None, units_by_building: Optional[List[List[Dict]]] = None) -> Dict:
+    """
+    Добавить ЖК риэлтору одной транзакцией: ЖК в общий каталог, ссылка,
+    дефолтные кастомные данные. Корпуса и лоты пишутся, только если
+    каталог ещё не заполнен (их уже мог загрузить другой риэлтор).
+    units_by_building[i] — лоты корпуса buildings[i]. При ошибке ничего не остаётся.
+    """
+    with transaction() as conn:
+        facility_id = upsert_facility(property_data)
+    
+        filled = conn.execute("SELECT synced_at FROM facilities WHERE id = ?", (facility_id,)).fetchone()["synced_at"]
+        if not filled and buildings is not None:
+            building_ids = bulk_insert_buildings(facility_id, buildings)
+            units = []
+            for building_id, building_units in zip(building_ids, units_by_building):
+                for unit in building_units:
+                    unit["building_id"] = building_id
+                    units.append(unit)
+            bulk_insert_units(facility_id, units)
+            update_facility_stats(facility_id)
+            # synced_at — признак «дерево загружено»: следующие импорты YGroup не спрашивают
+            conn.execute("UPDATE facilities SET synced_at = ? WHERE id = ?", (datetime.now().isoformat(), facility_id))
+    
+        property_id = link_property(user_id, facility_id)
+        set_property_custom(property_id, custom_data)
+    
+        buildings_count = conn.execute("SELECT COUNT(*) FROM buildings WHERE facility_id = ?", (facility_id,)).fetchone()[0]
+        units_count = conn.execute("SELECT lots_count FROM facilities WHERE id = ?", (facility_id,)).fetchone()[0]
+    
+    return {
+        "property_id": property_id,
+        "facility_id": facility_id,
+        "buildings_count": buildings_count,
+        "units_count": units_count,
+    }
+
+
+# === Sync ===
+
+# Поля лота, которые приходят из YGroup и могут меняться
+UNIT_SYNC_FIELDS = (
+    "building_id", "code", "building", "floor", "rooms", "area_m2",
+    "price_rub", "price_per_m2", "layout_url", "decoration_type", "status",
+)
+BUILDING_SYNC_FIELDS = (
+    "name", "number", "floors_count", "commissioning_date",
+    "commissioning_timestamp", "is_completed",
+)
+
+
+def sync_facility(facility_id: int, buildings: List[Dict], units_by_building: List[List[Dict]]) -> Dict:
+    """
+    Привести корпуса и лоты ЖК каталога к свежим данным YGroup одной транзакцией.
+    Сопоставление по ygroup_cluster_id / ygroup_lot_id; пишутся только изменения.
+    Лоты без ygroup_lot_id (добавленные вручную) не трогаем.
+    """
+    summary = {
+        "inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0,
+        "buildings_added": 0, "buildings_updated": 0, "buildings_removed": 0,
+    }
+    
+    with transaction() as conn:
+        # Корпуса
+        existing = {
+            row["ygroup_cluster_id"]: dict(row)
+            for row in conn.execute(
+                "SELECT * FROM buildings WHERE facility_id = ? AND ygroup_cluster_id IS NOT NULL", (facility_id,)
+            )
+        }
+        building_ids = []
+        for data in buildings:
+            old = existing.pop(data.get("ygroup_cluster_id"), None)
+            if old is None:
+                building_ids.append(conn.execute(BUILDING_INSERT_SQL, _building_row(facility_id, data)).lastrowid)
+                summary["buildings_added"] += 1
+                continue
+            building_ids.append(old["id"])
+            if any(old[f] != data.get(f) for f in BUILDING_SYNC_FIELDS):
+                conn.execute(
+                    f"UPDATE buildings SET {', '.join(f'{f} = ?' for f in BUILDING_SYNC_FIELDS)} WHERE id = ?",
+                    [data.get(f) for f in BUILDING_SYNC_FIELDS] + [old["id"]]
+                )
+                summary["buildings_updated"] += 1
+    
+        # Лоты
+        current = {
+            row["ygroup_lot_id"]: dict(row)
+            for row in conn.execute(
+                f"SELECT id, ygroup_lot_id, {', '.join(UNIT_SYNC_FIELDS)} FROM units "
+                "WHERE facility_id = ? AND ygroup_lot_id IS NOT NULL",
+                (facility_id,)
+            )
+        }
+        now = datetime.now().isoformat()
+        inserts, updates, recoded = [], [], []
+        for building_id, building_units in zip(building_ids, units_by_building):
+            for unit in building_units:
+                unit["building_id"] = building_id
+                old = current.pop(unit.get("ygroup_lot_id"), None)
+                if old is None:
+                    inserts.append(unit)
+                elif any(old[f] != unit.get(f) for f in UNIT_SYNC_FIELDS):
+                    updates.append([unit.get(f) for f in UNIT_SYNC_FIELDS] + [now, old["id"]])
+                    if (old["building"], old["code"]) != (unit.get("building"), unit.get("code")):
+                        recoded.append((old["id"],))
+                else:
+                    summary["unchanged"] += 1
+    
+        # Порядок важен для уникального (facility_id, building, code): сначала уходят
+        # лоты, которых больше нет в YGroup (то, что осталось в current), их коды
+        # могут достаться новым; сменившие код лоты временно получают '~id',
+        # чтобы два лота могли обменяться кодами
+        if current:
+            conn.executemany("DELETE FROM units WHERE id = ?", [(u["id"],) for u in current.values()])
+        if recoded:
+            conn.executemany("UPDATE units SET code = '~' || id WHERE id = ?", recoded)
+        if updates:
+            conn.executemany(
+                f"UPDATE units SET {', '.join(f'{f} = ?' for f in UNIT_SYNC_FIELDS)}, updated_at = ? WHERE id = ?",
+                updates
+            )
+        if inserts:
+            bulk_insert_units(facility_id, inserts)
+        if existing:
+            conn.executemany("DELETE FROM buildings WHERE id = ?", [(b["id"],) for b in existing.values()])
+    
+        summary.update(
+            inserted=len(inserts), updated=len(updates), deleted=len(current),
+            buildings_removed=len(existing),
+        )
+        conn.execute("UPDATE facilities SET synced_at = ? WHERE id = ?", (now, facility_id))
+        if inserts or updates or current or existing or summary["buildings_added"] or summary["buildings_updated"]:
+            update_facility_stats(facility_id)
+    
+    return summary
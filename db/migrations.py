@@ -0,0 +1,460 @@
+"""
+Миграции схемы БД
+Номер применённой версии хранится в schema_version; migrate() по порядку
+применяет недостающие, каждую одной транзакцией вместе с записью версии.
+Запускается явно при старте процесса (app.py, run_polling.py).
+Новая миграция — функция и строка в конце MIGRATIONS; применённые не меняем.
+
+Миграции 1–3 описывают схему, которая раньше создавалась в init_db при импорте
+модуля, и написаны идемпотентно: база без schema_version проходит их без изменений.
+"""
+
+import sqlite3
+from datetime import datetime
+from typing import List
+
+from db.database import DB_PATH, get_connection, transaction
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row["name"] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _index_exists(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone() is not None
+
+
+# === 1. Пользователи, состояние диалога, кастомные данные ===
+
+def _initial(conn: sqlite3.Connection):
+    cursor = conn.cursor()
+    
+    # Пользователи
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Состояние диалога
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_state (
+            user_id INTEGER PRIMARY KEY,
+            current_property_id INTEGER,
+            current_lot_code TEXT,
+            state TEXT,
+            state_data TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (current_property_id) REFERENCES properties(id) ON DELETE SET NULL
+        )
+    """)
+    
+    # Кастомные данные риэлтора
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS property_custom (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            property_id INTEGER NOT NULL UNIQUE,
+            commissioning_date TEXT,
+            rental_daily_rate INTEGER,
+            occupancy_rate REAL DEFAULT 70,
+            operating_expenses_pct REAL DEFAULT 10,
+            management_fee_pct REAL DEFAULT 20,
+            tax_rate REAL DEFAULT 4,
+            appreciation_rate REAL DEFAULT 10,
+            installment_pv REAL,
+            installment_months INTEGER,
+            installment_markup REAL DEFAULT 0,
+            commission TEXT,
+            commission_pct REAL,
+            utp TEXT,
+            notes TEXT,
+            developer_phone TEXT,
+            developer_website TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (property_id) REFERENCES properties(id) ON DELETE CASCADE
+        )
+    """)
+
+
+# === 2. Общий каталог ЖК ===
+
+def _create_catalog_tables(cursor: sqlite3.Cursor, suffix: str = ""):
+    """
+    Общий каталог ЖК (facilities -> buildings -> units), один на всех риэлторов,
+    и properties — ссылка риэлтора на ЖК из каталога.
+    suffix — для пересборки старых таблиц при миграции.
+    """
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS facilities{suffix} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ygroup_facility_id TEXT UNIQUE,
+            name TEXT NOT NULL,
+            city TEXT,
+            district TEXT,
+            address TEXT,
+            developer TEXT,
+            description TEXT,
+            main_image_url TEXT,
+            lots_count INTEGER DEFAULT 0,
+            min_price INTEGER,
+            synced_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # ЖК риэлтора
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS properties{suffix} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            facility_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, facility_id),
+            FOREIGN KEY (facility_id) REFERENCES facilities(id)
+        )
+    """)
+    
+    # Корпуса
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS buildings{suffix} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            facility_id INTEGER NOT NULL,
+            ygroup_cluster_id TEXT,
+            name TEXT,
+            number INTEGER,
+            floors_count INTEGER,
+            commissioning_date TEXT,
+            commissioning_timestamp INTEGER,
+            is_completed INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE
+        )
+    """)
+    
+    # Квартиры/лоты
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS units{suffix} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            facility_id INTEGER NOT NULL,
+            building_id INTEGER,
+            ygroup_lot_id TEXT,
+            code TEXT NOT NULL,
+            building INTEGER,
+            floor INTEGER,
+            rooms INTEGER,
+            area_m2 REAL,
+            price_rub INTEGER,
+            price_per_m2 INTEGER,
+            layout_url TEXT,
+            decoration_type TEXT,
+            status TEXT DEFAULT 'available',
+            block_section TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE,
+            FOREIGN KEY (building_id) REFERENCES buildings(id) ON DELETE SET NULL
+        )
+    """)
+
+
+def _rebuild_shared_catalog(conn: sqlite3.Connection):
+    """
+    Старая схема: у каждого риэлтора своя копия ЖК, корпусов и лотов.
+    Переносим по одной копии каждого ЖК (самой свежей) в общий каталог,
+    properties риэлторов становятся ссылками на него. id сохраняются.
+    """
+    properties = [dict(row) for row in conn.execute("SELECT * FROM properties ORDER BY id")]
+    
+    # Каноническая копия ЖК — последний импорт; ЖК без ygroup id остаются отдельными
+    canonical = {}
+    for prop in properties:
+        key = prop["ygroup_facility_id"] or f"local:{prop['id']}"
+        canonical[key] = prop
+    
+    cursor = conn.cursor()
+    _create_catalog_tables(cursor, "_new")
+    
+    facility_of = {}
+    for key, prop in canonical.items():
+        cursor.execute("""
+            INSERT INTO facilities_new (ygroup_facility_id, name, city, district, address, developer,
+                                        description, main_image_url, lots_count, min_price, synced_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            prop["ygroup_facility_id"], prop["name"], prop["city"], prop["district"], prop["address"],
+            prop["developer"], prop["description"], prop["main_image_url"], prop["lots_count"],
+            prop["min_price"], prop["updated_at"], prop["created_at"], prop["updated_at"]
+        ))
+        facility_of[prop["id"]] = cursor.lastrowid
+    
+    cursor.execute("CREATE TEMP TABLE _facility_map (property_id INTEGER PRIMARY KEY, facility_id INTEGER)")
+    cursor.executemany("INSERT INTO _facility_map VALUES (?, ?)", facility_of.items())
+    
+    # Корпуса и лоты — только канонических копий, остальные дубли
+    cursor.execute("""
+        INSERT INTO buildings_new (id, facility_id, ygroup_cluster_id, name, number, floors_count,
+                                   commissioning_date, commissioning_timestamp, is_completed, created_at)
+        SELECT b.id, m.facility_id, b.ygroup_cluster_id, b.name, b.number, b.floors_count,
+               b.commissioning_date, b.commissioning_timestamp, b.is_completed, b.created_at
+        FROM buildings b JOIN _facility_map m ON m.property_id = b.property_id
+    """)
+    cursor.execute("""
+        INSERT INTO units_new (id, facility_id, building_id, ygroup_lot_id, code, building, floor, rooms,
+                               area_m2, price_rub, price_per_m2, layout_url, decoration_type, status,
+                               block_section, created_at, updated_at)
+        SELECT u.id, m.facility_id, u.building_id, u.ygroup_lot_id, u.code, u.building, u.floor, u.rooms,
+               u.area_m2, u.price_rub, u.price_per_m2, u.layout_url, u.decoration_type, u.status,
+               u.block_section, u.created_at, u.updated_at
+        FROM units u JOIN _facility_map m ON m.property_id = u.property_id
+    """)
+    
+    # Ссылки риэлторов: id прежние, property_custom и user_state остаются валидны
+    key_facility = {
+        key: facility_of[prop["id"]] for key, prop in canonical.items()
+    }
+    cursor.executemany(
+        "INSERT INTO properties_new (id, user_id, facility_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+        [
+            (p["id"], p["user_id"], key_facility[p["ygroup_facility_id"] or f"local:{p['id']}"],
+             p["created_at"], p["updated_at"])
+            for p in properties
+        ]
+    )
+    
+    for table in ("units", "buildings", "properties"):
+        cursor.execute(f"DROP TABLE {table}")
+    for table in ("facilities", "properties", "buildings", "units"):
+        cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    cursor.execute("DROP TABLE _facility_map")
+    
+    print(f"[DB] Migrated {len(properties)} properties to shared catalog ({len(canonical)} facilities)")
+
+
+def _shared_catalog(conn: sqlite3.Connection):
+    # Старая схема (копия ЖК у каждого риэлтора) -> общий каталог
+    if "ygroup_facility_id" in _table_columns(conn, "properties"):
+        _rebuild_shared_catalog(conn)
+    
+    cursor = conn.cursor()
+    _create_catalog_tables(cursor)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_properties_facility ON properties(facility_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_buildings_facility ON buildings(facility_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_units_price ON units(facility_id, price_rub)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_units_area ON units(facility_id, area_m2)")
+
+
+# === 3. Уникальный код лота в корпусе ===
+
+def _unit_code_index(conn: sqlite3.Connection):
+    """
+    Лот по коду — самый частый запрос (карточка лота, ROI, сравнение, Mini App).
+    (facility_id, building, code) заодно покрывает выборки по ЖК и по корпусу.
+    Одинаковые коды в одном корпусе (старые импорты) получают суффикс -<id>.
+    """
+    if _index_exists(conn, "idx_units_code"):
+        return
+    
+    cursor = conn.execute("""
+        UPDATE units SET code = code || '-' || id
+        WHERE id NOT IN (SELECT MIN(id) FROM units GROUP BY facility_id, building, code)
+    """)
+    if cursor.rowcount:
+        print(f"[DB] Renamed {cursor.rowcount} duplicate lot codes")
+    
+    conn.execute("CREATE UNIQUE INDEX idx_units_code ON units(facility_id, building, code)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_units_facility_code ON units(facility_id, code)")
+    conn.execute("DROP INDEX IF EXISTS idx_units_facility")
+    conn.execute("DROP INDEX IF EXISTS idx_units_building")
+
+
+# === 4. Характеристики ЖК (экран «О проекте») ===
+
+FACILITY_DETAIL_COLUMNS = (
+    ("facility_class", "TEXT"),
+    ("facility_subtype", "TEXT"),
+    ("territory_type", "TEXT"),
+    ("parking_types", "TEXT"),
+    ("payment_methods", "TEXT"),
+    ("contract_type", "TEXT"),
+    ("has_gas", "INTEGER DEFAULT 0"),
+    ("has_electricity", "INTEGER DEFAULT 0"),
+    ("heating_type", "TEXT"),
+    ("water_supply_type", "TEXT"),
+    ("sewerage_type", "TEXT"),
+    ("commissioning_year", "INTEGER"),
+    ("commissioning_quarter", "INTEGER"),
+    ("is_commissioned", "INTEGER DEFAULT 0"),
+)
+
+
+def _facility_details(conn: sqlite3.Connection):
+    existing = set(_table_columns(conn, "facilities"))
+    for name, type_ in FACILITY_DETAIL_COLUMNS:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE facilities ADD COLUMN {name} {type_}")
+
+
+# === 5. Сводки по корпусам и этажам ===
+
+def _unit_aggregates(conn: sqlite3.Connection):
+    """
+    Экраны выбора корпуса / этажа и «О проекте» читали GROUP BY по всем лотам ЖК
+    на каждое нажатие. Теперь сводки хранятся готовыми и пересчитываются при
+    изменении лотов (update_facility_stats).
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS building_stats (
+            facility_id INTEGER NOT NULL,
+            building INTEGER,
+            count INTEGER NOT NULL,
+            available INTEGER NOT NULL,
+            booked INTEGER NOT NULL,
+            sold INTEGER NOT NULL,
+            min_price INTEGER,
+            max_price INTEGER,
+            min_floor INTEGER,
+            max_floor INTEGER,
+            FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS floor_stats (
+            facility_id INTEGER NOT NULL,
+            building INTEGER,
+            floor INTEGER,
+            count INTEGER NOT NULL,
+            available INTEGER NOT NULL,
+            min_price INTEGER,
+            FOREIGN KEY (facility_id) REFERENCES facilities(id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_building_stats ON building_stats(facility_id, building)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_floor_stats ON floor_stats(facility_id, building, floor)")
+    
+    cursor.execute("DELETE FROM building_stats")
+    cursor.execute("DELETE FROM floor_stats")
+    cursor.execute("""
+        INSERT INTO building_stats
+        SELECT facility_id, building, COUNT(*),
+               SUM(status = 'available'), SUM(status = 'booked'), SUM(status = 'sold'),
+               MIN(price_rub), MAX(price_rub), MIN(floor), MAX(floor)
+        FROM units GROUP BY facility_id, building
+    """)
+    cursor.execute("""
+        INSERT INTO floor_stats
+        SELECT facility_id, building, floor, COUNT(*), SUM(status = 'available'), MIN(price_rub)
+        FROM units GROUP BY facility_id, building, floor
+    """)
+
+
+# === 6. Индексы подбора лотов ===
+
+# Все колонки фильтров подбора (db/search.py): по такому индексу SQLite проверяет
+# условия, не читая строку лота, и идёт в таблицу только за подошедшими
+SEARCH_INDEX_COLUMNS = ("rooms", "area_m2", "price_rub", "price_per_m2", "building", "floor", "status", "decoration_type")
+
+
+def _search_indexes(conn: sqlite3.Connection):
+    """
+    Индексы сортировок подбора — (ЖК, колонка сортировки, все фильтры);
+    idx_units_price / idx_units_area пересоздаются шире, префикс прежний.
+    Корпус с диапазоном этажей — одним диапазоном idx_units_floor
+    """
+    for name, column in (("idx_units_price", "price_rub"), ("idx_units_area", "area_m2"),
+                         ("idx_units_price_m2", "price_per_m2")):
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+        covered = ", ".join(c for c in SEARCH_INDEX_COLUMNS if c != column)
+        conn.execute(f"CREATE INDEX {name} ON units(facility_id, {column}, {covered})")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_units_floor ON units(facility_id, building, floor)")
+
+
+# === 7. Узкие индексы подбора ===
+
+# Фильтры, которые проверяются по индексу сортировки: цена и площадь (поиск по бюджету
+# и по площади, а цена и площадь связаны — идти по одной, читая строки ради другой, дорого),
+# комнаты и статус («2к», «свободные»). Корпус и этажи — idx_units_floor и сводки,
+# отделка и цена за м² как фильтр — редкие, проверяются по строке
+SEARCH_INDEX_FILTERS = ("price_rub", "area_m2", "rooms", "status")
+
+
+def _narrow_search_indexes(conn: sqlite3.Connection):
+    """
+    Индексы сортировок из миграции 6 — (ЖК, колонка сортировки, id, фильтры SEARCH_INDEX_FILTERS):
+    каждая запись лота обновляет все три индекса, широкие делали импорт и синхронизацию дороже.
+    id сразу за колонкой — порядок индекса совпадает с keyset-порядком страниц
+    """
+    for name, column in (("idx_units_price", "price_rub"), ("idx_units_area", "area_m2"),
+                         ("idx_units_price_m2", "price_per_m2")):
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+        covered = ", ".join(c for c in SEARCH_INDEX_FILTERS if c != column)
+        conn.execute(f"CREATE INDEX {name} ON units(facility_id, {column}, id, {covered})")
+
+
+# === Runner ===
+
+# (версия, имя, функция) — строго по возрастанию версии
+MIGRATIONS = [
+    (1, "initial", _initial),
+    (2, "shared_catalog", _shared_catalog),
+    (3, "unit_code_index", _unit_code_index),
+    (4, "facility_details", _facility_details),
+    (5, "unit_aggregates", _unit_aggregates),
+    (6, "search_indexes", _search_indexes),
+    (7, "narrow_search_indexes", _narrow_search_indexes),
+]
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate() -> int:
+    """Применить недостающие миграции; вернуть число применённых"""
+    conn = get_connection()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP
+        )
+    """)
+    conn.commit()
+    
+    current = get_version(conn)
+    pending = [m for m in MIGRATIONS if m[0] > current]
+    if not pending:
+        return 0
+    
+    # Пересборка таблиц (ALTER/RENAME) — с выключенными внешними ключами, их нельзя
+    # переключать внутри транзакции; целостность проверяем перед коммитом
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for version, name, func in pending:
+            with transaction():
+                func(conn)
+                broken = conn.execute("PRAGMA foreign_key_check").fetchall()
+                if broken:
+                    raise sqlite3.IntegrityError(f"migration {version} {name}: foreign key check failed, {len(broken)} rows")
+                conn.execute(
+                    "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                    (version, name, datetime.now().isoformat())
+                )
+            print(f"[DB] Migration {version} {name} applied")
+    finally:
+        conn.execute("PRAGMA foreign_keys = ON")
+    
+    print(f"[DB] Schema version {pending[-1][0]}: {DB_PATH}")
+    return len(pending)
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,339 @@
+"""
+Подбор лотов ЖК по любому набору параметров
+
+Критерии — dict с ключами из FILTER_KEYS (отсутствующие и None не фильтруют),
+сортировка — ключ SORTS. Страницы — keyset по (значение сортировки, id).
+
+План выбирается на каждый запрос из двух вариантов:
+- идти по индексу сортировки и остановиться, набрав страницу
+  (выгодно, когда фильтры пропускают много лотов);
+- прочитать диапазон самого узкого индекса фильтра и досортировать
+  (выгодно, когда фильтр отсекает почти всё).
+Оценка строк: корпус и этажи — точно по сводкам building_stats / floor_stats,
+цена, площадь, цена за м² — равномерно между MIN и MAX ЖК (по индексам),
+остальное — SELECTIVITY_GUESS. Выполняется самый дешёвый по оценке план;
+SEARCH_TIMEOUT_MS — только страховка от грубого промаха оценки.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from config.settings import SEARCH_TIMEOUT_MS
+from db.database import get_connection, FACILITY_OF_PROPERTY
+from db.migrations import SEARCH_INDEX_FILTERS
+
+# Диапазоны: ключ критерия -> колонка (min_<ключ> / max_<ключ>)
+RANGE_FILTERS = {
+    "area": "area_m2",
+    "price": "price_rub",
+    "price_m2": "price_per_m2",
+    "floor": "floor",
+}
+# Значение или список значений
+VALUE_FILTERS = {
+    "rooms": "rooms",
+    "building": "building",
+    "status": "status",
+    "decoration": "decoration_type",
+}
+FILTER_KEYS = tuple(
+    [f"{bound}_{key}" for key in RANGE_FILTERS for bound in ("min", "max")] + list(VALUE_FILTERS)
+)
+
+# Сортировка -> (колонка, направление, индекс)
+SORTS = {
+    "price": ("price_rub", "ASC", "idx_units_price"),
+    "area": ("area_m2", "DESC", "idx_units_area"),
+    "price_m2": ("price_per_m2", "ASC", "idx_units_price_m2"),
+}
+DEFAULT_SORT = "price"
+
+# Индекс, которым можно прочитать диапазон колонки
+RANGE_INDEXES = {
+    "area_m2": "idx_units_area",
+    "price_rub": "idx_units_price",
+    "price_per_m2": "idx_units_price_m2",
+}
+BUILDING_INDEX = "idx_units_floor"
+# Колонки индексов после facility_id (миграция 7): индексы сортировок — своя колонка,
+# id и SEARCH_INDEX_FILTERS; условия на них проверяются без чтения строки лота
+INDEX_COLUMNS = {
+    **{index: {column, *SEARCH_INDEX_FILTERS} for column, index in RANGE_INDEXES.items()},
+    BUILDING_INDEX: {"building", "floor"},
+}
+
+# Доля лотов, проходящих фильтр по значению, если точного счёта нет (комнаты, статус, отделка)
+SELECTIVITY_GUESS = 0.3
+# Во сколько раз чтение строки лота дороже шага по индексу (грубо: строки
+# одного корпуса лежат рядом, в порядке цены — вразброс)
+LOOKUP_COST = 3
+# Число найденных: точный COUNT, если по оценке он не дороже COUNT_COST шагов индекса;
+# иначе счёт до COUNT_CAP («500+»), если дойти до него не дороже COUNT_COST; иначе оценка плана
+COUNT_COST = 4000
+COUNT_CAP = 500
+# total_mode в результате
+TOTAL_EXACT = "exact"
+TOTAL_AT_LEAST = "at_least"
+TOTAL_ESTIMATE = "estimate"
+# Страховка SEARCH_TIMEOUT_MS проверяется раз в PROGRESS_OPS инструкций VM
+PROGRESS_OPS = 1000
+
+stats = {"searches": 0, "fallbacks": 0, "plans": {}, "totals": {TOTAL_EXACT: 0, TOTAL_AT_LEAST: 0, TOTAL_ESTIMATE: 0}}
+# search_units выполняется в потоках пула чтения (db/aio.py)
+_stats_lock = threading.Lock()
+
+
+# === Критерии -> SQL ===
+
+def _as_list(value) -> list:
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def _where(facility_id: int, criteria: Dict) -> Tuple[List[str], list]:
+    conditions = ["facility_id = ?"]
+    params = [facility_id]
+    for key, column in RANGE_FILTERS.items():
+        if criteria.get(f"min_{key}") is not None:
+            conditions.append(f"{column} >= ?")
+            params.append(criteria[f"min_{key}"])
+        if criteria.get(f"max_{key}") is not None:
+            conditions.append(f"{column} <= ?")
+            params.append(criteria[f"max_{key}"])
+    for key, column in VALUE_FILTERS.items():
+        if criteria.get(key) is None:
+            continue
+        values = _as_list(criteria[key])
+        conditions.append(f"{column} IN ({', '.join('?' for _ in values)})")
+        params.extend(values)
+    return conditions, params
+
+
+# === Оценка и выбор плана ===
+
+def _facility_profile(conn: sqlite3.Connection, facility_id: int) -> Dict:
+    """Число лотов и MIN/MAX индексированных колонок — по одному шагу индекса на значение"""
+    parts = ["(SELECT lots_count FROM facilities WHERE id = :f) AS total"]
+    for column in RANGE_INDEXES:
+        for fn in ("MIN", "MAX"):
+            parts.append(f"(SELECT {fn}({column}) FROM units WHERE facility_id = :f) AS {fn.lower()}_{column}")
+    row = conn.execute(f"SELECT {', '.join(parts)}", {"f": facility_id}).fetchone()
+    return dict(row)
+
+
+def _range_fraction(profile: Dict, column: str, low, high) -> float:
+    col_min, col_max = profile[f"min_{column}"], profile[f"max_{column}"]
+    if col_min is None:
+        return 0.0
+    low = col_min if low is None else max(low, col_min)
+    high = col_max if high is None else min(high, col_max)
+    if high < low:
+        return 0.0
+    if col_max == col_min:
+        return 1.0
+    return (high - low) / (col_max - col_min)
+
+
+def _building_rows(conn: sqlite3.Connection, facility_id: int, criteria: Dict) -> float:
+    """Точное число лотов корпуса (и диапазона этажей) по сводкам"""
+    buildings = _as_list(criteria["building"])
+    marks = ", ".join("?" for _ in buildings)
+    if criteria.get("min_floor") is None and criteria.get("max_floor") is None:
+        row = conn.execute(
+            f"SELECT SUM(count) FROM building_stats WHERE facility_id = ? AND building IN ({marks})",
+            [facility_id] + buildings
+        ).fetchone()
+    else:
+        row = conn.execute(
+            f"SELECT SUM(count) FROM floor_stats WHERE facility_id = ? AND building IN ({marks}) "
+            "AND floor BETWEEN ? AND ?",
+            [facility_id] + buildings + [
+                criteria["min_floor"] if criteria.get("min_floor") is not None else -10 ** 9,
+                criteria["max_floor"] if criteria.get("max_floor") is not None else 10 ** 9,
+            ]
+        ).fetchone()
+    return row[0] or 0
+
+
+def plan_search(conn: sqlite3.Connection, facility_id: int, criteria: Dict, sort: str, limit: int) -> Dict:
+    """
+    Выбрать индексы страницы и COUNT: {"candidates" — [(оценка в шагах индекса, индекс)]
+    от дешёвого к дорогому, "matches" — оценка подходящих лотов, "count_index",
+    "count_cost" — оценка точного COUNT, "cap_cost" — оценка счёта до COUNT_CAP}
+    """
+    profile = _facility_profile(conn, facility_id)
+    total = profile["total"] or 0
+    sort_column, _, sort_index = SORTS[sort]
+
+    # Индекс -> доля лотов в его диапазоне; прочие фильтры — в others
+    ranges = {}
+    others = []
+    for key, column in RANGE_FILTERS.items():
+        low, high = criteria.get(f"min_{key}"), criteria.get(f"max_{key}")
+        if low is None and high is None:
+            continue
+        if column in RANGE_INDEXES:
+            ranges[RANGE_INDEXES[column]] = _range_fraction(profile, column, low, high)
+        elif criteria.get("building") is None:
+            # Этажи без корпуса: индекс (facility_id, building, floor) не помогает
+            others.append(SELECTIVITY_GUESS)
+    if criteria.get("building") is not None:
+        ranges[BUILDING_INDEX] = _building_rows(conn, facility_id, criteria) / total if total else 0.0
+    for key in ("rooms", "status", "decoration"):
+        if criteria.get(key) is not None:
+            others.append(min(1.0, SELECTIVITY_GUESS * len(_as_list(criteria[key]))))
+
+    selectivity = 1.0
+    for fraction in list(ranges.values()) + others:
+        selectivity *= fraction
+    matches = total * selectivity
+
+    constrained = {column for key, column in RANGE_FILTERS.items()
+                   if criteria.get(f"min_{key}") is not None or criteria.get(f"max_{key}") is not None}
+    constrained |= {column for key, column in VALUE_FILTERS.items() if criteria.get(key) is not None}
+
+    def row_cost(index: str, needed: set = constrained) -> float:
+        # Строку, не прошедшую фильтр по индексу, читать не нужно
+        return 1 if needed <= INDEX_COLUMNS[index] else LOOKUP_COST
+
+    # По индексу сортировки: строк в его диапазоне, из них подходит доля rest;
+    # остановимся, набрав страницу
+    sort_fraction = ranges.get(sort_index, 1.0)
+    rest = selectivity / sort_fraction if sort_fraction else 0.0
+    scanned = total * sort_fraction
+    if rest > 0:
+        scanned = min(scanned, (limit + 1) / rest)
+    candidates = [(scanned * row_cost(sort_index), 0, sort_index)]
+    # По индексу фильтра: весь диапазон, все подошедшие — в сортировку (за колонкой
+    # сортировки, которой нет в индексе, — в строку лота); ничья — в пользу индекса сортировки
+    for index, fraction in ranges.items():
+        if index != sort_index:
+            sort_cost = 1 if sort_column in INDEX_COLUMNS[index] else LOOKUP_COST
+            candidates.append((total * fraction * row_cost(index) + matches * sort_cost, 1, index))
+    candidates.sort()
+
+    # COUNT — по индексу, где он дешевле всего (без фильтров — по индексу сортировки);
+    # считаются только лоты со значением сортировки — те, до которых дойдут страницы
+    counted = constrained | {sort_column}
+    count_cost, count_index = min(
+        (total * ranges.get(i, 1.0) * row_cost(i, counted), i) for i in list(ranges) + [sort_index]
+    )
+    # До COUNT_CAP подходящих доходим за долю COUNT_CAP / matches диапазона
+    cap_cost = count_cost * min(1.0, COUNT_CAP / matches) if matches else count_cost
+
+    return {
+        "candidates": [(cost, index) for cost, _, index in candidates],
+        "matches": matches,
+        "count_index": count_index,
+        "count_cost": count_cost,
+        "cap_cost": cap_cost,
+    }
+
+
+# === Поиск ===
+
+def _fetch(conn: sqlite3.Connection, query: str, params: list, timeout_ms: float = None):
+    """Строки запроса или None, если он не успел за timeout_ms"""
+    if timeout_ms is None:
+        return conn.execute(query, params).fetchall()
+    deadline = time.perf_counter() + timeout_ms / 1000
+    conn.set_progress_handler(lambda: time.perf_counter() > deadline, PROGRESS_OPS)
+    try:
+        return conn.execute(query, params).fetchall()
+    except sqlite3.OperationalError as e:
+        if "interrupted" not in str(e):
+            raise
+        return None
+    finally:
+        conn.set_progress_handler(None, 0)
+
+
+def _count(conn: sqlite3.Connection, plan: Dict, where: str, params: list, shown: int) -> Tuple[int, str]:
+    """(total, total_mode); where — с условием на значение сортировки, как у страниц"""
+    source = f"FROM units INDEXED BY {plan['count_index']} WHERE {where}"
+    rows = None
+    if plan["count_cost"] <= COUNT_COST:
+        rows = _fetch(conn, f"SELECT COUNT(*) {source}", params, SEARCH_TIMEOUT_MS)
+    elif plan["cap_cost"] <= COUNT_COST:
+        rows = _fetch(conn, f"SELECT COUNT(*) FROM (SELECT 1 {source} LIMIT ?)", params + [COUNT_CAP], SEARCH_TIMEOUT_MS)
+    if rows is not None:
+        count = rows[0][0]
+        return count, TOTAL_AT_LEAST if count >= COUNT_CAP else TOTAL_EXACT
+    # Не меньше, чем уже видно на странице
+    return max(int(round(plan["matches"])), shown), TOTAL_ESTIMATE
+
+
+def search_units(property_id: int, criteria: Dict, sort: str = DEFAULT_SORT,
+                 after: Tuple[float, int] = None, before: Tuple[float, int] = None, limit: int = 15) -> Dict:
+    """
+    Страница подбора: {"units", "has_prev", "has_next", "total", "total_mode", "index"}.
+    after / before — (значение сортировки, id) крайнего лота соседней страницы.
+    total (total_mode — точно / не меньше / оценка) только для первой страницы, иначе None.
+    Лоты без значения в колонке сортировки не попадают в выдачу
+    """
+    conn = get_connection()
+    row = conn.execute(f"SELECT {FACILITY_OF_PROPERTY}", (property_id,)).fetchone()
+    facility_id = row[0] if row else None
+    if facility_id is None:
+        return {"units": [], "has_prev": False, "has_next": False, "total": 0, "total_mode": TOTAL_EXACT, "index": None}
+
+    sort_column, direction, _ = SORTS[sort]
+    plan = plan_search(conn, facility_id, criteria, sort, limit)
+    conditions, params = _where(facility_id, criteria)
+    where = " AND ".join(conditions + [f"{sort_column} IS NOT NULL"])
+    count_params = list(params)
+
+    # Назад — идём в обратном порядке от первого лота и разворачиваем
+    backwards = before is not None
+    cursor = before if backwards else after
+    forward = (direction == "ASC") != backwards
+    tail = where
+    if cursor is not None:
+        tail += f" AND ({sort_column}, id) {'>' if forward else '<'} (?, ?)"
+        params += list(cursor)
+    order = f"ORDER BY {sort_column} {'ASC' if forward else 'DESC'}, id {'ASC' if forward else 'DESC'}"
+    params.append(limit + 1)
+
+    # Страница выбирается по индексу (id), строки лотов читаются только для неё
+    def fetch_page(indexed_by: str, timeout_ms: float = None):
+        query = f"SELECT * FROM units WHERE id IN (SELECT id FROM units {indexed_by} WHERE {tail} {order} LIMIT ?) {order}"
+        return _fetch(conn, query, params, timeout_ms)
+
+    index = plan["candidates"][0][1]
+    rows = fetch_page(f"INDEXED BY {index}", SEARCH_TIMEOUT_MS)
+    fallbacks = 0
+    if rows is None:
+        # Оценка грубо промахнулась — план выбирает SQLite
+        print(f"[SEARCH] {index} over {SEARCH_TIMEOUT_MS:.0f} ms, retrying with SQLite plan")
+        fallbacks, index = 1, "sqlite"
+        rows = fetch_page("")
+
+    units = [dict(r) for r in rows[:limit]]
+    if backwards:
+        units.reverse()
+    result = {
+        "units": units,
+        "has_prev": len(rows) > limit if backwards else after is not None,
+        "has_next": True if backwards else len(rows) > limit,
+        "total": None,
+        "total_mode": None,
+        "index": index,
+    }
+
+    if cursor is None:
+        shown = len(units) + (1 if result["has_next"] else 0)
+        result["total"], result["total_mode"] = _count(conn, plan, where, count_params, shown)
+
+    with _stats_lock:
+        stats["searches"] += 1
+        stats["fallbacks"] += fallbacks
+        stats["plans"][index] = stats["plans"].get(index, 0) + 1
+        if result["total_mode"] is not None:
+            stats["totals"][result["total_mode"]] += 1
+    return result
+
+
+def get_stats() -> Dict:
+    with _stats_lock:
+        return {**stats, "plans": dict(stats["plans"]), "totals": dict(stats["totals"])}
@@ -0,0 +1,176 @@
+"""
+Состояние диалога (user_state) в памяти процесса
+Чтения — из LRU-кэша, в базу только промахи. Записи в режиме write_back
+копятся как «грязные» и уходят в user_state одной транзакцией раз в
+flush_interval секунд и при остановке; при падении процесса теряется не
+больше последнего интервала, в базе всегда целые строки на момент сброса.
+В режиме write_through каждая запись сразу идёт в базу, кэш только для чтения.
+Процесс с ботом должен быть один — кэш не знает о чужих записях.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from db import database
+
+WRITE_BACK = "write_back"
+WRITE_THROUGH = "write_through"
+
+
+class UserStateStore:
+    """reader / writer — db.aio.run_read / run_write"""
+
+    def __init__(self, reader: Callable[..., Awaitable[Any]], writer: Callable[..., Awaitable[Any]],
+                 capacity: int = 10000, flush_interval: float = 1.0, durability: str = WRITE_BACK):
+        if durability not in (WRITE_BACK, WRITE_THROUGH):
+            raise ValueError(f"Unknown state durability: {durability}")
+        self.reader = reader
+        self.writer = writer
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.durability = durability
+
+        # user_id -> строка user_state; порядок — от давно использованных к свежим
+        self._states: "OrderedDict[int, Dict]" = OrderedDict()
+        # user_id -> строка, ещё не записанная в базу
+        self._dirty: Dict[int, Dict] = {}
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._pending_flush: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "hits": 0, "misses": 0, "writes": 0, "evictions": 0,
+            "flushes": 0, "flushed_rows": 0, "flush_errors": 0, "flush_time": 0.0,
+        }
+
+    # === Lifecycle ===
+
+    def start(self):
+        """Запустить периодический сброс (нужен работающий event loop)"""
+        self._flush_lock = asyncio.Lock()
+        if self.durability == WRITE_BACK and self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop(), name="user-state-flush")
+
+    async def stop(self):
+        """Остановить сброс по таймеру и записать всё грязное"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    # === Чтение / запись ===
+
+    async def get(self, user_id: int) -> Dict:
+        state = self._states.get(user_id)
+        if state is not None:
+            self._states.move_to_end(user_id)
+            self.stats["hits"] += 1
+            return dict(state)
+
+        self.stats["misses"] += 1
+        state = await self.reader(database.get_user_state, user_id)
+        # Пока читали, могли записать более свежее
+        if user_id in self._states:
+            return dict(self._states[user_id])
+        self._put(user_id, state)
+        return dict(state)
+
+    async def set(self, user_id: int, property_id: int = None, lot_code: str = None,
+                  state: str = None, state_data: str = None):
+        row = {
+            "user_id": user_id,
+            "current_property_id": property_id,
+            "current_lot_code": lot_code,
+            "state": state,
+            "state_data": state_data,
+            "updated_at": datetime.now().isoformat(),
+        }
+        self.stats["writes"] += 1
+        if self.durability == WRITE_THROUGH:
+            # В память — только то, что уже в базе: запись упала — get() отдаёт прежнее
+            await self.writer(database.save_user_states, [row])
+            self._put(user_id, row)
+        else:
+            # Грязной строка становится до _put — иначе вытеснение может выкинуть её же
+            self._dirty[user_id] = row
+            self._put(user_id, row)
+
+    async def clear(self, user_id: int):
+        await self.set(user_id)
+
+    def forget_property(self, property_id: int):
+        """ЖК удалён — как ON DELETE SET NULL в базе"""
+        for row in self._states.values():
+            if row["current_property_id"] == property_id:
+                row["current_property_id"] = None
+
+    def _put(self, user_id: int, row: Dict):
+        self._states[user_id] = row
+        self._states.move_to_end(user_id)
+        if len(self._states) > self.capacity:
+            self._evict()
+
+    def _evict(self):
+        # Грязные не выкидываем, пока они не в базе
+        for user_id in list(self._states):
+            if len(self._states) <= self.capacity:
+                return
+            if user_id not in self._dirty:
+                del self._states[user_id]
+                self.stats["evictions"] += 1
+        # Кэш переполнен грязными — сбросить, не дожидаясь таймера
+        if self._pending_flush is None or self._pending_flush.done():
+            self._pending_flush = asyncio.ensure_future(self.flush())
+
+    # === Сброс в базу ===
+
+    async def flush(self) -> int:
+        """Записать грязные состояния одной транзакцией; вернуть число строк"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._dirty:
+                return 0
+            # Пока пишем, строки остаются грязными: их не вытеснят из кэша
+            # и не перечитают из базы старыми
+            batch = dict(self._dirty)
+
+            started = time.perf_counter()
+            try:
+                await self.writer(database.save_user_states, list(batch.values()))
+            except Exception as e:
+                self.stats["flush_errors"] += 1
+                print(f"[STATE] Flush of {len(batch)} states failed: {e}")
+                return 0
+
+            # Перезаписанные во время сброса уйдут следующим
+            for user_id, row in batch.items():
+                if self._dirty.get(user_id) is row:
+                    del self._dirty[user_id]
+
+            self.stats["flushes"] += 1
+            self.stats["flushed_rows"] += len(batch)
+            self.stats["flush_time"] += time.perf_counter() - started
+            # Вытеснение ждало сброса — теперь лишние строки чистые
+            if len(self._states) > self.capacity:
+                self._evict()
+            return len(batch)
+
+    def get_stats(self) -> Dict:
+        result = dict(self.stats)
+        lookups = self.stats["hits"] + self.stats["misses"]
+        result["hit_rate"] = round(self.stats["hits"] / lookups, 3) if lookups else 0
+        result["size"] = len(self._states)
+        result["dirty"] = len(self._dirty)
+        result["durability"] = self.durability
+        result["flush_time"] = round(self.stats["flush_time"], 3)
+        return result
@@ -3,11 +3,9 @@
 """
 
 from config.settings import format_price, format_price_full
-from db.database import (
-    get_property, get_unit_by_code, get_building,
-    get_property_custom
-)
+from db.aio import get_lot_context
 from services.calculations import calc_roi, calc_compare_deposit, CB_RATE
+from handlers.router import router
 
 
 def format_compare_result(unit: dict, prop: dict, compare: dict, roi: dict) -> str:
@@ -41,13 +39,12 @@ def format_compare_result(unit: dict, prop: dict, compare: dict, roi: dict) -> s
     return text
 
 
+@router.callback("compare", int, str)
 async def handle_compare(edit_message, user_id: int, property_id: int, code: str, message_id: int):
     """Показать сравнение с депозитом"""
-    unit = get_unit_by_code(property_id, code)
-    prop = get_property(property_id)
-    custom = get_property_custom(property_id) or {}
+    ctx = await get_lot_context(property_id, code)
     
-    if not unit or not prop:
+    if not ctx:
         await edit_message(
             chat_id=user_id,
             message_id=message_id,
@@ -56,19 +53,13 @@ async def handle_compare(edit_message, user_id: int, property_id: int, code: str
         )
         return
     
-    # Получаем данные корпуса
-    building = None
-    if unit.get("building_id"):
-        building = get_building(unit["building_id"])
-    
-    is_completed = building.get("is_completed", False) if building else False
-    commissioning_timestamp = building.get("commissioning_timestamp") if building else None
+    unit, prop, custom = ctx.unit, ctx.prop, ctx.custom
     
     # Сначала считаем ROI
     roi = calc_roi(
         unit_price=unit["price_rub"],
-        commissioning_timestamp=commissioning_timestamp,
-        is_completed=is_completed,
+        commissioning_timestamp=ctx.commissioning_timestamp,
+        is_completed=ctx.is_completed,
         rental_daily_rate=custom.get("rental_daily_rate") or 0,
         occupancy_rate=custom.get("occupancy_rate") or 70,
         operating_expenses_pct=custom.get("operating_expenses_pct") or 10,
@@ -107,26 +98,20 @@ async def handle_compare(edit_message, user_id: int, property_id: int, code: str
     )
 
 
+@router.callback("compare_years", int, str, int)
 async def handle_compare_years(edit_message, user_id: int, property_id: int, code: str, years: int, message_id: int):
     """Сравнение на разные сроки"""
-    unit = get_unit_by_code(property_id, code)
-    prop = get_property(property_id)
-    custom = get_property_custom(property_id) or {}
+    ctx = await get_lot_context(property_id, code)
     
-    if not unit or not prop:
+    if not ctx:
         return
     
-    building = None
-    if unit.get("building_id"):
-        building = get_building(unit["building_id"])
-    
-    is_completed = building.get("is_completed", False) if building else False
-    commissioning_timestamp = building.get("commissioning_timestamp") if building else None
+    unit, prop, custom = ctx.unit, ctx.prop, ctx.custom
     
     roi = calc_roi(
         unit_price=unit["price_rub"],
-        commissioning_timestamp=commissioning_timestamp,
-        is_completed=is_completed,
+        commissioning_timestamp=ctx.commissioning_timestamp,
+        is_completed=ctx.is_completed,
         rental_daily_rate=custom.get("rental_daily_rate") or 0,
         occupancy_rate=custom.get("occupancy_rate") or 70,
         operating_expenses_pct=custom.get("operating_expenses_pct") or 10,
@@ -6,9 +6,9 @@ from config.settings import (
     BTN_KP, BTN_ROI, BTN_COMPARE, BTN_AI, BTN_BACK_TO_SEARCH,
     States, format_price, format_price_full, format_area, format_rooms, format_price_per_m2
 )
-from db.database import (
-    get_property, get_unit_by_code, get_building, set_user_state
-)
+from db.aio import get_lot_context, set_user_state
+from db.database import LotContext
+from handlers.router import router
 
 
 def build_lot_menu_keyboard(property_id: int, code: str) -> dict:
@@ -23,18 +23,14 @@ def build_lot_menu_keyboard(property_id: int, code: str) -> dict:
     }
 
 
-def format_lot_menu(unit: dict, property_id: int) -> str:
+def format_lot_menu(ctx: LotContext) -> str:
     """Форматирование меню лота"""
-    prop = get_property(property_id)
+    unit = ctx.unit
     
     text = f"🏢 <b>Лот {unit['code']}</b>\n"
     
     # ЖК и корпус
-    parts = []
-    if prop:
-        parts.append(prop["name"])
-    parts.append(f"Корпус {unit['building']}")
-    parts.append(f"{unit['floor']} этаж")
+    parts = [ctx.prop["name"], f"Корпус {unit['building']}", f"{unit['floor']} этаж"]
     text += " • ".join(parts) + "\n\n"
     
     # Характеристики
@@ -47,20 +43,20 @@ def format_lot_menu(unit: dict, property_id: int) -> str:
         text += f"🔧 {unit['decoration_type']}\n"
     
     # Срок сдачи (из building)
-    if unit.get("building_id"):
-        building = get_building(unit["building_id"])
-        if building and building.get("commissioning_date"):
-            status = "✅ Сдан" if building.get("is_completed") else f"🔑 Сдача: {building['commissioning_date']}"
-            text += f"{status}\n"
+    building = ctx.building
+    if building and building.get("commissioning_date"):
+        status = "✅ Сдан" if building.get("is_completed") else f"🔑 Сдача: {building['commissioning_date']}"
+        text += f"{status}\n"
     
     return text
 
 
+@router.callback("lot", int, str)
 async def handle_lot_menu(edit_message, user_id: int, property_id: int, code: str, message_id: int):
     """Показать меню лота"""
-    unit = get_unit_by_code(property_id, code)
+    ctx = await get_lot_context(property_id, code)
     
-    if not unit:
+    if not ctx:
         await edit_message(
             chat_id=user_id,
             message_id=message_id,
@@ -69,9 +65,9 @@ async def handle_lot_menu(edit_message, user_id: int, property_id: int, code: st
         )
         return
     
-    set_user_state(user_id, property_id=property_id, lot_code=code, state=States.LOT_MENU)
+    await set_user_state(user_id, property_id=property_id, lot_code=code, state=States.LOT_MENU)
     
-    text = format_lot_menu(unit, property_id)
+    text = format_lot_menu(ctx)
     keyboard = build_lot_menu_keyboard(property_id, code)
     
     await edit_message(
@@ -85,9 +81,9 @@ async def handle_lot_menu(edit_message, user_id: int, property_id: int, code: st
 
 async def handle_lot_from_miniapp(send_message, user_id: int, property_id: int, code: str):
     """Обработка выбора лота из Mini App"""
-    unit = get_unit_by_code(property_id, code)
+    ctx = await get_lot_context(property_id, code)
     
-    if not unit:
+    if not ctx:
         await send_message(
             chat_id=user_id,
             text=f"❌ Лот {code} не найден",
@@ -95,9 +91,9 @@ async def handle_lot_from_miniapp(send_message, user_id: int, property_id: int,
         )
         return
     
-    set_user_state(user_id, property_id=property_id, lot_code=code, state=States.LOT_MENU)
+    await set_user_state(user_id, property_id=property_id, lot_code=code, state=States.LOT_MENU)
     
-    text = format_lot_menu(unit, property_id)
+    text = format_lot_menu(ctx)
     keyboard = build_lot_menu_keyboard(property_id, code)
     
     await send_message(
@@ -2,9 +2,12 @@
 Обработчик добавления/удаления ЖК
 """
 
-from config.settings import States, BTN_BACK, format_price
-from db.database import set_user_state, get_user_state, get_user_properties
+from config.settings import States, BTN_BACK, IMPORT_WORKERS, IMPORT_PROGRESS_INTERVAL, format_price
+from db.aio import set_user_state, get_user_state, get_user_properties
 from services.ygroup import search_facilities, import_facility
+from services.import_queue import ImportQueue, DUPLICATE
+from services.telegram import PRIORITY_BULK
+from handlers.router import router
 
 
 def build_search_results_keyboard(facilities: list) -> dict:
@@ -30,9 +33,10 @@ def build_search_results_keyboard(facilities: list) -> dict:
     return {"inline_keyboard": keyboard}
 
 
+@router.callback("add_property")
 async def handle_add_property(send_message, edit_message, user_id: int, message_id: int = None):
     """Начало добавления ЖК — запрос поиска"""
-    set_user_state(user_id, state=States.ADD_PROPERTY_SEARCH)
+    await set_user_state(user_id, state=States.ADD_PROPERTY_SEARCH)
     
     text = (
         "🔍 <b>Добавление ЖК</b>\n\n"
@@ -61,10 +65,11 @@ async def handle_add_property(send_message, edit_message, user_id: int, message_
         )
 
 
+@router.state(States.ADD_PROPERTY_SEARCH)
 async def handle_search_property(send_message, user_id: int, query: str):
     """Поиск ЖК по названию"""
     # Ищем в YGroup
-    facilities = search_facilities(query)
+    facilities = await search_facilities(query)
     
     if not facilities:
         text = (
@@ -77,7 +82,7 @@ async def handle_search_property(send_message, user_id: int, query: str):
     else:
         text = f"🔍 Найдено {len(facilities)} ЖК по запросу «{query}»:\n\nВыбери для добавления:"
         keyboard = build_search_results_keyboard(facilities)
-        set_user_state(user_id, state=States.ADD_PROPERTY_SELECT)
+        await set_user_state(user_id, state=States.ADD_PROPERTY_SELECT)
     
     await send_message(
         chat_id=user_id,
@@ -87,19 +92,31 @@ async def handle_search_property(send_message, user_id: int, query: str):
     )
 
 
-async def handle_import_facility(send_message, edit_message, user_id: int, facility_id: int, message_id: int):
-    """Импорт выбранного ЖК"""
-    # Показываем статус загрузки
+BACK_TO_LIST_KEYBOARD = {"inline_keyboard": [[
+    {"text": "🔙 К списку ЖК", "callback_data": "back_to_list"}
+]]}
+
+
+async def show_import_progress(edit_message, user_id: int, message_id: int, progress: dict):
+    """Промежуточный статус импорта (фоновый приоритет — не мешает ответам)"""
+    text = "⏳ Загружаю данные ЖК из YGroup...\n\n"
+    if progress["clusters_total"]:
+        text += (
+            f"🏢 Корпусов: {progress['clusters_done']} из {progress['clusters_total']}\n"
+            f"🏠 Лотов загружено: {progress['lots_loaded']}"
+        )
+    
     await edit_message(
         chat_id=user_id,
         message_id=message_id,
-        text="⏳ Загружаю данные ЖК из YGroup...\n\nЭто может занять несколько секунд.",
-        parse_mode="HTML"
+        text=text,
+        parse_mode="HTML",
+        priority=PRIORITY_BULK
     )
-    
-    # Импортируем
-    result = import_facility(user_id, facility_id)
-    
+
+
+async def show_import_result(edit_message, user_id: int, message_id: int, result: dict):
+    """Итог импорта"""
     if result["success"]:
         text = (
             f"✅ <b>ЖК добавлен!</b>\n\n"
@@ -110,9 +127,13 @@ async def handle_import_facility(send_message, edit_message, user_id: int, facil
     else:
         text = f"❌ Ошибка: {result.get('error', 'Неизвестная ошибка')}"
     
-    keyboard = {"inline_keyboard": [[
-        {"text": "🔙 К списку ЖК", "callback_data": "back_to_list"}
-    ]]}
+    keyboard = BACK_TO_LIST_KEYBOARD
+    if result.get("retryable"):
+        # YGroup не ответил — в каталог ничего не записано, можно просто повторить
+        keyboard = {"inline_keyboard": [
+            [{"text": "🔄 Повторить", "callback_data": f"import_facility:{result['ygroup_facility_id']}"}],
+            *BACK_TO_LIST_KEYBOARD["inline_keyboard"],
+        ]}
     
     await edit_message(
         chat_id=user_id,
@@ -121,3 +142,27 @@ async def handle_import_facility(send_message, edit_message, user_id: int, facil
         parse_mode="HTML",
         reply_markup=keyboard
     )
+
+
+# Запускается из app.py / run_polling.py
+import_queue = ImportQueue(
+    import_facility, show_import_progress, show_import_result,
+    workers=IMPORT_WORKERS, progress_interval=IMPORT_PROGRESS_INTERVAL
+)
+
+
+@router.callback("import_facility", str)
+async def handle_import_facility(send_message, edit_message, user_id: int, facility_id: str, message_id: int):
+    """Импорт выбранного ЖК — ставим в очередь, результат придёт правкой сообщения"""
+    # Повторное нажатие того же риэлтора: его импорт уже идёт и правит своё сообщение
+    if import_queue.submit(user_id, facility_id, message_id, edit_message) == DUPLICATE:
+        return
+    
+    # submit не уступает event loop: статус встаёт в исходящую очередь раньше, чем
+    # воркер начнёт импорт, и не затрёт прогресс или результат (порядок в чате сохраняется)
+    await edit_message(
+        chat_id=user_id,
+        message_id=message_id,
+        text="⏳ Загружаю данные ЖК из YGroup...\n\nЭто может занять несколько секунд.",
+        parse_mode="HTML"
+    )
@@ -6,7 +6,8 @@ from config.settings import (
     BTN_SELECT_LOT, BTN_SEARCH, BTN_ABOUT, BTN_BACK_TO_LIST,
     MINIAPP_URL, States, format_price
 )
-from db.database import get_property, set_user_state, get_building_stats
+from db.aio import get_property, set_user_state, get_building_stats
+from handlers.router import router
 
 
 def build_property_menu_keyboard(property_id: int) -> dict:
@@ -50,9 +51,10 @@ def format_property_menu(prop: dict) -> str:
     return text
 
 
+@router.callback("property", int)
 async def handle_property_menu(edit_message, user_id: int, property_id: int, message_id: int):
     """Показать меню ЖК"""
-    prop = get_property(property_id)
+    prop = await get_property(property_id)
     
     if not prop:
         await edit_message(
@@ -64,7 +66,7 @@ async def handle_property_menu(edit_message, user_id: int, property_id: int, mes
         return
     
     # Сохраняем текущий ЖК
-    set_user_state(user_id, property_id=property_id, state=States.PROPERTY_MENU)
+    await set_user_state(user_id, property_id=property_id, state=States.PROPERTY_MENU)
     
     text = format_property_menu(prop)
     keyboard = build_property_menu_keyboard(property_id)
@@ -78,9 +80,10 @@ async def handle_property_menu(edit_message, user_id: int, property_id: int, mes
     )
 
 
+@router.callback("about", int)
 async def handle_about_property(edit_message, user_id: int, property_id: int, message_id: int):
     """Информация о ЖК"""
-    prop = get_property(property_id)
+    prop = await get_property(property_id)
     
     if not prop:
         return
@@ -192,11 +195,14 @@ async def handle_about_property(edit_message, user_id: int, property_id: int, me
         text += f"<b>📝 Описание:</b>\n{desc}\n\n"
     
     # Статистика по корпусам
-    stats = get_building_stats(property_id)
+    stats = await get_building_stats(property_id)
     if stats:
         text += "<b>🏢 Корпуса:</b>\n"
         for s in stats:
-            text += f"• Корпус {s['building']}: {s['count']} лотов, "
+            text += f"• Корпус {s['building']}: {s['count']} лотов"
+            if s['available'] != s['count']:
+                text += f" (свободно {s['available']})"
+            text += ", "
             text += f"этажи {s['min_floor']}-{s['max_floor']}, "
             text += f"{format_price(s['min_price'])} - {format_price(s['max_price'])}\n"
     
@@ -0,0 +1,143 @@
+"""
+Роутер callback-кнопок и FSM-состояний
+
+Хендлер объявляет префикс callback_data и типы аргументов:
+
+    @router.callback("lot", int, str)
+    async def handle_lot_menu(edit_message, user_id, property_id, code, message_id): ...
+
+Роутер делает один поиск по словарю, один раз разбирает аргументы
+и передаёт контекст (send_message, edit_message, user_id, message_id) по имени.
+"""
+
+import inspect
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Параметры, которые роутер подставляет из контекста апдейта
+CONTEXT_PARAMS = {"send_message", "edit_message", "user_id", "message_id"}
+
+# Сколько разных неизвестных префиксов помним (защита от мусорных callback_data)
+MAX_UNKNOWN_PREFIXES = 100
+
+
+class Route:
+    def __init__(self, name: str, handler: Callable, arg_types: tuple):
+        self.name = name
+        self.handler = handler
+        self.arg_types = arg_types
+
+        params = list(inspect.signature(handler).parameters)
+        self.context_params = [p for p in params if p in CONTEXT_PARAMS]
+        self.arg_params = [p for p in params if p not in CONTEXT_PARAMS]
+
+        if len(self.arg_params) != len(arg_types):
+            raise ValueError(f"{handler.__name__}: expected {len(self.arg_params)} arg types, got {len(arg_types)}")
+
+        self.stats = {"calls": 0, "errors": 0, "bad_args": 0, "total_time": 0.0}
+
+    def parse(self, raw: List[str]) -> Optional[list]:
+        if len(raw) != len(self.arg_types):
+            return None
+        try:
+            return [t(v) for t, v in zip(self.arg_types, raw)]
+        except (TypeError, ValueError):
+            return None
+
+    async def __call__(self, context: Dict[str, Any], args: list):
+        kwargs = {p: context.get(p) for p in self.context_params}
+        kwargs.update(zip(self.arg_params, args))
+
+        self.stats["calls"] += 1
+        started = time.perf_counter()
+        try:
+            await self.handler(**kwargs)
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.stats["total_time"] += time.perf_counter() - started
+
+
+class Router:
+    def __init__(self):
+        self.callbacks: Dict[str, Route] = {}
+        self.states: Dict[str, Route] = {}
+        self.unknown_callbacks: Dict[str, int] = {}
+        self.fallback_messages = 0
+
+    # === Регистрация ===
+
+    def callback(self, prefix: str, *arg_types):
+        """callback_data вида 'prefix' или 'prefix:arg1:arg2'"""
+        def decorator(handler):
+            if prefix in self.callbacks:
+                raise ValueError(f"Callback prefix '{prefix}' already registered")
+            self.callbacks[prefix] = Route(f"cb:{prefix}", handler, arg_types)
+            return handler
+        return decorator
+
+    def state(self, state: str):
+        """Текстовое сообщение в FSM-состоянии; текст — единственный аргумент"""
+        def decorator(handler):
+            if state in self.states:
+                raise ValueError(f"State '{state}' already registered")
+            self.states[state] = Route(f"state:{state}", handler, (str,))
+            return handler
+        return decorator
+
+    # === Диспетчеризация ===
+
+    async def dispatch_callback(self, data: str, context: Dict[str, Any]) -> bool:
+        prefix, _, rest = data.partition(":")
+        route = self.callbacks.get(prefix)
+
+        if route is None:
+            self._record_unknown(prefix)
+            print(f"[ROUTER] Unknown callback: {data}")
+            return False
+
+        # Последний аргумент может содержать ':'
+        raw = rest.split(":", len(route.arg_types) - 1) if rest else []
+        args = route.parse(raw)
+        if args is None:
+            route.stats["bad_args"] += 1
+            print(f"[ROUTER] Bad callback args: {data}")
+            return False
+
+        await route(context, args)
+        return True
+
+    async def dispatch_state(self, state: Optional[str], text: str, context: Dict[str, Any]) -> bool:
+        route = self.states.get(state)
+        if route is None:
+            self.fallback_messages += 1
+            return False
+
+        await route(context, [text])
+        return True
+
+    def _record_unknown(self, prefix: str):
+        if prefix in self.unknown_callbacks or len(self.unknown_callbacks) < MAX_UNKNOWN_PREFIXES:
+            self.unknown_callbacks[prefix] = self.unknown_callbacks.get(prefix, 0) + 1
+        else:
+            self.unknown_callbacks["*"] = self.unknown_callbacks.get("*", 0) + 1
+
+    def get_stats(self) -> Dict:
+        routes = {}
+        for route in list(self.callbacks.values()) + list(self.states.values()):
+            s = route.stats
+            routes[route.name] = {
+                "calls": s["calls"],
+                "errors": s["errors"],
+                "bad_args": s["bad_args"],
+                "avg_ms": round(s["total_time"] / s["calls"] * 1000, 2) if s["calls"] else 0,
+            }
+        return {
+            "routes": routes,
+            "unknown_callbacks": dict(self.unknown_callbacks),
+            "fallback_messages": self.fallback_messages,
+        }
+
+
+router = Router()
@@ -1,16 +1,22 @@
 """
-Ручной поиск лотов: по корпусу, площади, бюджету, номеру
+Ручной поиск лотов: по корпусу, площади, бюджету, номеру, подбор по параметрам
 """
 
+import json
+import re
+
 from config.settings import (
-    BTN_BY_BUILDING, BTN_BY_AREA, BTN_BY_BUDGET, BTN_BY_CODE, BTN_BACK,
-    States, format_price, format_area, format_rooms
+    BTN_BY_BUILDING, BTN_BY_AREA, BTN_BY_BUDGET, BTN_BY_CODE, BTN_BY_FILTERS, BTN_BACK,
+    BTN_PREV_PAGE, BTN_NEXT_PAGE, BTN_SORT_PRICE, BTN_SORT_AREA, BTN_SORT_PRICE_M2, SEARCH_PAGE_SIZE,
+    States, format_price, format_area, format_rooms, format_price_per_m2
 )
-from db.database import (
+from db.aio import (
     get_property, get_user_state, set_user_state,
     get_building_stats, get_available_floors, get_property_units,
-    get_units_by_budget, get_units_by_area, get_unit_by_code
+    search_units, get_lot_context
 )
+from db.search import SORTS, DEFAULT_SORT, TOTAL_AT_LEAST, TOTAL_ESTIMATE
+from handlers.router import router
 
 
 def build_search_menu_keyboard(property_id: int) -> dict:
@@ -20,6 +26,7 @@ def build_search_menu_keyboard(property_id: int) -> dict:
             [{"text": BTN_BY_AREA, "callback_data": f"search_area:{property_id}"}],
             [{"text": BTN_BY_BUDGET, "callback_data": f"search_budget:{property_id}"}],
             [{"text": BTN_BY_CODE, "callback_data": f"search_code:{property_id}"}],
+            [{"text": BTN_BY_FILTERS, "callback_data": f"search_filters:{property_id}"}],
             [{"text": BTN_BACK, "callback_data": f"property:{property_id}"}]
         ]
     }
@@ -57,7 +64,7 @@ def build_floors_keyboard(property_id: int, building: int, floors: list) -> dict
     return {"inline_keyboard": keyboard}
 
 
-def build_units_keyboard(property_id: int, units: list, back_callback: str) -> dict:
+def build_units_keyboard(property_id: int, units: list, back_callback: str, extra_rows: list = None) -> dict:
     keyboard = []
     for u in units:
         status_icon = ""
@@ -70,19 +77,246 @@ def build_units_keyboard(property_id: int, units: list, back_callback: str) -> d
             "text": label,
             "callback_data": f"lot:{property_id}:{u['code']}"
         }])
+    for row in extra_rows or []:
+        if row:
+            keyboard.append(row)
     keyboard.append([{"text": BTN_BACK, "callback_data": back_callback}])
     return {"inline_keyboard": keyboard}
 
 
+# === Выдача подбора страницами (площадь, бюджет, параметры) ===
+# В state_data — {"filters", "sort", "total", "total_mode"}, курсор страницы — в callback_data:
+# page:<property_id>:<номер страницы>:<n|p>:<значение сортировки>:<id лота> (укладывается в 64 байта)
+
+SORT_BUTTONS = (
+    ("price", BTN_SORT_PRICE),
+    ("area", BTN_SORT_AREA),
+    ("price_m2", BTN_SORT_PRICE_M2),
+)
+
+
+def _range_text(low, high, fmt) -> str:
+    if low is not None and high is not None:
+        return f"{fmt(low)} - {fmt(high)}" if low != high else fmt(low)
+    if low is not None:
+        return f"от {fmt(low)}"
+    return f"до {fmt(high)}"
+
+
+def describe_filters(filters: dict) -> str:
+    """Критерии подбора одной строкой: 'Студия, 1-комн • 30 - 45 м² • до 12 млн ₽'"""
+    parts = []
+    if filters.get("rooms") is not None:
+        parts.append(", ".join(format_rooms(r) for r in filters["rooms"]))
+    for key, fmt in (("area", format_area), ("price", format_price),
+                     ("price_m2", lambda v: format_price_per_m2(int(v)))):
+        if filters.get(f"min_{key}") is not None or filters.get(f"max_{key}") is not None:
+            parts.append(_range_text(filters.get(f"min_{key}"), filters.get(f"max_{key}"), fmt))
+    if filters.get("building") is not None:
+        parts.append(f"Корпус {filters['building']}")
+    if filters.get("min_floor") is not None or filters.get("max_floor") is not None:
+        parts.append(_range_text(filters.get("min_floor"), filters.get("max_floor"), str) + " этаж")
+    if filters.get("status") == "available":
+        parts.append("свободные")
+    if filters.get("decoration") is not None:
+        parts.append(f"отделка: {filters['decoration']}")
+    return " • ".join(parts) or "все лоты"
+
+
+def _cursor_value(value) -> str:
+    """Значение сортировки для callback_data: 12500000, 45.3"""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def format_results_page(prop: dict, search: dict, page: dict, page_no: int) -> tuple:
+    """Текст и клавиатура страницы результатов"""
+    property_id = prop["id"]
+    text = f"🔎 <b>{prop['name']}</b>\n{describe_filters(search['filters'])}"
+    
+    total = search["total"]
+    if search["total_mode"] == TOTAL_AT_LEAST:
+        text += f"\n\nНайдено {total}+ лотов • стр. {page_no}:"
+    elif search["total_mode"] == TOTAL_ESTIMATE:
+        text += f"\n\nНайдено ≈{total} лотов • стр. {page_no}:"
+    else:
+        pages = -(-total // SEARCH_PAGE_SIZE)
+        text += f"\n\nНайдено {total} лотов"
+        if pages > 1:
+            text += f" • стр. {page_no} из {pages}"
+        text += ":"
+    
+    sort_row = [
+        {"text": f"✓ {label}" if code == search["sort"] else label, "callback_data": f"sort:{property_id}:{code}"}
+        for code, label in SORT_BUTTONS
+    ]
+    
+    nav_row = []
+    units = page["units"]
+    column = SORTS[search["sort"]][0]
+    if page["has_prev"]:
+        first = units[0]
+        nav_row.append({
+            "text": BTN_PREV_PAGE,
+            "callback_data": f"page:{property_id}:{page_no - 1}:p:{_cursor_value(first[column])}:{first['id']}"
+        })
+    if page["has_next"]:
+        last = units[-1]
+        nav_row.append({
+            "text": BTN_NEXT_PAGE,
+            "callback_data": f"page:{property_id}:{page_no + 1}:n:{_cursor_value(last[column])}:{last['id']}"
+        })
+    
+    keyboard = build_units_keyboard(property_id, units, f"search:{property_id}", [sort_row, nav_row])
+    return text, keyboard
+
+
+async def search_first_page(user_id: int, property_id: int, state: str, filters: dict, sort: str = DEFAULT_SORT):
+    """
+    Первая страница подбора; критерии, сортировка и число найденных запоминаются
+    в state_data. Возвращает (prop, page, search) — page["units"] пуст, если ничего не нашлось
+    """
+    page = await search_units(property_id, filters, sort, limit=SEARCH_PAGE_SIZE)
+    prop = await get_property(property_id)
+    search = {"filters": filters, "sort": sort, "total": page["total"], "total_mode": page["total_mode"]}
+    if page["units"]:
+        await set_user_state(user_id, property_id=property_id, state=state, state_data=json.dumps(search))
+    return prop, page, search
+
+
+async def load_search(user_id: int, property_id: int) -> tuple:
+    """(state, search) текущего подбора или (state, None), если риэлтор уже ушёл из него"""
+    state = await get_user_state(user_id)
+    if state.get("current_property_id") != property_id or not state.get("state_data"):
+        return state, None
+    search = json.loads(state["state_data"])
+    if "filters" not in search:
+        return state, None
+    return state, search
+
+
+async def show_search_expired(edit_message, user_id: int, property_id: int, message_id: int):
+    await edit_message(
+        chat_id=user_id,
+        message_id=message_id,
+        text="⌛ Результаты поиска устарели, повтори поиск",
+        parse_mode="HTML",
+        reply_markup={"inline_keyboard": [[
+            {"text": BTN_BACK, "callback_data": f"search:{property_id}"}
+        ]]}
+    )
+
+
+# === Разбор параметров подбора из текста ===
+
+NUMBER = r"(\d+(?:[.,]\d+)?)"
+AREA_UNIT = r"(?:м²|м2|кв\.?\s*м\b|метр\w*|м\b)"
+PRICE_UNIT = r"(?:млн\b|млн\.)"
+PRICE_M2_UNIT = r"тыс\.?\s*(?:₽\s*)?(?:/|за)\s*(?:м²|м2|кв\.?\s*м\b|метр\w*|м\b)"
+
+
+def _number(value: str) -> float:
+    return float(value.replace(",", "."))
+
+
+def _take_range(text: str, unit: str) -> tuple:
+    """
+    'A-B ед.', 'от A до B ед.', 'от A ед.', 'до B ед.', 'A ед.' -> ((min, max, точное), text без найденного).
+    Найденное вырезается, чтобы число не попало в другой параметр
+    """
+    patterns = (
+        (rf"(?:от\s*)?{NUMBER}\s*(?:-|–|—|до)\s*{NUMBER}\s*{unit}", lambda m: (_number(m[1]), _number(m[2]), False)),
+        (rf"от\s*{NUMBER}\s*{unit}", lambda m: (_number(m[1]), None, False)),
+        (rf"до\s*{NUMBER}\s*{unit}", lambda m: (None, _number(m[1]), False)),
+        (rf"{NUMBER}\s*{unit}", lambda m: (_number(m[1]), _number(m[1]), True)),
+    )
+    for pattern, convert in patterns:
+        m = re.search(pattern, text)
+        if m:
+            return convert(m), text[:m.start()] + " " + text[m.end():]
+    return None, text
+
+
+def parse_filters(text: str) -> dict:
+    """
+    '2к 40-60 м² до 15 млн корпус 3 этаж 5-10 свободные' -> критерии db/search.py.
+    Одно число площади — ±5 м², одна сумма — максимальный бюджет (как в поиске по площади / бюджету)
+    """
+    text = text.lower().replace("ё", "е")
+    filters = {}
+    
+    found, text = _take_range(text, PRICE_M2_UNIT)
+    if found:
+        low, high, exact = found
+        filters["min_price_m2"] = None if low is None or exact else int(low * 1000)
+        filters["max_price_m2"] = None if high is None else int(high * 1000)
+    
+    found, text = _take_range(text, PRICE_UNIT)
+    if found:
+        low, high, exact = found
+        filters["min_price"] = None if low is None or exact else int(low * 1_000_000)
+        filters["max_price"] = None if high is None else int(high * 1_000_000)
+    
+    found, text = _take_range(text, AREA_UNIT)
+    if found:
+        low, high, exact = found
+        filters["min_area"] = low - 5 if exact else low
+        filters["max_area"] = high + 5 if exact else high
+    
+    m = re.search(r"корп\w*\.?\s*(\d+)", text)
+    if m:
+        filters["building"] = int(m[1])
+        text = text[:m.start()] + " " + text[m.end():]
+    
+    for pattern, convert in (
+        (r"этаж\w*\s*(?:с\s*)?(\d+)\s*(?:-|–|—|по|до)\s*(\d+)", lambda m: (int(m[1]), int(m[2]))),
+        (r"(?:с\s*)?(\d+)\s*(?:-|–|—|по|до)\s*(\d+)\s*этаж", lambda m: (int(m[1]), int(m[2]))),
+        (r"(?:с|от|выше)\s*(\d+)\s*этаж", lambda m: (int(m[1]), None)),
+        (r"до\s*(\d+)\s*этаж", lambda m: (None, int(m[1]))),
+        (r"этаж\w*\s*(\d+)|(\d+)\s*этаж", lambda m: (int(m[1] or m[2]),) * 2),
+    ):
+        m = re.search(pattern, text)
+        if m:
+            filters["min_floor"], filters["max_floor"] = convert(m)
+            text = text[:m.start()] + " " + text[m.end():]
+            break
+    
+    rooms = set()
+    if re.search(r"студи", text):
+        rooms.add(0)
+    m = re.search(r"(\d(?:\s*(?:,|или|и|-|–)\s*\d)*)\s*-?\s*(?:к\b|кк\b|комн)", text)
+    if m:
+        digits = [int(d) for d in re.findall(r"\d", m[1])]
+        if re.search(r"\d\s*[-–]\s*\d", m[1]) and len(digits) == 2:
+            digits = range(digits[0], digits[1] + 1)
+        rooms.update(digits)
+    if rooms:
+        filters["rooms"] = sorted(rooms)
+    
+    if re.search(r"свободн|в продаже", text):
+        filters["status"] = "available"
+    
+    if re.search(r"без отделки", text):
+        filters["decoration"] = "Без отделки"
+    else:
+        m = re.search(r"отделк\w*\s*:?\s*([^,;]+)", text)
+        if m and m[1].strip():
+            # Значение — как в карточке лота
+            filters["decoration"] = m[1].strip().capitalize()
+    
+    return {k: v for k, v in filters.items() if v is not None}
+
+
 # === Handlers ===
 
+@router.callback("search", int)
 async def handle_search_menu(edit_message, user_id: int, property_id: int, message_id: int):
     """Меню поиска"""
-    prop = get_property(property_id)
+    prop = await get_property(property_id)
     if not prop:
         return
     
-    set_user_state(user_id, property_id=property_id, state=States.SEARCH_MENU)
+    await set_user_state(user_id, property_id=property_id, state=States.SEARCH_MENU)
     
     text = f"🔍 <b>Поиск — {prop['name']}</b>\n\nВыбери способ поиска:"
     keyboard = build_search_menu_keyboard(property_id)
@@ -96,10 +330,11 @@ async def handle_search_menu(edit_message, user_id: int, property_id: int, messa
     )
 
 
+@router.callback("search_building", int)
 async def handle_search_by_building(edit_message, user_id: int, property_id: int, message_id: int):
     """Выбор корпуса"""
-    prop = get_property(property_id)
-    stats = get_building_stats(property_id)
+    prop = await get_property(property_id)
+    stats = await get_building_stats(property_id)
     
     if not stats:
         await edit_message(
@@ -110,7 +345,7 @@ async def handle_search_by_building(edit_message, user_id: int, property_id: int
         )
         return
     
-    set_user_state(user_id, property_id=property_id, state=States.SEARCH_BY_BUILDING)
+    await set_user_state(user_id, property_id=property_id, state=States.SEARCH_BY_BUILDING)
     
     text = f"🏢 <b>{prop['name']}</b>\n\nВыбери корпус:"
     keyboard = build_buildings_keyboard(property_id, stats)
@@ -124,10 +359,11 @@ async def handle_search_by_building(edit_message, user_id: int, property_id: int
     )
 
 
+@router.callback("building", int, int)
 async def handle_select_building(edit_message, user_id: int, property_id: int, building: int, message_id: int):
     """Выбор этажа в корпусе"""
-    prop = get_property(property_id)
-    floors = get_available_floors(property_id, building)
+    prop = await get_property(property_id)
+    floors = await get_available_floors(property_id, building)
     
     if not floors:
         await edit_message(
@@ -138,7 +374,7 @@ async def handle_select_building(edit_message, user_id: int, property_id: int, b
         )
         return
     
-    set_user_state(user_id, property_id=property_id, state=States.SEARCH_BY_FLOOR)
+    await set_user_state(user_id, property_id=property_id, state=States.SEARCH_BY_FLOOR)
     
     text = f"🏢 <b>{prop['name']} • Корпус {building}</b>\n\nВыбери этаж:"
     keyboard = build_floors_keyboard(property_id, building, floors)
@@ -152,10 +388,11 @@ async def handle_select_building(edit_message, user_id: int, property_id: int, b
     )
 
 
+@router.callback("floor", int, int, int)
 async def handle_select_floor(edit_message, user_id: int, property_id: int, building: int, floor: int, message_id: int):
     """Список лотов на этаже"""
-    prop = get_property(property_id)
-    units = get_property_units(property_id, building=building, floor=floor)
+    prop = await get_property(property_id)
+    units = await get_property_units(property_id, building=building, floor=floor)
     
     if not units:
         await edit_message(
@@ -178,9 +415,10 @@ async def handle_select_floor(edit_message, user_id: int, property_id: int, buil
     )
 
 
+@router.callback("search_area", int)
 async def handle_search_area_start(edit_message, send_message, user_id: int, property_id: int, message_id: int):
     """Начало поиска по площади"""
-    set_user_state(user_id, property_id=property_id, state=States.SEARCH_BY_AREA)
+    await set_user_state(user_id, property_id=property_id, state=States.SEARCH_BY_AREA)
     
     text = (
         "📐 <b>Поиск по площади</b>\n\n"
@@ -201,16 +439,16 @@ async def handle_search_area_start(edit_message, send_message, user_id: int, pro
     )
 
 
+@router.state(States.SEARCH_BY_AREA)
 async def handle_search_area(send_message, user_id: int, text: str):
     """Поиск по площади"""
-    state = get_user_state(user_id)
+    state = await get_user_state(user_id)
     property_id = state.get("current_property_id")
     
     if not property_id:
         return
     
     # Парсим диапазон
-    import re
     numbers = re.findall(r'\d+', text)
     
     if len(numbers) == 1:
@@ -226,17 +464,16 @@ async def handle_search_area(send_message, user_id: int, text: str):
         )
         return
     
-    units = get_units_by_area(property_id, min_area, max_area)
-    prop = get_property(property_id)
+    filters = {"min_area": min_area, "max_area": max_area}
+    prop, page, search = await search_first_page(user_id, property_id, States.SEARCH_BY_AREA, filters)
     
-    if not units:
+    if not page["units"]:
         text = f"❌ Не найдено лотов с площадью {min_area}-{max_area} м²"
         keyboard = {"inline_keyboard": [[
             {"text": BTN_BACK, "callback_data": f"search:{property_id}"}
         ]]}
     else:
-        text = f"📐 <b>{prop['name']}</b>\nПлощадь {min_area}-{max_area} м²\n\nНайдено {len(units)} лотов:"
-        keyboard = build_units_keyboard(property_id, units[:15], f"search:{property_id}")
+        text, keyboard = format_results_page(prop, search, page, 1)
     
     await send_message(
         chat_id=user_id,
@@ -246,9 +483,10 @@ async def handle_search_area(send_message, user_id: int, text: str):
     )
 
 
+@router.callback("search_budget", int)
 async def handle_search_budget_start(edit_message, user_id: int, property_id: int, message_id: int):
     """Начало поиска по бюджету"""
-    set_user_state(user_id, property_id=property_id, state=States.SEARCH_BY_BUDGET)
+    await set_user_state(user_id, property_id=property_id, state=States.SEARCH_BY_BUDGET)
     
     text = (
         "💰 <b>Поиск по бюджету</b>\n\n"
@@ -269,20 +507,20 @@ async def handle_search_budget_start(edit_message, user_id: int, property_id: in
     )
 
 
+@router.state(States.SEARCH_BY_BUDGET)
 async def handle_search_budget(send_message, user_id: int, text: str):
     """Поиск по бюджету"""
-    state = get_user_state(user_id)
+    state = await get_user_state(user_id)
     property_id = state.get("current_property_id")
     
     if not property_id:
         return
     
     # Парсим диапазон
-    import re
     numbers = re.findall(r'[\d.]+', text)
     
     if len(numbers) == 1:
-        min_price = 0
+        min_price = None
         max_price = int(float(numbers[0]) * 1_000_000)
     elif len(numbers) >= 2:
         min_price = int(float(numbers[0]) * 1_000_000)
@@ -295,17 +533,16 @@ async def handle_search_budget(send_message, user_id: int, text: str):
         )
         return
     
-    units = get_units_by_budget(property_id, min_price, max_price)
-    prop = get_property(property_id)
+    filters = {"min_price": min_price, "max_price": max_price}
+    prop, page, search = await search_first_page(user_id, property_id, States.SEARCH_BY_BUDGET, filters)
     
-    if not units:
-        text = f"❌ Не найдено лотов в бюджете {format_price(min_price)} - {format_price(max_price)}"
+    if not page["units"]:
+        text = f"❌ Не найдено лотов в бюджете {_range_text(min_price, max_price, format_price)}"
         keyboard = {"inline_keyboard": [[
             {"text": BTN_BACK, "callback_data": f"search:{property_id}"}
         ]]}
     else:
-        text = f"💰 <b>{prop['name']}</b>\nБюджет {format_price(min_price)} - {format_price(max_price)}\n\nНайдено {len(units)} лотов:"
-        keyboard = build_units_keyboard(property_id, units[:15], f"search:{property_id}")
+        text, keyboard = format_results_page(prop, search, page, 1)
     
     await send_message(
         chat_id=user_id,
@@ -315,9 +552,132 @@ async def handle_search_budget(send_message, user_id: int, text: str):
     )
 
 
+@router.callback("search_filters", int)
+async def handle_search_filters_start(edit_message, user_id: int, property_id: int, message_id: int):
+    """Начало подбора по параметрам"""
+    await set_user_state(user_id, property_id=property_id, state=States.SEARCH_BY_FILTERS)
+    
+    text = (
+        "🎯 <b>Подбор по параметрам</b>\n\n"
+        "Напиши, что нужно, в любом порядке:\n"
+        "<code>2к 40-60 м² 10-15 млн</code>\n"
+        "<code>студия до 8 млн корпус 2 этаж 5-10 свободные</code>\n\n"
+        "Комнаты (студия, 1к, 2-3к), площадь (м²), бюджет (млн), "
+        "цена за м² (тыс/м²), корпус, этаж, свободные, отделка"
+    )
+    keyboard = {"inline_keyboard": [[
+        {"text": BTN_BACK, "callback_data": f"search:{property_id}"}
+    ]]}
+    
+    await edit_message(
+        chat_id=user_id,
+        message_id=message_id,
+        text=text,
+        parse_mode="HTML",
+        reply_markup=keyboard
+    )
+
+
+@router.state(States.SEARCH_BY_FILTERS)
+async def handle_search_filters(send_message, user_id: int, text: str):
+    """Подбор по параметрам"""
+    state = await get_user_state(user_id)
+    property_id = state.get("current_property_id")
+    
+    if not property_id:
+        return
+    
+    filters = parse_filters(text)
+    if not filters:
+        await send_message(
+            chat_id=user_id,
+            text="❌ Не удалось распознать параметры. Попробуй: 2к 40-60 м² до 15 млн",
+            parse_mode="HTML"
+        )
+        return
+    
+    prop, page, search = await search_first_page(user_id, property_id, States.SEARCH_BY_FILTERS, filters)
+    
+    if not page["units"]:
+        text = f"❌ Не найдено лотов: {describe_filters(filters)}"
+        keyboard = {"inline_keyboard": [[
+            {"text": BTN_BACK, "callback_data": f"search:{property_id}"}
+        ]]}
+    else:
+        text, keyboard = format_results_page(prop, search, page, 1)
+    
+    await send_message(
+        chat_id=user_id,
+        text=text,
+        parse_mode="HTML",
+        reply_markup=keyboard
+    )
+
+
+@router.callback("page", int, int, str, float, int)
+async def handle_results_page(edit_message, user_id: int, property_id: int, page_no: int,
+                              direction: str, value: float, unit_id: int, message_id: int):
+    """Следующая / предыдущая страница результатов подбора"""
+    state, search = await load_search(user_id, property_id)
+    
+    page = None
+    # Без направления запрос ушёл бы за первой страницей под номером N
+    if search and direction in ("n", "p"):
+        cursor = (value, unit_id)
+        page = await search_units(
+            property_id, search["filters"], search["sort"],
+            after=cursor if direction == "n" else None,
+            before=cursor if direction == "p" else None,
+            limit=SEARCH_PAGE_SIZE
+        )
+    
+    if not page or not page["units"]:
+        # Риэлтор уже ушёл в другой поиск / раздел или лоты обновились
+        await show_search_expired(edit_message, user_id, property_id, message_id)
+        return
+    
+    prop = await get_property(property_id)
+    text, keyboard = format_results_page(prop, search, page, page_no)
+    
+    await edit_message(
+        chat_id=user_id,
+        message_id=message_id,
+        text=text,
+        parse_mode="HTML",
+        reply_markup=keyboard
+    )
+
+
+@router.callback("sort", int, str)
+async def handle_results_sort(edit_message, user_id: int, property_id: int, sort: str, message_id: int):
+    """Сменить сортировку — заново с первой страницы"""
+    state, search = await load_search(user_id, property_id)
+    if not search or sort not in SORTS:
+        await show_search_expired(edit_message, user_id, property_id, message_id)
+        return
+    if sort == search["sort"]:
+        return
+    
+    prop, page, search = await search_first_page(user_id, property_id, state["state"], search["filters"], sort)
+    if not page["units"]:
+        await show_search_expired(edit_message, user_id, property_id, message_id)
+        return
+    
+    text, keyboard = format_results_page(prop, search, page, 1)
+    
+    await edit_message(
+        chat_id=user_id,
+        message_id=message_id,
+        text=text,
+        parse_mode="HTML",
+        reply_markup=keyboard
+    )
+
+
+@router.callback("search_code", int)
 async def handle_search_code_start(edit_message, user_id: int, property_id: int, message_id: int):
     """Начало поиска по номеру лота"""
-    set_user_state(user_id, property_id=property_id, state=States.SEARCH_BY_CODE)
+    await set_user_state(user_id, property_id=property_id, state=States.SEARCH_BY_CODE)
     
     text = (
         "🔍 <b>Поиск по номеру</b>\n\n"
@@ -337,20 +697,21 @@ async def handle_search_code_start(edit_message, user_id: int, property_id: int,
     )
 
 
+@router.state(States.SEARCH_BY_CODE)
 async def handle_search_code(send_message, user_id: int, code: str):
     """Поиск по номеру лота"""
-    state = get_user_state(user_id)
+    state = await get_user_state(user_id)
     property_id = state.get("current_property_id")
     
     if not property_id:
         return
     
     code = code.strip().upper()
-    unit = get_unit_by_code(property_id, code)
+    ctx = await get_lot_context(property_id, code)
     
-    if not unit:
+    if not ctx:
         # Пробуем найти похожие
-        all_units = get_property_units(property_id)
+        all_units = await get_property_units(property_id)
         similar = [u for u in all_units if code in u["code"].upper()][:5]
         
         if similar:
@@ -364,9 +725,9 @@ async def handle_search_code(send_message, user_id: int, code: str):
     else:
         # Найден — показываем меню лота
         from handlers.lot_menu import format_lot_menu, build_lot_menu_keyboard
-        text = format_lot_menu(unit, property_id)
-        keyboard = build_lot_menu_keyboard(property_id, unit["code"])
-        set_user_state(user_id, property_id=property_id, lot_code=unit["code"], state=States.LOT_MENU)
+        text = format_lot_menu(ctx)
+        keyboard = build_lot_menu_keyboard(property_id, ctx.unit["code"])
+        await set_user_state(user_id, property_id=property_id, lot_code=ctx.unit["code"], state=States.LOT_MENU)
     
     await send_message(
         chat_id=user_id,
@@ -6,10 +6,11 @@ from config.settings import (
     BTN_ADD_PROPERTY, BTN_SETTINGS, BTN_BACK_TO_LIST,
     States, format_price
 )
-from db.database import (
+from db.aio import (
     get_or_create_user, get_user_properties,
     get_user_state, set_user_state, clear_user_state
 )
+from handlers.router import router
 
 
 def build_properties_keyboard(properties: list) -> dict:
@@ -65,16 +66,16 @@ def format_properties_list(properties: list) -> str:
 async def handle_start(send_message, user_id: int, username: str = "", first_name: str = ""):
     """Обработка команды /start"""
     # Регистрируем пользователя
-    get_or_create_user(user_id, username, first_name)
+    await get_or_create_user(user_id, username, first_name)
     
     # Сбрасываем состояние
-    clear_user_state(user_id)
+    await clear_user_state(user_id)
     
     # Получаем ЖК пользователя
-    properties = get_user_properties(user_id)
+    properties = await get_user_properties(user_id)
     
     # Устанавливаем состояние
-    set_user_state(user_id, state=States.PROPERTIES_LIST)
+    await set_user_state(user_id, state=States.PROPERTIES_LIST)
     
     # Отправляем сообщение
     text = format_properties_list(properties)
@@ -88,12 +89,13 @@ async def handle_start(send_message, user_id: int, username: str = "", first_nam
     )
 
 
+@router.callback("back_to_list")
 async def handle_back_to_list(send_message, edit_message, user_id: int, message_id: int = None):
     """Возврат к списку ЖК"""
-    clear_user_state(user_id)
+    await clear_user_state(user_id)
     
-    properties = get_user_properties(user_id)
-    set_user_state(user_id, state=States.PROPERTIES_LIST)
+    properties = await get_user_properties(user_id)
+    await set_user_state(user_id, state=States.PROPERTIES_LIST)
     
     text = format_properties_list(properties)
     keyboard = build_properties_keyboard(properties)
@@ -2,69 +2,81 @@
 Dev режим — polling
 """
 
-import os
 import asyncio
-import json
-from aiohttp import ClientSession
-from dotenv import load_dotenv
 
-load_dotenv()
+from config.settings import TELEGRAM_BOT_TOKEN, SCHEDULER_ENABLED
+from services import telegram, ygroup, lot_sync
+from db import aio
+from db.migrations import migrate
+from app import handle_message, handle_callback, create_scheduler
+from handlers.properties import import_queue
 
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
-TELEGRAM_API = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
-
-from app import handle_message, handle_callback
+POLL_TIMEOUT = 30
 
 
 async def get_updates(offset: int = None) -> list:
     """Получить обновления"""
-    async with ClientSession() as session:
-        params = {"timeout": 30}
-        if offset:
-            params["offset"] = offset
-        
-        async with session.get(f"{TELEGRAM_API}/getUpdates", params=params) as resp:
-            data = await resp.json()
-            return data.get("result", [])
+    params = {"timeout": POLL_TIMEOUT}
+    if offset:
+        params["offset"] = offset
+    
+    data = await telegram.request("getUpdates", params, timeout=POLL_TIMEOUT + 10)
+    return data.get("result", [])
 
 
 async def main():
     print("🚀 Realt Assistant V2 — Polling mode")
     print(f"Bot token: {TELEGRAM_BOT_TOKEN[:10]}...")
     
+    migrate()
+    aio.start()
+    await telegram.start()
+    await import_queue.start()
+    scheduler = create_scheduler()
+    if SCHEDULER_ENABLED:
+        await scheduler.start()
+    
     # Удаляем webhook если был
-    async with ClientSession() as session:
-        await session.get(f"{TELEGRAM_API}/deleteWebhook")
+    await telegram.request("deleteWebhook")
     
     offset = None
     
-    while True:
-        try:
-            updates = await get_updates(offset)
-            
-            for update in updates:
-                offset = update["update_id"] + 1
+    try:
+        while True:
+            try:
+                updates = await get_updates(offset)
                 
-                try:
-                    if "message" in update:
-                        text = update["message"].get("text", "")[:30]
-                        print(f"[MSG] {text}")
-                        await handle_message(update["message"])
-                        print(f"[MSG] Done")
-                    elif "callback_query" in update:
-                        data = update["callback_query"].get("data", "")
-                        print(f"[CB] {data}")
-                        await handle_callback(update["callback_query"])
-                        print(f"[CB] Done")
-                except Exception as e:
-                    print(f"[ERROR] Handler: {e}")
-        
-        except asyncio.CancelledError:
-            print("\n👋 Stopping...")
-            break
-        except Exception as e:
-            print(f"[ERROR] Polling: {e}")
-            await asyncio.sleep(5)
+                for update in updates:
+                    offset = update["update_id"] + 1
+                    
+                    try:
+                        if "message" in update:
+                            text = update["message"].get("text", "")[:30]
+                            print(f"[MSG] {text}")
+                            await handle_message(update["message"])
+                            print(f"[MSG] Done")
+                        elif "callback_query" in update:
+                            data = update["callback_query"].get("data", "")
+                            print(f"[CB] {data}")
+                            await handle_callback(update["callback_query"])
+                            print(f"[CB] Done")
+                    except Exception as e:
+                        print(f"[ERROR] Handler: {e}")
+            
+            except asyncio.CancelledError:
+                print("\n👋 Stopping...")
+                break
+            except Exception as e:
+                print(f"[ERROR] Polling: {e}")
+                await asyncio.sleep(5)
+    finally:
+        await scheduler.stop()
+        await import_queue.stop()
+        await lot_sync.stop()
+        await telegram.close()
+        await ygroup.close()
+        # Состояния диалогов из памяти — в базу
+        await aio.stop()
 
 
 if __name__ == "__main__":
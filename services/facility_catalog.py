@@ -0,0 +1,182 @@
+"""
+Индекс каталога ЖК YGroup
+Строится один раз после загрузки списка: id -> ЖК, триграммы, отсортированные
+названия и префиксы слов, фасеты по городу и застройщику.
+"""
+
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+# Латиница, похожая на кириллицу, и ё -> е
+_TRANSLATE = str.maketrans({
+    "ё": "е",
+    "a": "а", "b": "в", "c": "с", "e": "е", "h": "н", "k": "к",
+    "m": "м", "o": "о", "p": "р", "t": "т", "x": "х", "y": "у",
+})
+# Кавычки, дефисы и прочая пунктуация -> пробел
+_PUNCT = re.compile(r"[«»\"'“”„‘’`.,:;!?()\[\]{}/\\|+\-–—_]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """'ЖК «Ёлки-Park»' -> 'жк елки раrк'"""
+    if not text:
+        return ""
+    text = text.lower().translate(_TRANSLATE)
+    text = _PUNCT.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+# "ЖК" в начале почти у всех названий — для поиска он только шум
+_NAME_PREFIX = re.compile(r"^(жк|жилой комплекс|апарт отель|апартаменты) ")
+
+
+def name_key(text: str) -> str:
+    """Нормализованное название без типового префикса"""
+    return _NAME_PREFIX.sub("", normalize(text))
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class FacilityCatalog:
+    """
+    Неизменяемый индекс списка ЖК.
+    Внутри ЖК упорядочены по (больше лотов, название) — индекс в списке
+    сразу даёт порядок внутри одного уровня релевантности, и сканирование
+    можно остановить, как только набраны лучшие совпадения.
+    """
+
+    def __init__(self, facilities: List[Dict]):
+        self.listing = facilities
+        self.facilities = sorted(
+            facilities,
+            key=lambda f: (-(f.get("active_lots_amount") or 0), normalize(f.get("name", "")))
+        )
+        self.by_id: Dict[str, Dict] = {}
+        self.names: List[str] = []
+        self.by_name: Dict[str, List[int]] = defaultdict(list)
+        self.trigram_index: Dict[str, List[int]] = defaultdict(list)
+        self.word_prefix: Dict[str, List[int]] = defaultdict(list)
+        self.sorted_names: List[tuple] = []
+        self.by_city: Dict[str, List[int]] = defaultdict(list)
+        self.by_developer: Dict[str, List[int]] = defaultdict(list)
+
+        for idx, f in enumerate(self.facilities):
+            self.by_id[f.get("id")] = f
+
+            name = name_key(f.get("name", ""))
+            self.names.append(name)
+            self.by_name[name].append(idx)
+            self.sorted_names.append((name, idx))
+            for tri in trigrams(name):
+                self.trigram_index[tri].append(idx)
+            for prefix in {t[:n] for t in name.split() for n in (1, 2)}:
+                self.word_prefix[prefix].append(idx)
+
+            city = normalize(f.get("city_name", ""))
+            if city:
+                self.by_city[city].append(idx)
+            developer = normalize(f.get("developer_name", ""))
+            if developer:
+                self.by_developer[developer].append(idx)
+
+        self.sorted_names.sort()
+        self.by_name = dict(self.by_name)
+        self.trigram_index = dict(self.trigram_index)
+        self.word_prefix = dict(self.word_prefix)
+
+    def __len__(self) -> int:
+        return len(self.facilities)
+
+    def get(self, facility_id: str) -> Optional[Dict]:
+        return self.by_id.get(facility_id)
+
+    # === Поиск ===
+
+    def _candidates(self, query: str) -> List[int]:
+        """Возрастающий список индексов — надмножество совпадений"""
+        if len(query) >= 3:
+            # Самый короткий список по триграммам запроса
+            shortest = None
+            for tri in trigrams(query):
+                posting = self.trigram_index.get(tri)
+                if not posting:
+                    return []
+                if shortest is None or len(posting) < len(shortest):
+                    shortest = posting
+            return shortest
+
+        # 1-2 символа — только по началу слов
+        return self.word_prefix.get(query, [])
+
+    def search(self, query: str, city: str = None, developer: str = None, limit: int = 20) -> List[Dict]:
+        query = name_key(query)
+
+        allowed = None
+        for facet, value in ((self.by_city, city), (self.by_developer, developer)):
+            if value:
+                ids = set(facet.get(normalize(value), []))
+                allowed = ids if allowed is None else allowed & ids
+
+        if not query:
+            if allowed is None:
+                return self.listing[:limit]
+            return [self.facilities[i] for i in sorted(allowed)[:limit]]
+
+        # Уровни релевантности: точное совпадение, начало названия, начало слова, подстрока.
+        # Кандидаты идут по возрастанию индекса, т.е. уже в порядке внутри уровня.
+        exact = [i for i in self.by_name.get(query, []) if allowed is None or i in allowed]
+        lo, hi = self._starts_range(query)
+
+        if hi - lo <= limit * 4:
+            # Названий с таким началом мало — берём их напрямую и добираем словами
+            starts = sorted(
+                idx for name, idx in self.sorted_names[lo:hi]
+                if name != query and (allowed is None or idx in allowed)
+            )[:limit]
+            collect_starts = False
+        else:
+            # Их много — они сами заполнят выдачу, достаточно первых по порядку
+            starts = []
+            collect_starts = True
+
+        words, contains = [], []
+        word_query = f" {query}"
+
+        for i in self._candidates(query):
+            if allowed is not None and i not in allowed:
+                continue
+            name = self.names[i]
+            if query not in name or name == query:
+                continue
+            if name.startswith(query):
+                if collect_starts:
+                    starts.append(i)
+                    if len(exact) + len(starts) >= limit:
+                        break
+            elif word_query in name:
+                words.append(i)
+                if not collect_starts and len(exact) + len(starts) + len(words) >= limit:
+                    break
+            elif len(contains) < limit:
+                contains.append(i)
+
+        ranked = (exact + starts + words + contains)[:limit]
+        return [self.facilities[i] for i in ranked]
+
+    def _starts_range(self, query: str):
+        """Границы названий, начинающихся с query, в sorted_names"""
+        lo = bisect_left(self.sorted_names, (query,))
+        # '\uffff' больше любого символа названия
+        hi = bisect_left(self.sorted_names, (query + "\uffff",), lo)
+        return lo, hi
+
+    def cities(self) -> Dict[str, int]:
+        return {city: len(ids) for city, ids in self.by_city.items()}
+
+    def developers(self) -> Dict[str, int]:
+        return {dev: len(ids) for dev, ids in self.by_developer.items()}
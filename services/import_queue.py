@@ -0,0 +1,185 @@
+"""
+Очередь импорта ЖК из YGroup
+Хендлер ставит задачу и сразу отвечает; воркеры грузят ЖК и правят
+статусное сообщение (прогресс — не чаще раза в progress_interval секунд).
+Повторные запросы того же ЖК, пока задача в очереди или в работе,
+присоединяются к ней, а не запускают второй импорт.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Поставить в очередь, присоединиться к задаче того же ЖК, повторное нажатие
+QUEUED = "queued"
+COALESCED = "coalesced"
+DUPLICATE = "duplicate"
+
+
+class ImportJob:
+    def __init__(self, facility_id: str):
+        self.facility_id = facility_id
+        # (user_id, message_id, edit_message) — кому показывать прогресс и результат
+        self.waiters: List[tuple] = []
+        # Сколько первых waiters уже получили итог
+        self.served = 0
+        self.progress = {"clusters_done": 0, "clusters_total": 0, "lots_loaded": 0}
+        self.last_report = 0.0
+        self.reporting: Optional[asyncio.Task] = None
+
+    def has_user(self, user_id: int) -> bool:
+        return any(w[0] == user_id for w in self.waiters)
+
+
+class ImportQueue:
+    """
+    runner(user_id, facility_id, progress=callback) -> result — сам импорт,
+    on_progress(edit_message, user_id, message_id, progress) и
+    on_done(edit_message, user_id, message_id, result) — отображение.
+    """
+
+    def __init__(self, runner: Callable[..., Awaitable[Dict]],
+                 on_progress: Callable[..., Awaitable[Any]], on_done: Callable[..., Awaitable[Any]],
+                 workers: int = 2, progress_interval: float = 2.0):
+        self.runner = runner
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.workers_count = workers
+        self.progress_interval = progress_interval
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # facility_id -> задача в очереди или в работе
+        self._jobs: Dict[str, ImportJob] = {}
+
+        self.stats = {
+            "queued": 0, "coalesced": 0, "duplicates": 0,
+            "completed": 0, "failed": 0, "cancelled": 0, "progress_edits": 0,
+            "running": 0, "total_time": 0.0,
+        }
+
+    # === Lifecycle ===
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"import-worker-{i}")
+            for i in range(self.workers_count)
+        ]
+
+    async def stop(self):
+        """
+        Остановить воркеры. Задачи в очереди и прерванные в работе не теряются молча:
+        каждый, кто их ждал, получает через on_done ошибку с кнопкой «Повторить»
+        """
+        jobs = list(self._jobs.values())
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+                self._queue.task_done()
+        self._jobs.clear()
+
+        for job in jobs:
+            if job.reporting is not None and not job.reporting.done():
+                job.reporting.cancel()
+            result = {
+                "success": False, "error": "Импорт прерван перезапуском бота, попробуй ещё раз",
+                "retryable": True, "ygroup_facility_id": job.facility_id,
+            }
+            for user_id, message_id, edit_message in job.waiters[job.served:]:
+                self.stats["cancelled"] += 1
+                try:
+                    await self.on_done(edit_message, user_id, message_id, result)
+                except Exception as e:
+                    print(f"[IMPORT] notify {user_id} error: {e}")
+        if jobs:
+            print(f"[IMPORT] Stopped with {len(jobs)} unfinished imports")
+
+    # === Producer ===
+
+    def submit(self, user_id: int, facility_id: str, message_id: int, edit_message: Callable) -> str:
+        job = self._jobs.get(facility_id)
+        if job is not None:
+            if job.has_user(user_id):
+                self.stats["duplicates"] += 1
+                return DUPLICATE
+            job.waiters.append((user_id, message_id, edit_message))
+            self.stats["coalesced"] += 1
+            return COALESCED
+
+        job = self._jobs[facility_id] = ImportJob(facility_id)
+        job.waiters.append((user_id, message_id, edit_message))
+        self.stats["queued"] += 1
+        self._queue.put_nowait(job)
+        return QUEUED
+
+    # === Worker ===
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            self.stats["running"] += 1
+            started = time.perf_counter()
+            try:
+                await self._run(job)
+            finally:
+                self._jobs.pop(job.facility_id, None)
+                self.stats["running"] -= 1
+                self.stats["total_time"] += time.perf_counter() - started
+                self._queue.task_done()
+
+    async def _run(self, job: ImportJob):
+        # Загрузку из YGroup делает первый импорт; остальные (в т.ч. присоединившиеся
+        # по ходу) берут ЖК уже из общего каталога
+        i = 0
+        while i < len(job.waiters):
+            user_id, message_id, edit_message = job.waiters[i]
+            progress = (lambda *p: self._report(job, *p)) if i == 0 else None
+            try:
+                result = await self.runner(user_id, job.facility_id, progress=progress)
+            except Exception as e:
+                print(f"[IMPORT] {job.facility_id} for {user_id} error: {e}")
+                result = {"success": False, "error": "Не удалось загрузить ЖК"}
+
+            self.stats["completed" if result.get("success") else "failed"] += 1
+            if job.reporting is not None and not job.reporting.done():
+                job.reporting.cancel()
+            # Итог уже уходит — при остановке этому риэлтору «прерван» не показываем
+            job.served = i + 1
+            try:
+                await self.on_done(edit_message, user_id, message_id, result)
+            except Exception as e:
+                print(f"[IMPORT] notify {user_id} error: {e}")
+            i += 1
+
+    def _report(self, job: ImportJob, clusters_done: int, clusters_total: int, lots_loaded: int):
+        job.progress.update(clusters_done=clusters_done, clusters_total=clusters_total, lots_loaded=lots_loaded)
+
+        now = time.monotonic()
+        if now - job.last_report < self.progress_interval:
+            return
+        if job.reporting is not None and not job.reporting.done():
+            return
+        job.last_report = now
+        job.reporting = asyncio.ensure_future(self._send_progress(job, dict(job.progress)))
+
+    async def _send_progress(self, job: ImportJob, progress: Dict):
+        for user_id, message_id, edit_message in list(job.waiters):
+            try:
+                await self.on_progress(edit_message, user_id, message_id, progress)
+                self.stats["progress_edits"] += 1
+            except Exception as e:
+                print(f"[IMPORT] progress {user_id} error: {e}")
+
+    def get_stats(self) -> Dict:
+        result = dict(self.stats)
+        done = self.stats["completed"] + self.stats["failed"]
+        result["pending"] = self._queue.qsize() if self._queue else 0
+        result["avg_time"] = round(self.stats["total_time"] / done, 3) if done else 0
+        del result["total_time"]
+        return result
@@ -0,0 +1,120 @@
+"""
+Синхронизация лотов импортированных ЖК с YGroup
+Цены, статусы, новые и снятые лоты — без удаления и переимпорта ЖК.
+
+Запускается только планировщиком внутри процесса бота (app.create_scheduler,
+LOT_SYNC_INTERVAL): кэши ЖК и корпусов в db/aio.py живут в памяти процесса,
+и синхронизация из отдельного процесса (cron) оставила бы их устаревшими.
+"""
+
+import asyncio
+import time
+from typing import Dict
+
+from config.settings import LOT_SYNC_CONCURRENCY
+from db import aio
+from services import ygroup
+
+sync_stats = {
+    "runs": 0, "facilities": 0, "errors": 0,
+    "inserted": 0, "updated": 0, "deleted": 0, "last_run_time": None,
+}
+
+# Синхронизации в процессе (facility_id -> task)
+_in_flight: Dict[int, asyncio.Task] = {}
+
+
+async def fetch_facility_units(facility_id: str) -> tuple:
+    """Свежие корпуса и лоты ЖК из YGroup -> (buildings, units_by_building)"""
+    clusters = await ygroup.fetch_clusters(facility_id)
+    if not clusters:
+        # Пустой ответ скорее сбой, чем снятый ЖК — не стираем лоты
+        raise ygroup.YGroupError(f"facility {facility_id}: no clusters")
+    lots_by_cluster = await asyncio.gather(*[ygroup.fetch_lots(c["id"]) for c in clusters])
+    return ygroup.transform_clusters(clusters, lots_by_cluster)
+
+
+async def _sync_facility(facility_id: int, ygroup_facility_id: str) -> Dict:
+    buildings, units_by_building = await fetch_facility_units(ygroup_facility_id)
+    summary = await aio.sync_facility(facility_id, buildings, units_by_building)
+    summary["facility_id"] = facility_id
+    return summary
+
+
+async def sync_facility(facility_id: int, ygroup_facility_id: str) -> Dict:
+    """
+    Синхронизировать ЖК общего каталога — сразу для всех риэлторов, у кого он есть.
+    Если этот ЖК уже синхронизируется (плановая задача, ручной запуск), ждём тот же результат.
+    """
+    task = _in_flight.get(facility_id)
+    if task is None:
+        task = _in_flight[facility_id] = asyncio.ensure_future(_sync_facility(facility_id, ygroup_facility_id))
+        task.add_done_callback(lambda _: _in_flight.pop(facility_id, None))
+    return dict(await asyncio.shield(task))
+
+
+async def sync_property(property_id: int) -> Dict:
+    """Синхронизировать ЖК риэлтора"""
+    prop = await aio.get_property(property_id)
+    if not prop or not prop.get("ygroup_facility_id"):
+        return {"property_id": property_id, "error": "ЖК не из YGroup"}
+    
+    try:
+        summary = await sync_facility(prop["facility_id"], prop["ygroup_facility_id"])
+    except Exception as e:
+        print(f"[SYNC] property {property_id} error: {e}")
+        return {"property_id": property_id, "error": str(e)}
+    summary["property_id"] = property_id
+    return summary
+
+
+async def sync_all() -> Dict:
+    """Синхронизировать все ЖК каталога, которые есть у риэлторов, не больше LOT_SYNC_CONCURRENCY одновременно"""
+    started = time.perf_counter()
+    
+    facilities = await aio.get_linked_facilities()
+    semaphore = asyncio.Semaphore(LOT_SYNC_CONCURRENCY)
+    totals = {"facilities": len(facilities), "errors": 0, "inserted": 0, "updated": 0, "deleted": 0}
+    
+    async def run(facility: Dict):
+        async with semaphore:
+            try:
+                summary = await sync_facility(facility["id"], facility["ygroup_facility_id"])
+            except Exception as e:
+                totals["errors"] += 1
+                print(f"[SYNC] facility {facility['ygroup_facility_id']} error: {e}")
+                return
+        for key in ("inserted", "updated", "deleted"):
+            totals[key] += summary[key]
+    
+    await asyncio.gather(*[run(f) for f in facilities])
+    
+    totals["elapsed"] = round(time.perf_counter() - started, 2)
+    sync_stats["runs"] += 1
+    sync_stats["last_run_time"] = totals["elapsed"]
+    for key in ("facilities", "errors", "inserted", "updated", "deleted"):
+        sync_stats[key] += totals[key]
+    
+    print(
+        f"[SYNC] {totals['facilities']} facilities: "
+        f"+{totals['inserted']} ~{totals['updated']} -{totals['deleted']}, "
+        f"{totals['errors']} errors in {totals['elapsed']}s"
+    )
+    return totals
+
+
+async def stop():
+    """
+    Отменить синхронизации в процессе и дождаться их. Вызывать до aio.stop():
+    отмена задачи планировщика до них не доходит — их ждут через asyncio.shield
+    """
+    tasks = list(_in_flight.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if tasks:
+        print(f"[SYNC] Cancelled {len(tasks)} facility syncs")
+
+
+def get_stats() -> Dict:
+    return dict(sync_stats)
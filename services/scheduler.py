@@ -0,0 +1,127 @@
+"""
+Фоновый планировщик периодических задач (в том же event loop, что и бот)
+Каждая задача крутится в своём цикле: сама с собой не пересекается,
+интервал размазан jitter'ом, общее число одновременно работающих задач ограничено.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Сколько последних запусков помнить на задачу (для /jobs)
+HISTORY_SIZE = 20
+
+
+class Job:
+    def __init__(self, name: str, func: Callable[[], Awaitable[Any]], interval: float,
+                 jitter: float = 0.1, initial_delay: Optional[float] = None, timeout: Optional[float] = None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.initial_delay = initial_delay
+        self.timeout = timeout
+
+        self.running = False
+        self.next_run: Optional[float] = None
+        self.history: deque = deque(maxlen=HISTORY_SIZE)
+        self.stats = {"runs": 0, "failures": 0, "total_time": 0.0}
+
+    def delay(self, base: float) -> float:
+        """base ± jitter — задачи разных процессов не стреляют одновременно"""
+        return max(0.0, base * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def get_stats(self) -> Dict:
+        runs = self.stats["runs"]
+        return {
+            "interval": self.interval,
+            "running": self.running,
+            "next_run_in": round(self.next_run - time.time(), 1) if self.next_run else None,
+            "runs": runs,
+            "failures": self.stats["failures"],
+            "avg_time": round(self.stats["total_time"] / runs, 3) if runs else 0,
+            "history": list(self.history),
+        }
+
+
+class Scheduler:
+    def __init__(self, concurrency: int = 2):
+        self.concurrency = concurrency
+        self.jobs: Dict[str, Job] = {}
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def add(self, name: str, func: Callable[[], Awaitable[Any]], interval: float, **kwargs) -> Job:
+        if name in self.jobs:
+            raise ValueError(f"Job '{name}' already registered")
+        job = self.jobs[name] = Job(name, func, interval, **kwargs)
+        return job
+
+    # === Lifecycle ===
+
+    async def start(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._tasks = [
+            asyncio.create_task(self._loop(job), name=f"job-{job.name}")
+            for job in self.jobs.values()
+        ]
+        print(f"[SCHEDULER] Started {len(self._tasks)} jobs")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # === Запуск ===
+
+    async def _loop(self, job: Job):
+        first = job.initial_delay if job.initial_delay is not None else job.interval
+        await self._sleep(job, job.delay(first))
+        while True:
+            await self.run(job.name)
+            await self._sleep(job, job.delay(job.interval))
+
+    async def _sleep(self, job: Job, seconds: float):
+        job.next_run = time.time() + seconds
+        await asyncio.sleep(seconds)
+
+    async def run(self, name: str) -> Dict:
+        """Запустить задачу сейчас (ждёт свободный слот). Ошибки не пробрасываются"""
+        job = self.jobs[name]
+        if job.running:
+            return {"skipped": "already running"}
+
+        job.running = True
+        try:
+            async with self._semaphore:
+                started_at = time.time()
+                started = time.perf_counter()
+                record = {"started_at": round(started_at), "ok": True, "result": None, "error": None}
+                try:
+                    result = await asyncio.wait_for(job.func(), job.timeout)
+                    record["result"] = result if isinstance(result, (dict, int, float, str)) else None
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    job.stats["failures"] += 1
+                    record.update(ok=False, error=f"{type(e).__name__}: {e}")
+                    print(f"[SCHEDULER] {job.name} failed: {e}")
+
+                elapsed = time.perf_counter() - started
+                record["duration"] = round(elapsed, 3)
+                job.stats["runs"] += 1
+                job.stats["total_time"] += elapsed
+                job.history.appendleft(record)
+                return record
+        finally:
+            job.running = False
+
+    def get_stats(self) -> Dict:
+        return {
+            "concurrency": self.concurrency,
+            "jobs": {name: job.get_stats() for name, job in self.jobs.items()},
+        }
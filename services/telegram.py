@@ -0,0 +1,340 @@
+"""
+Telegram Bot API клиент
+Одна долгоживущая aiohttp-сессия на процесс (keep-alive, DNS-кэш)
+и исходящая очередь с лимитами Telegram (глобальный и на чат) и ретраями на 429.
+"""
+
+import asyncio
+import itertools
+import json
+import time
+from typing import Optional, Dict, Any, List
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
+
+from config.settings import (
+    TELEGRAM_API, TELEGRAM_POOL_LIMIT, TELEGRAM_KEEPALIVE_TIMEOUT,
+    TELEGRAM_DNS_CACHE_TTL, TELEGRAM_REQUEST_TIMEOUT,
+    TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE, TELEGRAM_CHAT_BURST,
+    TELEGRAM_SENDERS, TELEGRAM_MAX_RETRIES
+)
+
+# Приоритеты исходящих запросов (меньше — раньше)
+PRIORITY_CALLBACK = 0
+PRIORITY_MESSAGE = 1
+PRIORITY_BULK = 2
+
+_session: Optional[ClientSession] = None
+_dispatcher: Optional["OutboundDispatcher"] = None
+
+
+def get_session() -> ClientSession:
+    """Общая сессия (создаётся лениво, если start() не вызывали)"""
+    global _session
+
+    if _session is None or _session.closed:
+        connector = TCPConnector(
+            limit=TELEGRAM_POOL_LIMIT,
+            limit_per_host=TELEGRAM_POOL_LIMIT,
+            keepalive_timeout=TELEGRAM_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=TELEGRAM_DNS_CACHE_TTL,
+            use_dns_cache=True,
+        )
+        _session = ClientSession(
+            connector=connector,
+            timeout=ClientTimeout(total=TELEGRAM_REQUEST_TIMEOUT),
+        )
+    return _session
+
+
+async def start():
+    """Открыть сессию и запустить исходящую очередь"""
+    global _dispatcher
+
+    get_session()
+    if _dispatcher is None:
+        _dispatcher = OutboundDispatcher()
+        await _dispatcher.start()
+
+
+async def close():
+    """Остановить очередь и закрыть сессию"""
+    global _session, _dispatcher
+
+    if _dispatcher is not None:
+        await _dispatcher.stop()
+        _dispatcher = None
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+def get_stats() -> Dict:
+    """Счётчики исходящей очереди"""
+    return _dispatcher.get_stats() if _dispatcher else {}
+
+
+async def request(method: str, payload: Dict[str, Any] = None, timeout: float = None) -> Dict:
+    """Прямой вызов метода Bot API (без очереди и лимитов)"""
+    session = get_session()
+    kwargs = {"json": payload or {}}
+    if timeout:
+        kwargs["timeout"] = ClientTimeout(total=timeout)
+
+    async with session.post(f"{TELEGRAM_API}/{method}", **kwargs) as resp:
+        return await resp.json()
+
+
+async def call(method: str, payload: Dict[str, Any] = None, priority: int = PRIORITY_MESSAGE, chat_id: int = None) -> Dict:
+    """Вызов метода Bot API через исходящую очередь"""
+    if _dispatcher is None:
+        return await request(method, payload)
+    return await _dispatcher.submit(method, payload or {}, priority, chat_id)
+
+
+class DispatcherStopped(Exception):
+    """Исходящая очередь остановлена — запрос не отправлен"""
+
+
+# === Rate limiting ===
+
+class TokenBucket:
+    """Token bucket: rate токенов в секунду, не больше capacity"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Взять токен. Если нельзя — сколько секунд ждать (токен не берётся)"""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def block(self, seconds: float):
+        """Пауза после 429 с retry_after"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def is_idle(self) -> bool:
+        now = time.monotonic()
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+
+class OutboundDispatcher:
+    """Очередь исходящих запросов с приоритетами, лимитами и ретраями"""
+
+    MAX_IDLE_BUCKETS = 10000
+
+    def __init__(
+        self,
+        senders: int = TELEGRAM_SENDERS,
+        global_rate: float = TELEGRAM_GLOBAL_RATE,
+        chat_rate: float = TELEGRAM_CHAT_RATE,
+        chat_burst: float = TELEGRAM_CHAT_BURST,
+        max_retries: int = TELEGRAM_MAX_RETRIES,
+    ):
+        self.senders = senders
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_buckets: Dict[int, TokenBucket] = {}
+
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._seq = itertools.count()
+        # seq -> (таймер, запрос), отложенные лимитом на чат или ретраем
+        self._delayed: Dict[int, tuple] = {}
+
+        self.stats = {
+            "queued": 0,
+            "sent": 0,
+            "throttled": 0,
+            "retried": 0,
+            "failed": 0,
+            "delayed": 0,
+            "aborted": 0,
+        }
+
+    async def start(self):
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [
+            asyncio.create_task(self._sender(), name=f"tg-sender-{i}")
+            for i in range(self.senders)
+        ]
+
+    async def stop(self):
+        """Остановить отправителей; все неотправленные запросы завершаются DispatcherStopped"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Иначе хендлеры, ждущие call(), повиснут навсегда
+        pending = [item for handle, item in self._delayed.values()]
+        for handle, _ in self._delayed.values():
+            handle.cancel()
+        self._delayed.clear()
+        if self._queue is not None:
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait()[2])
+            self._queue = None
+        for item in pending:
+            self._abort(item)
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["in_queue"] = self._queue.qsize() if self._queue else 0
+        stats["chat_buckets"] = len(self.chat_buckets)
+        return stats
+
+    def submit(self, method: str, payload: Dict, priority: int, chat_id: int = None) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        if self._queue is None:
+            future.set_exception(DispatcherStopped(method))
+            return future
+        item = {
+            "method": method,
+            "payload": payload,
+            "chat_id": chat_id,
+            "future": future,
+            "attempt": 0,
+        }
+        self.stats["queued"] += 1
+        self._put(priority, next(self._seq), item)
+        return future
+
+    def _put(self, priority: int, seq: int, item: Dict):
+        self._queue.put_nowait((priority, seq, item))
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= self.MAX_IDLE_BUCKETS:
+                self.chat_buckets = {k: b for k, b in self.chat_buckets.items() if not b.is_idle()}
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _requeue_later(self, delay: float, priority: int, seq: int, item: Dict):
+        # Сохраняем исходный seq — порядок сообщений в чате не меняется
+        handle = asyncio.get_running_loop().call_later(delay, self._put_delayed, priority, seq, item)
+        self._delayed[seq] = (handle, item)
+
+    def _put_delayed(self, priority: int, seq: int, item: Dict):
+        self._delayed.pop(seq, None)
+        self._put(priority, seq, item)
+
+    async def _sender(self):
+        while True:
+            priority, seq, item = await self._queue.get()
+            if item["future"].done():
+                continue
+
+            # Лимит на чат — не блокируем воркер, откладываем запрос
+            if item["chat_id"] is not None:
+                wait = self._chat_bucket(item["chat_id"]).delay()
+                if wait > 0:
+                    self.stats["delayed"] += 1
+                    self._requeue_later(wait, priority, seq, item)
+                    continue
+
+            try:
+                # Глобальный лимит
+                while (wait := self.global_bucket.delay()) > 0:
+                    await asyncio.sleep(wait)
+
+                await self._send(priority, seq, item)
+            except asyncio.CancelledError:
+                self._abort(item)
+                raise
+
+    async def _send(self, priority: int, seq: int, item: Dict):
+        future = item["future"]
+        try:
+            result = await request(item["method"], item["payload"])
+        except (ClientError, asyncio.TimeoutError, ValueError) as e:
+            if item["attempt"] < self.max_retries:
+                item["attempt"] += 1
+                self.stats["retried"] += 1
+                self._requeue_later(2 ** item["attempt"], priority, seq, item)
+                return
+            self._finish(future, {"ok": False, "description": str(e)}, failed=True)
+            print(f"[TG] {item['method']} failed: {e}")
+            return
+
+        if not result.get("ok") and result.get("error_code") == 429:
+            retry_after = result.get("parameters", {}).get("retry_after", 1)
+            self.stats["throttled"] += 1
+            if item["chat_id"] is not None:
+                self._chat_bucket(item["chat_id"]).block(retry_after)
+            else:
+                self.global_bucket.block(retry_after)
+
+            if item["attempt"] < self.max_retries:
+                item["attempt"] += 1
+                self.stats["retried"] += 1
+                self._requeue_later(retry_after, priority, seq, item)
+                return
+            self._finish(future, result, failed=True)
+            print(f"[TG] {item['method']} dropped after {item['attempt']} retries (429)")
+            return
+
+        self._finish(future, result, failed=not result.get("ok"))
+
+    def _finish(self, future: asyncio.Future, result: Dict, failed: bool = False):
+        self.stats["queued"] -= 1
+        self.stats["failed" if failed else "sent"] += 1
+        if not future.done():
+            future.set_result(result)
+
+    def _abort(self, item: Dict):
+        if item["future"].done():
+            return
+        self.stats["queued"] -= 1
+        self.stats["aborted"] += 1
+        item["future"].set_exception(DispatcherStopped(item["method"]))
+
+
+# === Методы ===
+
+async def send_message(chat_id: int, text: str, parse_mode: str = None, reply_markup: dict = None, priority: int = PRIORITY_MESSAGE):
+    """Отправить сообщение"""
+    payload = {"chat_id": chat_id, "text": text}
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
+    if reply_markup:
+        payload["reply_markup"] = json.dumps(reply_markup)
+
+    return await call("sendMessage", payload, priority, chat_id)
+
+
+async def edit_message(chat_id: int, message_id: int, text: str, parse_mode: str = None, reply_markup: dict = None, priority: int = PRIORITY_MESSAGE):
+    """Редактировать сообщение"""
+    payload = {"chat_id": chat_id, "message_id": message_id, "text": text}
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
+    if reply_markup:
+        payload["reply_markup"] = json.dumps(reply_markup)
+
+    return await call("editMessageText", payload, priority, chat_id)
+
+
+async def answer_callback(callback_id: str, text: str = None):
+    """Ответить на callback"""
+    payload = {"callback_query_id": callback_id}
+    if text:
+        payload["text"] = text
+
+    return await call("answerCallbackQuery", payload, PRIORITY_CALLBACK)
@@ -0,0 +1,130 @@
+"""
+Пул воркеров для обработки апдейтов Telegram
+Webhook кладёт апдейт в очередь и сразу отвечает 200,
+воркеры обрабатывают. Порядок сохраняется в рамках одного ключа (user_id).
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+
+class UpdateWorkerPool:
+    """Ограниченная очередь + N воркеров с сериализацией по ключу"""
+
+    def __init__(self, handler: Callable[..., Awaitable[Any]], workers: int = 8, max_pending: int = 1000):
+        self.handler = handler
+        self.workers_count = workers
+        self.max_pending = max_pending
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # key -> отложенные апдейты этого ключа, пока его обрабатывает другой воркер
+        self._active: Dict[Any, Deque[tuple]] = {}
+        self._pending = 0
+        self._idle: Optional[asyncio.Event] = None
+        self._accepting = False
+
+        self.stats = {
+            "submitted": 0,
+            "processed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "max_pending": 0,
+            "busy_workers": 0,
+            "total_time": 0.0,
+        }
+
+    # === Lifecycle ===
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._accepting = True
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"update-worker-{i}")
+            for i in range(self.workers_count)
+        ]
+
+    async def stop(self, timeout: float = 30):
+        """Перестать принимать апдейты, дообработать очередь, остановить воркеры"""
+        self._accepting = False
+
+        if self._idle is not None and self._pending:
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                print(f"[UPDATES] Drain timeout, dropping {self._pending} updates")
+
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # === Producer ===
+
+    def submit(self, key: Any, *args) -> bool:
+        """Поставить апдейт в очередь. False — очередь переполнена или пул остановлен"""
+        if not self._accepting or self._pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            return False
+
+        self._pending += 1
+        self._idle.clear()
+        self.stats["submitted"] += 1
+        self.stats["max_pending"] = max(self.stats["max_pending"], self._pending)
+        self._queue.put_nowait((key, args))
+        return True
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["pending"] = self._pending
+        stats["queued"] = self._queue.qsize() if self._queue else 0
+        stats["active_keys"] = len(self._active)
+        stats["workers"] = self.workers_count
+        done = stats["processed"] + stats["failed"]
+        stats["avg_time"] = round(stats["total_time"] / done, 4) if done else 0
+        return stats
+
+    # === Consumer ===
+
+    async def _worker(self):
+        while True:
+            key, args = await self._queue.get()
+
+            # Ключ уже обрабатывается — встаём за ним в очередь
+            if key in self._active:
+                self._active[key].append(args)
+                continue
+
+            backlog = self._active[key] = deque()
+            self.stats["busy_workers"] += 1
+            try:
+                await self._process(args)
+                while backlog:
+                    await self._process(backlog.popleft())
+            finally:
+                del self._active[key]
+                self.stats["busy_workers"] -= 1
+
+    async def _process(self, args: tuple):
+        started = time.perf_counter()
+        try:
+            await self.handler(*args)
+            self.stats["processed"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"[UPDATES] Handler error: {e}")
+        finally:
+            self.stats["total_time"] += time.perf_counter() - started
+            self._pending -= 1
+            if not self._pending:
+                self._idle.set()
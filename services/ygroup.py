@@ -3,22 +3,56 @@ YGroup API Client
 https://api-ru.ygroup.ru/v2/
 """
 
+import asyncio
+import json
 import os
+import random
 import re
-import requests
-from typing import Optional, List, Dict, Any
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional, List, Dict, Any, Callable
 from datetime import datetime
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
 from dotenv import load_dotenv
 
+from services.facility_catalog import FacilityCatalog
+from config.settings import (
+    YGROUP_API_URL, YGROUP_POOL_LIMIT, YGROUP_MAX_RETRIES, YGROUP_RETRY_BACKOFF, YGROUP_RETRY_AFTER_MAX,
+    YGROUP_TIMEOUT, YGROUP_LONG_TIMEOUT, YGROUP_TOKEN_CONCURRENCY,
+    YGROUP_CATALOG_FILE, YGROUP_CATALOG_TTL, YGROUP_CATALOG_RETRY,
+    YGROUP_CATALOG_CONCURRENCY, YGROUP_CATALOG_PAGE_SIZE
+)
+
 load_dotenv()
 
-API_BASE = "https://api-ru.ygroup.ru/v2"
-API_BASE_V1 = "https://api-ru.ygroup.ru/v1"
+API_BASE = f"{YGROUP_API_URL}/v2"
+API_BASE_V1 = f"{YGROUP_API_URL}/v1"
 API_TOKEN = os.getenv("YGROUP_API_TOKEN", "")
 
-# Кэш всех ЖК
-_facilities_cache: List[Dict] = []
-_cache_loaded = False
+# Кэш всех ЖК (индексированный), копия лежит в YGROUP_CATALOG_FILE
+_catalog: Optional[FacilityCatalog] = None
+_catalog_loaded_at = 0.0
+_catalog_lock = asyncio.Lock()
+_refresh_task: Optional[asyncio.Task] = None
+_refresh_failed_at = 0.0
+_preload_task: Optional[asyncio.Task] = None
+
+catalog_stats = {
+    "disk_loads": 0, "refreshes": 0, "refresh_errors": 0, "last_error": None,
+    "last_refresh_time": None, "last_fetch_time": None, "last_pages": 0,
+}
+
+_session: Optional[ClientSession] = None
+
+# Загрузки корпусов/лотов ЖК в процессе (ygroup id -> task)
+_tree_fetches: Dict[str, asyncio.Task] = {}
+
+# Ограничение одновременных запросов на один токен YGroup
+_token_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+class YGroupError(Exception):
+    """Ошибка запроса к YGroup API (после всех ретраев)"""
 
 
 def get_headers() -> Dict[str, str]:
@@ -28,109 +62,288 @@ def get_headers() -> Dict[str, str]:
     }
 
 
-def _load_all_facilities() -> List[Dict]:
-    """Загрузить все ЖК (с пагинацией)"""
-    global _facilities_cache, _cache_loaded
+def _token_semaphore() -> asyncio.Semaphore:
+    semaphore = _token_semaphores.get(API_TOKEN)
+    if semaphore is None:
+        semaphore = _token_semaphores[API_TOKEN] = asyncio.Semaphore(YGROUP_TOKEN_CONCURRENCY)
+    return semaphore
+
+
+def get_session() -> ClientSession:
+    """Общая сессия к YGroup (keep-alive)"""
+    global _session
     
-    if _cache_loaded:
-        return _facilities_cache
+    if _session is None or _session.closed:
+        _session = ClientSession(
+            connector=TCPConnector(limit=YGROUP_POOL_LIMIT, ttl_dns_cache=300),
+            headers=get_headers(),
+            timeout=ClientTimeout(total=YGROUP_TIMEOUT),
+        )
+    return _session
+
+
+async def close():
+    """Закрыть сессию при остановке приложения"""
+    global _session
     
-    all_posts = []
-    page = 1
+    for task in (_preload_task, _refresh_task):
+        if task is not None and not task.done():
+            task.cancel()
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After: секунды или HTTP-дата -> секунды ожидания"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt: int) -> float:
+    """Экспонента со случайным разбросом — ретраи разных запросов не совпадают по времени"""
+    return min(YGROUP_RETRY_BACKOFF * 2 ** (attempt - 1), 10) * random.uniform(0.5, 1)
+
+
+async def _get(url: str, params: Dict = None, timeout: float = YGROUP_TIMEOUT) -> Dict:
+    """GET с ретраями на сетевые ошибки, таймауты, 429 и 5xx (Retry-After учитывается)"""
+    session = get_session()
+    last_error = None
+    delay = None
     
-    while True:
+    for attempt in range(YGROUP_MAX_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(_backoff(attempt) if delay is None else delay)
+        delay = None
         try:
-            resp = requests.get(
-                f"{API_BASE}/facilities",
-                headers=get_headers(),
-                params={"types": 6, "per_page": 100, "page": page},
-                timeout=30
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            posts = data.get("data", {}).get("facility_posts", [])
-            
-            if not posts:
-                break
-            
-            all_posts.extend(posts)
-            
-            meta = data.get("data", {}).get("meta", {})
-            total = meta.get("total", 0)
-            
-            if len(all_posts) >= total:
+            async with _token_semaphore():
+                async with session.get(url, params=params, timeout=ClientTimeout(total=timeout)) as resp:
+                    if resp.status == 429 or resp.status >= 500:
+                        last_error = YGroupError(f"HTTP {resp.status}")
+                        retry_after = _retry_after(resp.headers.get("Retry-After"))
+                        if retry_after is not None:
+                            delay = min(retry_after, YGROUP_RETRY_AFTER_MAX)
+                        continue
+                    resp.raise_for_status()
+                    return await resp.json()
+        except (ClientError, asyncio.TimeoutError) as e:
+            last_error = e
+            # 4xx кроме 429 — повторять бессмысленно
+            status = getattr(e, "status", None)
+            if status and 400 <= status < 500:
                 break
-            
-            page += 1
-            
-        except Exception as e:
-            print(f"[YGROUP] _load_all_facilities page {page} error: {e}")
-            break
     
-    _facilities_cache = all_posts
-    _cache_loaded = True
-    print(f"[YGROUP] Loaded {len(all_posts)} facilities")
+    raise YGroupError(f"{url}: {last_error}")
+
+
+async def _fetch_facilities_page(page: int) -> Dict:
+    data = await _get(
+        f"{API_BASE}/facilities",
+        params={"types": 6, "per_page": YGROUP_CATALOG_PAGE_SIZE, "page": page},
+        timeout=YGROUP_LONG_TIMEOUT
+    )
+    return data.get("data", {})
+
+
+async def _fetch_all_facilities() -> List[Dict]:
+    """
+    Все ЖК. Первая страница даёт meta.total, остальные грузятся параллельно
+    (не больше YGROUP_CATALOG_CONCURRENCY в полёте) и склеиваются по порядку.
+    Ошибка любой страницы (после ретраев в _get) — YGroupError, без обрезанного списка.
+    """
+    started = time.perf_counter()
+    
+    first = await _fetch_facilities_page(1)
+    posts = first.get("facility_posts", [])
+    total = first.get("meta", {}).get("total", 0)
+    pages = max(1, -(-total // YGROUP_CATALOG_PAGE_SIZE))
+    
+    semaphore = asyncio.Semaphore(YGROUP_CATALOG_CONCURRENCY)
     
+    async def fetch(page: int) -> List[Dict]:
+        async with semaphore:
+            return (await _fetch_facilities_page(page)).get("facility_posts", [])
+    
+    rest = await asyncio.gather(*[fetch(page) for page in range(2, pages + 1)])
+    
+    # Листинг мог сдвинуться между запросами — убираем повторы по id
+    all_posts = []
+    seen = set()
+    for page_posts in [posts, *rest]:
+        for post in page_posts:
+            if post.get("id") not in seen:
+                seen.add(post.get("id"))
+                all_posts.append(post)
+    
+    if sum(len(p) for p in [posts, *rest]) < total:
+        raise YGroupError(f"facilities: got {len(all_posts)} of {total}")
+    
+    catalog_stats["last_fetch_time"] = round(time.perf_counter() - started, 2)
+    catalog_stats["last_pages"] = pages
     return all_posts
 
 
-def search_facilities(query: str) -> List[Dict]:
-    """Поиск ЖК по названию"""
-    all_facilities = _load_all_facilities()
+# === Каталог ЖК: диск + фоновое обновление ===
+
+def _read_catalog_file() -> Optional[tuple]:
+    """(loaded_at, FacilityCatalog) из файла или None"""
+    try:
+        with open(YGROUP_CATALOG_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+        return data["loaded_at"], FacilityCatalog(data["facilities"])
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"[YGROUP] Catalog file unreadable: {e}")
+        return None
+
+
+def _write_catalog_file(facilities: List[Dict], loaded_at: float):
+    """Атомарная запись: читатель видит либо старый файл, либо новый целиком"""
+    os.makedirs(os.path.dirname(YGROUP_CATALOG_FILE), exist_ok=True)
+    tmp_path = f"{YGROUP_CATALOG_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"loaded_at": loaded_at, "facilities": facilities}, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, YGROUP_CATALOG_FILE)
+
+
+async def _refresh() -> FacilityCatalog:
+    global _catalog, _catalog_loaded_at, _refresh_failed_at
+    
+    started = time.perf_counter()
+    try:
+        posts = await _fetch_all_facilities()
+    except YGroupError as e:
+        _refresh_failed_at = time.time()
+        catalog_stats["refresh_errors"] += 1
+        catalog_stats["last_error"] = str(e)
+        print(f"[YGROUP] Catalog refresh failed, keeping previous: {e}")
+        raise
     
-    if not query:
-        return all_facilities[:20]
+    loaded_at = time.time()
+    loop = asyncio.get_running_loop()
+    catalog = await loop.run_in_executor(None, FacilityCatalog, posts)
+    _catalog, _catalog_loaded_at = catalog, loaded_at
     
-    query_lower = query.lower()
-    results = [
-        f for f in all_facilities 
-        if query_lower in f.get("name", "").lower()
-    ]
+    try:
+        await loop.run_in_executor(None, _write_catalog_file, posts, loaded_at)
+    except OSError as e:
+        print(f"[YGROUP] Catalog file write error: {e}")
     
-    return results[:20]
+    catalog_stats["refreshes"] += 1
+    catalog_stats["last_refresh_time"] = round(time.perf_counter() - started, 2)
+    print(f"[YGROUP] Loaded {len(posts)} facilities in {catalog_stats['last_refresh_time']}s")
+    return catalog
+
+
+def _on_refresh_done(task: asyncio.Task):
+    # Ошибка уже залогирована в _refresh; забираем её, чтобы не было warning
+    if not task.cancelled():
+        task.exception()
 
 
-def get_facility(facility_id: str) -> Optional[Dict]:
+async def refresh_catalog() -> FacilityCatalog:
+    """Перезагрузить каталог из API; одновременные вызовы ждут одну загрузку"""
+    global _refresh_task
+    
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.ensure_future(_refresh())
+        _refresh_task.add_done_callback(_on_refresh_done)
+    return await asyncio.shield(_refresh_task)
+
+
+def _refresh_in_background():
+    global _refresh_task
+    
+    if _refresh_task is not None and not _refresh_task.done():
+        return
+    if time.time() - _refresh_failed_at < YGROUP_CATALOG_RETRY:
+        return
+    _refresh_task = asyncio.ensure_future(_refresh())
+    _refresh_task.add_done_callback(_on_refresh_done)
+
+
+async def _load_all_facilities() -> FacilityCatalog:
+    """
+    Каталог ЖК (stale-while-revalidate):
+    сразу отдаём то, что есть в памяти или на диске, а устаревший
+    каталог обновляем в фоне. Ждём API только при самом первом запуске.
+    """
+    global _catalog, _catalog_loaded_at
+    
+    if _catalog is None:
+        async with _catalog_lock:
+            if _catalog is None:
+                loop = asyncio.get_running_loop()
+                cached = await loop.run_in_executor(None, _read_catalog_file)
+                if cached is not None:
+                    _catalog_loaded_at, _catalog = cached
+                    catalog_stats["disk_loads"] += 1
+                    print(f"[YGROUP] Catalog from disk: {len(_catalog)} facilities")
+    
+    if _catalog is None:
+        try:
+            return await refresh_catalog()
+        except YGroupError:
+            # Пустой каталог не запоминаем — следующий запрос попробует снова
+            return FacilityCatalog([])
+    
+    if time.time() - _catalog_loaded_at > YGROUP_CATALOG_TTL:
+        _refresh_in_background()
+    
+    return _catalog
+
+
+def preload_catalog():
+    """Прогрев при старте в фоне, чтобы первый поиск не ждал"""
+    global _preload_task
+    
+    _preload_task = asyncio.ensure_future(_load_all_facilities())
+    _preload_task.add_done_callback(_on_refresh_done)
+
+
+def get_catalog_stats() -> Dict:
+    result = dict(catalog_stats)
+    result["facilities"] = len(_catalog) if _catalog is not None else 0
+    result["age"] = round(time.time() - _catalog_loaded_at) if _catalog is not None else None
+    result["refreshing"] = _refresh_task is not None and not _refresh_task.done()
+    return result
+
+
+async def search_facilities(query: str, city: str = None, developer: str = None) -> List[Dict]:
+    """Поиск ЖК по названию (ё/е, латиница/кириллица, кавычки не важны)"""
+    catalog = await _load_all_facilities()
+    return catalog.search(query, city=city, developer=developer, limit=20)
+
+
+async def get_facility(facility_id: str) -> Optional[Dict]:
     """Получить ЖК из кэша по ID"""
-    all_facilities = _load_all_facilities()
-    for f in all_facilities:
-        if f.get("id") == facility_id:
-            return f
-    return None
+    catalog = await _load_all_facilities()
+    return catalog.get(facility_id)
 
 
-def get_clusters(facility_id: str) -> List[Dict]:
-    """Получить корпуса ЖК"""
-    try:
-        resp = requests.get(
-            f"{API_BASE_V1}/clusters",
-            headers=get_headers(),
-            params={"facility_id": facility_id},
-            timeout=10
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        return data.get("data", {}).get("clusters", [])
-    except Exception as e:
-        print(f"[YGROUP] get_clusters error: {e}")
-        return []
+async def fetch_clusters(facility_id: str) -> List[Dict]:
+    """Корпуса ЖК; при ошибке — YGroupError"""
+    data = await _get(f"{API_BASE_V1}/clusters", params={"facility_id": facility_id})
+    return data.get("data", {}).get("clusters", [])
 
 
-def get_lots(cluster_id: str) -> List[Dict]:
-    """Получить лоты корпуса"""
-    try:
-        resp = requests.get(
-            f"{API_BASE_V1}/lots",
-            headers=get_headers(),
-            params={"cluster_id": cluster_id},
-            timeout=30
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        return data.get("data", {}).get("lots", [])
-    except Exception as e:
-        print(f"[YGROUP] get_lots error: {e}")
-        return []
+async def fetch_lots(cluster_id: str) -> List[Dict]:
+    """Лоты корпуса; при ошибке — YGroupError"""
+    data = await _get(
+        f"{API_BASE_V1}/lots",
+        params={"cluster_id": cluster_id},
+        timeout=YGROUP_LONG_TIMEOUT
+    )
+    return data.get("data", {}).get("lots", [])
 
 
 # === Data Transformation ===
@@ -242,6 +455,32 @@ def transform_lot(lot: Dict, property_id: int, building_id: int, building_number
     }
 
 
+def transform_clusters(clusters: List[Dict], lots_by_cluster: List[List[Dict]]) -> tuple:
+    """
+    Корпуса и их лоты -> (buildings, units_by_building) без id.
+    В исходном порядке корпусов, чтобы нумерация и коды лотов были детерминированы.
+    """
+    buildings = []
+    units_by_building = []
+    # Код лота уникален в корпусе (индекс idx_units_code), а YGroup может дать
+    # одинаковые номера — например, в двух секциях одного корпуса
+    seen = set()
+    for cluster, lots in zip(clusters, lots_by_cluster):
+        building_data = transform_cluster(cluster, None)
+        buildings.append(building_data)
+        units = []
+        for lot in lots:
+            unit = transform_lot(lot, None, None, building_data["number"])
+            code, n = unit["code"], 1
+            while (unit["building"], unit["code"]) in seen:
+                n += 1
+                unit["code"] = f"{code}-{n}"
+            seen.add((unit["building"], unit["code"]))
+            units.append(unit)
+        units_by_building.append(units)
+    return buildings, units_by_building
+
+
 def _map_lot_status(status) -> str:
     """Маппинг статуса лота из YGroup API"""
     if status == 2:
@@ -251,66 +490,123 @@ def _map_lot_status(status) -> str:
     return "available"
 
 
-def import_facility(user_id: int, facility_id: str) -> Dict[str, Any]:
-    """Импортировать ЖК со всеми корпусами и лотами"""
-    from db.database import (
-        create_property, create_building, create_unit,
-        update_property_stats, set_property_custom, get_property_by_ygroup_id
-    )
+# Параметры расчёта по умолчанию для нового ЖК
+DEFAULT_PROPERTY_CUSTOM = {
+    "appreciation_rate": 10,
+    "occupancy_rate": 70,
+    "operating_expenses_pct": 10,
+    "management_fee_pct": 20,
+    "tax_rate": 4,
+}
+
+
+async def _load_facility_tree(facility_id: str, progress: Optional[Callable] = None) -> tuple:
+    """
+    Корпуса и параллельно лоты всех корпусов -> (buildings, units_by_building).
+    progress(clusters_done, clusters_total, lots_loaded) — после каждого корпуса.
+    Дерево попадает в общий каталог для всех риэлторов, поэтому неполное не
+    возвращаем: ошибка любого запроса или пустой список корпусов — YGroupError
+    """
+    clusters = await fetch_clusters(facility_id)
+    if not clusters:
+        raise YGroupError(f"facility {facility_id}: no clusters")
+    done = {"clusters": 0, "lots": 0}
+    if progress:
+        progress(0, len(clusters), 0)
     
+    async def lots_of(cluster: Dict) -> List[Dict]:
+        lots = await fetch_lots(cluster["id"])
+        done["clusters"] += 1
+        done["lots"] += len(lots)
+        if progress:
+            progress(done["clusters"], len(clusters), done["lots"])
+        return lots
+    
+    lots_by_cluster = await asyncio.gather(*[lots_of(c) for c in clusters])
+    return transform_clusters(clusters, lots_by_cluster)
+
+
+async def _fetch_facility_tree(facility_id: str, progress: Optional[Callable] = None) -> tuple:
+    """Одновременные импорты одного ЖК ждут одну загрузку"""
+    task = _tree_fetches.get(facility_id)
+    if task is None:
+        task = _tree_fetches[facility_id] = asyncio.ensure_future(_load_facility_tree(facility_id, progress))
+        task.add_done_callback(lambda _: _tree_fetches.pop(facility_id, None))
+    return await asyncio.shield(task)
+
+
+async def import_facility(user_id: int, facility_id: str, progress: Optional[Callable] = None) -> Dict[str, Any]:
+    """
+    Добавить ЖК риэлтору. Корпуса и лоты хранятся в общем каталоге один раз:
+    если ЖК уже загружал другой риэлтор, YGroup не запрашиваем.
+    progress — см. _load_facility_tree.
+    """
+    from db.aio import import_property, get_property_by_ygroup_id, get_facility_by_ygroup_id
+    
+    started = time.perf_counter()
     result = {
         "success": False,
         "property_id": None,
         "buildings_count": 0,
         "units_count": 0,
-        "error": None
+        "shared": False,
+        "elapsed": None,
+        "error": None,
+        "retryable": False,
+        "ygroup_facility_id": facility_id,
     }
     
     # 0. Проверка на дубликат
-    existing = get_property_by_ygroup_id(user_id, facility_id)
+    existing = await get_property_by_ygroup_id(user_id, facility_id)
     if existing:
         result["error"] = "Этот ЖК уже добавлен"
         return result
     
     # 1. Получаем данные ЖК
-    facility = get_facility(facility_id)
+    facility = await get_facility(facility_id)
     if not facility:
         result["error"] = "ЖК не найден в YGroup"
         return result
-    
-    # 2. Создаём property
     property_data = transform_facility(facility)
-    property_id = create_property(user_id, property_data)
-    result["property_id"] = property_id
-    
-    # 3. Дефолтные кастомные данные
-    set_property_custom(property_id, {
-        "appreciation_rate": 10,
-        "occupancy_rate": 70,
-        "operating_expenses_pct": 10,
-        "management_fee_pct": 20,
-        "tax_rate": 4,
-    })
-    
-    # 4. Получаем корпуса
-    clusters = get_clusters(facility_id)
-    
-    for cluster in clusters:
-        building_data = transform_cluster(cluster, property_id)
-        building_id = create_building(property_id, building_data)
-        building_number = building_data["number"]
-        result["buildings_count"] += 1
-        
-        # Лоты корпуса
-        lots = get_lots(cluster["id"])
-        for lot in lots:
-            unit_data = transform_lot(lot, property_id, building_id, building_number)
-            create_unit(property_id, building_id, unit_data)
-            result["units_count"] += 1
     
-    update_property_stats(property_id)
+    # 2. Корпуса, лоты и характеристики — только если ЖК ещё нет в общем каталоге
+    buildings = units_by_building = None
+    shared = await get_facility_by_ygroup_id(facility_id)
+    if shared and shared["synced_at"]:
+        result["shared"] = True
+    else:
+        try:
+            (buildings, units_by_building), details = await asyncio.gather(
+                _fetch_facility_tree(facility_id, progress),
+                get_facility_details(facility_id)
+            )
+        except YGroupError as e:
+            print(f"[YGROUP] import_facility {facility_id} fetch error: {e}")
+            result["error"] = "YGroup не отдал корпуса и лоты ЖК, попробуй позже"
+            result["retryable"] = True
+            return result
+        if details:
+            # Пустые значения карточки не затирают адрес и описание из каталога
+            property_data.update({k: v for k, v in transform_facility_details(details).items() if v})
+    
+    # 3. Запись одной транзакцией (каталог, ссылка риэлтора, дефолтные кастомные данные, статистика)
+    try:
+        written = await import_property(
+            user_id, property_data, DEFAULT_PROPERTY_CUSTOM,
+            buildings, units_by_building
+        )
+    except Exception as e:
+        print(f"[YGROUP] import_facility {facility_id} write error: {e}")
+        result["error"] = "Не удалось сохранить ЖК"
+        return result
+    
+    result.update(written)
     result["success"] = True
-    print(f"[YGROUP] Imported: {property_data['name']} — {result['buildings_count']} buildings, {result['units_count']} units")
+    result["elapsed"] = round(time.perf_counter() - started, 2)
+    print(
+        f"[YGROUP] Imported: {property_data['name']} — {result['buildings_count']} buildings, "
+        f"{result['units_count']} units in {result['elapsed']}s" + (" (shared catalog)" if result["shared"] else "")
+    )
     
     return result
 
@@ -375,16 +671,10 @@ PAYMENT_METHOD = {
 }
 
 
-def get_facility_details(facility_id: str) -> Optional[Dict]:
+async def get_facility_details(facility_id: str) -> Optional[Dict]:
     """Получить детальную информацию о ЖК (v1 API)"""
     try:
-        resp = requests.get(
-            f"{API_BASE_V1}/facilities/{facility_id}",
-            headers=get_headers(),
-            timeout=10
-        )
-        resp.raise_for_status()
-        data = resp.json()
+        data = await _get(f"{API_BASE_V1}/facilities/{facility_id}")
         return data.get("data", {}).get("facility")
     except Exception as e:
         print(f"[YGROUP] get_facility_details error: {e}")
@@ -0,0 +1,51 @@
+"""
+Общие фикстуры тестов
+
+    python -m pytest -q
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from db import aio, database, migrations  # noqa: E402
+
+
+@pytest.fixture
+def temp_db(tmp_path):
+    """Пустая база со всеми миграциями; кэши db.aio не помнят прошлых тестов"""
+    database.close_connection()
+    old_path = database.DB_PATH
+    database.DB_PATH = migrations.DB_PATH = tmp_path / "realt.db"
+    migrations.migrate()
+    for cache in (aio.property_cache, aio.building_cache, aio.custom_cache):
+        cache.clear()
+    aio.user_states._states.clear()
+    aio.user_states._dirty.clear()
+    # Как в новом процессе: прошлый тест мог остановить db.aio
+    aio._stopped = False
+    yield database.DB_PATH
+    database.close_connection()
+    database.DB_PATH = migrations.DB_PATH = old_path
+
+
+@pytest.fixture
+def imported(temp_db):
+    """ЖК риэлтора 1: 2 корпуса по 3 этажа, 4 лота на этаже"""
+    buildings, units_by_building = [], []
+    for b in (1, 2):
+        buildings.append({"ygroup_cluster_id": f"c{b}", "name": f"Корпус {b}", "number": b, "floors_count": 3})
+        units_by_building.append([
+            {
+                "ygroup_lot_id": f"l{b}-{i}", "code": f"{b}-{i + 1}", "building": b, "floor": i // 4 + 1,
+                "rooms": i % 3, "area_m2": 30.0 + i, "price_rub": 5_000_000 + 100_000 * i,
+                "price_per_m2": 150_000, "status": "available",
+            }
+            for i in range(12)
+        ])
+    return database.import_property(
+        1, {"ygroup_facility_id": "f1", "name": "ЖК Тест"}, {"tax_rate": 4}, buildings, units_by_building
+    )
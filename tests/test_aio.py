@@ -0,0 +1,78 @@
+"""
+Асинхронный фасад БД (db/aio.py): чтения не ждут писателя и не блокируют event loop
+"""
+
+import asyncio
+import time
+
+from db import aio
+
+
+def test_hundred_users_are_not_blocked_by_a_slow_write(imported):
+    property_id = imported["property_id"]
+
+    def slow_write():
+        time.sleep(0.3)
+
+    async def run():
+        aio.start()
+        lag = []
+
+        async def ticker():
+            while True:
+                before = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lag.append(time.perf_counter() - before - 0.005)
+
+        tick = asyncio.ensure_future(ticker())
+        write = asyncio.ensure_future(aio.run_write(slow_write))
+        await asyncio.sleep(0.01)
+
+        started = time.perf_counter()
+        units = await asyncio.gather(*[
+            aio.get_unit_by_code(property_id, f"1-{user % 12 + 1}") for user in range(100)
+        ])
+        states = await asyncio.gather(*[aio.get_user_state(user) for user in range(100)])
+        reads_time = time.perf_counter() - started
+
+        await write
+        tick.cancel()
+        await aio.stop()
+        return units, states, reads_time, max(lag)
+
+    units, states, reads_time, max_lag = asyncio.run(run())
+
+    assert all(u is not None for u in units)
+    assert [s["user_id"] for s in states] == list(range(100))
+    # Запись в потоке-писателе ещё идёт, а все 100 пользователей уже получили ответ
+    assert reads_time < 0.2
+    assert max_lag < 0.05
+
+
+def test_late_calls_after_stop_do_not_restart_threads(imported):
+    property_id = imported["property_id"]
+
+    async def run():
+        # Первый вызов поднимает потоки сам
+        assert (await aio.get_unit_by_code(property_id, "1-1")) is not None
+        await aio.stop()
+
+        errors = []
+        for call in (aio.get_unit_by_code(property_id, "1-2"), aio.run_write(lambda: None)):
+            try:
+                await call
+            except aio.DatabaseStopped as e:
+                errors.append(e)
+        threads = (aio._read_executor, aio._writer)
+
+        # Явный start() — снова можно
+        aio.start()
+        unit = await aio.get_unit_by_code(property_id, "1-3")
+        await aio.stop()
+        return errors, threads, unit
+
+    errors, threads, unit = asyncio.run(run())
+
+    assert len(errors) == 2
+    assert threads == (None, None)
+    assert unit is not None
@@ -0,0 +1,53 @@
+"""
+Обращения к БД на апдейт (app.process_update + db.aio.count_calls):
+экраны лота читают всё одним get_lot_context — было 4 запроса на нажатие
+"""
+
+import asyncio
+
+import pytest
+
+import app
+from db import aio
+
+# callback -> обращений к БД; состояние диалога пишется в память (write_back)
+EXPECTED_CALLS = {
+    "lot:{pid}:1-5": 1,
+    "roi:{pid}:1-5": 1,
+    "compare:{pid}:1-5": 1,
+    "compare_years:{pid}:1-5:5": 1,
+}
+
+
+@pytest.fixture
+def bot_api(monkeypatch):
+    sent = []
+
+    async def record(*args, **kwargs):
+        sent.append(kwargs.get("text") or (args[2] if len(args) > 2 else None))
+
+    for name in ("send_message", "edit_message", "answer_callback"):
+        monkeypatch.setattr(app, name, record)
+    return sent
+
+
+@pytest.mark.parametrize("data", list(EXPECTED_CALLS))
+def test_lot_screens_make_one_db_call(imported, bot_api, data):
+    callback = data.format(pid=imported["property_id"])
+    update = {"callback_query": {
+        "id": "1", "from": {"id": 7}, "message": {"message_id": 10}, "data": callback,
+    }}
+
+    async def run():
+        aio.start()
+        try:
+            before = aio.stats["update_calls"]
+            await app.process_update(update)
+            return aio.stats["update_calls"] - before
+        finally:
+            await aio.stop()
+
+    calls = asyncio.run(run())
+
+    assert bot_api and "не найден" not in str(bot_api[-1])
+    assert calls == EXPECTED_CALLS[data]
@@ -0,0 +1,75 @@
+"""
+Импорт ЖК в общий каталог (services/ygroup.py::import_facility)
+"""
+
+import asyncio
+
+from db import aio, database
+from services import ygroup
+from services.ygroup import YGroupError
+
+CLUSTERS = [{"id": "c1", "name": "Корпус 1"}, {"id": "c2", "name": "Корпус 2"}]
+LOTS = {
+    "c1": [{"id": "l1", "name": "Кв. 1", "total_price": 5_000_000}, {"id": "l2", "name": "Кв. 2"}],
+    "c2": [{"id": "l3", "name": "Кв. 3", "total_price": 6_000_000}],
+}
+
+
+def stub_ygroup(monkeypatch, broken_cluster: str = None):
+    async def get_facility(facility_id):
+        return {"id": facility_id, "name": "ЖК Тест"}
+
+    async def get_facility_details(facility_id):
+        return None
+
+    async def fetch_clusters(facility_id):
+        return CLUSTERS
+
+    async def fetch_lots(cluster_id):
+        if cluster_id == broken_cluster:
+            raise YGroupError("HTTP 503")
+        return LOTS[cluster_id]
+
+    for name, fn in (("get_facility", get_facility), ("get_facility_details", get_facility_details),
+                     ("fetch_clusters", fetch_clusters), ("fetch_lots", fetch_lots)):
+        monkeypatch.setattr(ygroup, name, fn)
+
+
+def run_import(user_id: int) -> dict:
+    async def run():
+        aio.start()
+        try:
+            return await ygroup.import_facility(user_id, "f1")
+        finally:
+            await aio.stop()
+    return asyncio.run(run())
+
+
+def test_failed_lot_fetch_leaves_no_shared_tree(temp_db, monkeypatch):
+    stub_ygroup(monkeypatch, broken_cluster="c2")
+    result = run_import(1)
+
+    assert not result["success"]
+    assert result["error"]
+    assert database.get_facility_by_ygroup_id("f1") is None
+    assert database.get_property_by_ygroup_id(1, "f1") is None
+
+    # Следующий импорт идёт в YGroup заново и получает всё дерево
+    stub_ygroup(monkeypatch)
+    result = run_import(2)
+    assert result["success"] and not result["shared"]
+    assert (result["buildings_count"], result["units_count"]) == (2, 3)
+    assert database.get_facility_by_ygroup_id("f1")["synced_at"]
+
+
+def test_empty_cluster_list_is_an_error(temp_db, monkeypatch):
+    stub_ygroup(monkeypatch)
+
+    async def no_clusters(facility_id):
+        return []
+
+    monkeypatch.setattr(ygroup, "fetch_clusters", no_clusters)
+    result = run_import(1)
+
+    assert not result["success"]
+    assert database.get_facility_by_ygroup_id("f1") is None
@@ -0,0 +1,43 @@
+"""
+Синхронизация лотов (services/lot_sync.py): остановка не оставляет синхронизаций,
+которые продолжают ходить в YGroup и писать в базу после aio.stop()
+"""
+
+import asyncio
+
+from db import aio
+from services import lot_sync, ygroup
+
+
+def test_stop_cancels_shielded_syncs(imported, monkeypatch):
+    fetches = {"started": 0, "cancelled": 0}
+
+    async def slow_clusters(facility_id):
+        fetches["started"] += 1
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            fetches["cancelled"] += 1
+            raise
+
+    monkeypatch.setattr(ygroup, "fetch_clusters", slow_clusters)
+
+    async def run():
+        aio.start()
+        # Задача планировщика: её отмена до синхронизации не доходит (shield)
+        job = asyncio.ensure_future(lot_sync.sync_all())
+        await asyncio.sleep(0.05)
+        job.cancel()
+        await asyncio.gather(job, return_exceptions=True)
+        left_after_job_cancel = len(lot_sync._in_flight)
+
+        await lot_sync.stop()
+        await aio.stop()
+        return left_after_job_cancel
+
+    left_after_job_cancel = asyncio.run(run())
+
+    assert fetches["started"] == 1
+    assert left_after_job_cancel == 1
+    assert fetches["cancelled"] == 1
+    assert lot_sync._in_flight == {}
@@ -0,0 +1,107 @@
+"""
+Импорт ЖК из хендлера (handlers/properties.py): очередь, повторные нажатия, ошибки
+"""
+
+import asyncio
+
+import handlers.properties as properties
+from handlers.router import router
+from services.import_queue import ImportQueue, COALESCED, QUEUED
+
+
+def test_duplicate_tap_leaves_progress_message_alone(monkeypatch):
+    edits = []
+
+    async def edit_message(chat_id, message_id, text, parse_mode=None, reply_markup=None, priority=None):
+        edits.append((message_id, text))
+
+    async def run():
+        release = asyncio.Event()
+
+        async def runner(user_id, facility_id, progress=None):
+            progress(1, 2, 10)
+            await release.wait()
+            return {"success": False, "error": "YGroup не отдал корпуса и лоты ЖК, попробуй позже",
+                    "retryable": True, "ygroup_facility_id": facility_id}
+
+        queue = ImportQueue(runner, properties.show_import_progress, properties.show_import_result,
+                            workers=1, progress_interval=0)
+        monkeypatch.setattr(properties, "import_queue", queue)
+        await queue.start()
+
+        context = {"send_message": None, "edit_message": edit_message, "user_id": 7, "message_id": 10}
+        assert await router.dispatch_callback("import_facility:abc123", context)
+        await asyncio.sleep(0.01)
+        shown = list(edits)
+
+        # Второе нажатие того же риэлтора — импорт уже идёт, сообщение с прогрессом не трогаем
+        assert await router.dispatch_callback("import_facility:abc123", {**context, "message_id": 11})
+        await asyncio.sleep(0.01)
+        after_duplicate = list(edits)
+
+        release.set()
+        await asyncio.sleep(0.01)
+        await queue.stop()
+        return shown, after_duplicate, queue.get_stats()
+
+    shown, after_duplicate, stats = asyncio.run(run())
+
+    # Статус, затем прогресс — оба в исходное сообщение
+    assert [message_id for message_id, _ in shown] == [10, 10]
+    assert "несколько секунд" in shown[0][1] and "Корпусов: 1 из 2" in shown[1][1]
+    assert after_duplicate == shown
+    assert stats["duplicates"] == 1
+    assert edits[-1][0] == 10 and edits[-1][1].startswith("❌ Ошибка: YGroup не отдал")
+
+
+def test_failed_fetch_offers_retry():
+    sent = {}
+
+    async def edit_message(**kwargs):
+        sent.update(kwargs)
+
+    result = {"success": False, "error": "YGroup не отдал корпуса и лоты ЖК, попробуй позже",
+              "retryable": True, "ygroup_facility_id": "abc123"}
+    asyncio.run(properties.show_import_result(edit_message, 7, 10, result))
+
+    buttons = [b["callback_data"] for row in sent["reply_markup"]["inline_keyboard"] for b in row]
+    assert buttons == ["import_facility:abc123", "back_to_list"]
+
+
+def test_stop_tells_every_waiter_the_import_was_cancelled():
+    edits = {}
+
+    async def edit_message(chat_id, message_id, text, parse_mode=None, reply_markup=None, priority=None):
+        edits[message_id] = (text, reply_markup)
+
+    async def run():
+        async def runner(user_id, facility_id, progress=None):
+            await asyncio.sleep(10)
+
+        queue = ImportQueue(runner, properties.show_import_progress, properties.show_import_result, workers=1)
+        await queue.start()
+        # abc — в работе у двоих риэлторов, def — ждёт в очереди
+        statuses = [
+            queue.submit(7, "abc", 10, edit_message),
+            queue.submit(8, "abc", 11, edit_message),
+            queue.submit(9, "def", 12, edit_message),
+        ]
+        await asyncio.sleep(0.01)
+        await queue.stop()
+        stats = queue.get_stats()
+
+        # Старые задачи не мешают новому запуску
+        await queue.start()
+        again = queue.submit(7, "abc", 13, edit_message)
+        await queue.stop()
+        return statuses, stats, again
+
+    statuses, stats, again = asyncio.run(run())
+
+    assert statuses == [QUEUED, COALESCED, QUEUED]
+    assert stats["cancelled"] == 3 and stats["pending"] == 0
+    for message_id, facility_id in ((10, "abc"), (11, "abc"), (12, "def")):
+        text, keyboard = edits[message_id]
+        assert text.startswith("❌ Ошибка: Импорт прерван")
+        assert keyboard["inline_keyboard"][0][0]["callback_data"] == f"import_facility:{facility_id}"
+    assert again == QUEUED
@@ -0,0 +1,78 @@
+"""
+Горячие запросы db/database.py идут по индексам: EXPLAIN QUERY PLAN каждого
+выполненного оператора не содержит полного прохода по units
+"""
+
+import re
+
+import pytest
+
+from db import database
+
+# «SCAN units», «SCAN u» (алиас) — полный проход; SEARCH ... USING INDEX — по индексу
+FULL_SCAN = re.compile(r"\bSCAN (units|u)\b")
+
+
+def traced(fn) -> list:
+    """Операторы, которые выполнил fn (с подставленными параметрами)"""
+    statements = []
+    conn = database.get_connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        fn()
+    finally:
+        conn.set_trace_callback(None)
+    return [s for s in statements if re.match(r"\s*(SELECT|UPDATE|DELETE|INSERT INTO \w+\s+SELECT)", s, re.I)]
+
+
+def plan(statement: str) -> list:
+    return [row["detail"] for row in database.get_connection().execute(f"EXPLAIN QUERY PLAN {statement}")]
+
+
+def hot_calls(imported: dict) -> dict:
+    property_id, facility_id = imported["property_id"], imported["facility_id"]
+    buildings = [
+        {"ygroup_cluster_id": b["ygroup_cluster_id"], "name": b["name"], "number": b["number"]}
+        for b in database.get_property_buildings(property_id)
+    ]
+    units = database.get_property_units(property_id)
+    units_by_building = [[dict(u, price_rub=u["price_rub"] + 1) for u in units if u["building"] == b["number"]]
+                         for b in buildings]
+    return {
+        "get_unit_by_code": lambda: database.get_unit_by_code(property_id, "1-5"),
+        "get_unit_by_code(building)": lambda: database.get_unit_by_code(property_id, "1-5", 1),
+        "get_lot_context": lambda: database.get_lot_context(property_id, "2-3"),
+        "get_property_units": lambda: database.get_property_units(property_id),
+        "get_property_units(building)": lambda: database.get_property_units(property_id, 2),
+        "get_property_units(floor)": lambda: database.get_property_units(property_id, 2, 3),
+        "get_available_floors": lambda: database.get_available_floors(property_id, 1),
+        "get_building_stats": lambda: database.get_building_stats(property_id),
+        "get_property_by_ygroup_id": lambda: database.get_property_by_ygroup_id(1, "f1"),
+        "sync_facility": lambda: database.sync_facility(facility_id, buildings, units_by_building),
+        "update_facility_stats": lambda: database.update_facility_stats(facility_id),
+    }
+
+
+CALLS = [
+    "get_unit_by_code", "get_unit_by_code(building)", "get_lot_context",
+    "get_property_units", "get_property_units(building)", "get_property_units(floor)",
+    "get_available_floors", "get_building_stats", "get_property_by_ygroup_id",
+    "sync_facility", "update_facility_stats",
+]
+
+
+@pytest.mark.parametrize("name", CALLS)
+def test_hot_statements_use_indexes(imported, name):
+    statements = traced(hot_calls(imported)[name])
+    assert statements, f"{name}: no statements traced"
+    for statement in statements:
+        details = plan(statement)
+        assert not any(FULL_SCAN.search(d) for d in details), f"{name}: {statement.strip()}\n{details}"
+
+
+@pytest.mark.parametrize("name", ["get_unit_by_code", "get_unit_by_code(building)", "get_lot_context"])
+def test_lot_lookups_seek_by_code(imported, name):
+    # Поиск по facility_id без кода — тоже SEARCH, но перебирает все лоты ЖК
+    for statement in traced(hot_calls(imported)[name]):
+        units = [d for d in plan(statement) if re.match(r"SEARCH (units|u)\b", d)]
+        assert units and all("code=?" in d for d in units), f"{name}: {units}"
@@ -0,0 +1,146 @@
+"""
+Подбор по бюджету и счётчики db/search.py
+"""
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from config.settings import States
+from db import aio, database, search
+from handlers import search as search_handlers
+from handlers.router import router
+
+
+def _budget_search(property_id: int, text: str) -> tuple:
+    sent = []
+
+    async def send_message(**kwargs):
+        sent.append(kwargs["text"])
+
+    async def run():
+        aio.start()
+        try:
+            await aio.set_user_state(7, property_id=property_id, state=States.SEARCH_BY_BUDGET)
+            await search_handlers.handle_search_budget(send_message, 7, text)
+            return await aio.get_user_state(7)
+        finally:
+            await aio.stop()
+
+    state = asyncio.run(run())
+    return sent[-1], state
+
+
+def test_budget_upper_bound_has_no_lower_price(imported):
+    text, state = _budget_search(imported["property_id"], "1000")
+
+    filters = json.loads(state["state_data"])["filters"]
+    assert filters["min_price"] is None
+    assert "до " in text and "от 0" not in text
+
+
+def test_budget_not_found_shows_only_upper_bound(imported):
+    text, _ = _budget_search(imported["property_id"], "0.001")
+
+    assert "Не найдено" in text
+    assert "до " in text and "0 ₽ -" not in text
+
+
+def _page_callback(property_id: int, data: str) -> tuple:
+    """Найти все лоты бюджетом, затем нажать кнопку страницы data -> (обработан ли, отправленные тексты)"""
+    edited = []
+
+    async def edit_message(**kwargs):
+        edited.append(kwargs["text"])
+
+    async def send_message(**kwargs):
+        pass
+
+    async def run():
+        aio.start()
+        try:
+            await aio.set_user_state(7, property_id=property_id, state=States.SEARCH_BY_BUDGET)
+            await search_handlers.handle_search_budget(send_message, 7, "1000")
+            context = {"send_message": send_message, "edit_message": edit_message, "user_id": 7, "message_id": 10}
+            return await router.dispatch_callback(data.format(pid=property_id), context)
+        finally:
+            await aio.stop()
+
+    return asyncio.run(run()), edited
+
+
+def test_page_callback_with_bad_cursor_is_rejected(imported):
+    handled, edited = _page_callback(imported["property_id"], "page:{pid}:2:n:12abc:5")
+
+    assert handled is False
+    assert edited == []
+
+
+def test_page_callback_with_unknown_direction_expires(imported):
+    handled, edited = _page_callback(imported["property_id"], "page:{pid}:2:x:1000:5")
+
+    assert handled is True
+    assert edited and "устарели" in edited[-1]
+
+
+def test_search_stats_counted_from_read_threads(imported):
+    property_id = imported["property_id"]
+    before = search.get_stats()
+
+    def run(_):
+        try:
+            for _ in range(25):
+                search.search_units(property_id, {"min_floor": 2}, limit=3)
+        finally:
+            database.close_connection()
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(run, range(8)))
+
+    after = search.get_stats()
+    assert after["searches"] - before["searches"] == 200
+    assert sum(after["plans"].values()) - sum(before["plans"].values()) == 200
+    assert sum(after["totals"].values()) - sum(before["totals"].values()) == 200
+
+
+def test_plan_is_chosen_by_cost_and_timeout_falls_back_to_sqlite(imported, monkeypatch):
+    property_id = imported["property_id"]
+    criteria = {"min_floor": 2, "status": "available"}
+    expected = search.search_units(property_id, criteria, limit=5)
+    assert search.search_units(property_id, criteria, limit=5)["index"] == expected["index"]
+
+    # Страховка сработала сразу: страница та же, но по плану SQLite, число найденных — оценка
+    monkeypatch.setattr(search, "SEARCH_TIMEOUT_MS", 0)
+    monkeypatch.setattr(search, "PROGRESS_OPS", 1)
+    before = search.get_stats()["fallbacks"]
+    page = search.search_units(property_id, criteria, limit=5)
+
+    assert page["index"] == "sqlite"
+    assert [u["id"] for u in page["units"]] == [u["id"] for u in expected["units"]]
+    assert page["total_mode"] == search.TOTAL_ESTIMATE
+    assert search.get_stats()["fallbacks"] == before + 1
+
+
+def test_total_counts_only_lots_reachable_by_paging(imported):
+    property_id = imported["property_id"]
+    conn = database.get_connection()
+    conn.execute("UPDATE units SET price_per_m2 = NULL WHERE code IN ('1-1', '1-2', '2-7')")
+    conn.commit()
+
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        first = search.search_units(property_id, {}, "price_m2", limit=5)
+    finally:
+        conn.set_trace_callback(None)
+    count = next(s for s in statements if "COUNT(" in s)
+    assert all("COVERING INDEX" in row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {count}"))
+
+    seen, page = list(first["units"]), first
+    while page["has_next"]:
+        last = page["units"][-1]
+        page = search.search_units(property_id, {}, "price_m2", after=(last["price_per_m2"], last["id"]), limit=5)
+        seen += page["units"]
+
+    assert first["total_mode"] == search.TOTAL_EXACT
+    assert first["total"] == len(seen) == 21
@@ -0,0 +1,78 @@
+"""
+Исходящая очередь Bot API (services/telegram.py) с подменённым request()
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from services import telegram
+from services.telegram import DispatcherStopped, OutboundDispatcher, PRIORITY_MESSAGE
+
+
+def test_429_retry_after_delays_only_that_chat(monkeypatch):
+    sent = []
+
+    async def fake_request(method, payload=None, timeout=None):
+        chat_id = payload["chat_id"]
+        sent.append((chat_id, time.monotonic()))
+        if chat_id == 1 and len([c for c, _ in sent if c == 1]) == 1:
+            return {"ok": False, "error_code": 429, "parameters": {"retry_after": 0.3}}
+        return {"ok": True, "result": True}
+
+    monkeypatch.setattr(telegram, "request", fake_request)
+
+    async def run():
+        dispatcher = OutboundDispatcher(senders=2, max_retries=3)
+        await dispatcher.start()
+        started = time.monotonic()
+        throttled = dispatcher.submit("sendMessage", {"chat_id": 1}, PRIORITY_MESSAGE, 1)
+        others = [dispatcher.submit("sendMessage", {"chat_id": c}, PRIORITY_MESSAGE, c) for c in (2, 3)]
+
+        other_results = await asyncio.gather(*others)
+        others_done = time.monotonic() - started
+        result = await throttled
+        await dispatcher.stop()
+        return started, others_done, other_results, result, dispatcher.get_stats()
+
+    started, others_done, other_results, result, stats = asyncio.run(run())
+
+    chat1 = [t - started for c, t in sent if c == 1]
+    assert len(chat1) == 2
+    assert chat1[1] - chat1[0] >= 0.3
+    assert result["ok"]
+    # Остальные чаты не ждали retry_after первого
+    assert others_done < 0.3
+    assert all(r["ok"] for r in other_results)
+    assert stats["throttled"] == 1 and stats["retried"] == 1 and stats["sent"] == 3
+
+
+def test_stop_fails_queued_delayed_and_in_flight_calls(monkeypatch):
+    async def hanging_request(method, payload=None, timeout=None):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(telegram, "request", hanging_request)
+
+    async def run():
+        dispatcher = OutboundDispatcher(senders=2, chat_burst=1)
+        await dispatcher.start()
+        # Чат 1: первый висит в request(), второй отложен лимитом чата;
+        # чат 2 занимает второго отправителя, чат 3 остаётся в очереди
+        futures = [
+            dispatcher.submit("sendMessage", {"chat_id": chat_id}, PRIORITY_MESSAGE, chat_id)
+            for chat_id in (1, 1, 2, 3)
+        ]
+        await asyncio.sleep(0.05)
+        assert dispatcher.get_stats()["delayed"] == 1 and dispatcher.get_stats()["in_queue"] == 1
+        await asyncio.wait_for(dispatcher.stop(), 1)
+        late = dispatcher.submit("sendMessage", {"chat_id": 3}, PRIORITY_MESSAGE, 3)
+        return futures + [late], dispatcher.get_stats()
+
+    futures, stats = asyncio.run(run())
+
+    for future in futures:
+        assert future.done()
+        with pytest.raises(DispatcherStopped):
+            future.result()
+    assert stats["aborted"] == 4 and stats["queued"] == 0
@@ -0,0 +1,119 @@
+"""
+Состояние диалога в памяти (db/user_state.py): что и когда оказывается в базе
+"""
+
+import asyncio
+import sqlite3
+
+from db import aio
+from db.user_state import UserStateStore, WRITE_BACK, WRITE_THROUGH
+
+
+def stored(db_path) -> dict:
+    """user_state глазами другого процесса — отдельное соединение, только закоммиченное"""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return {user_id: state for user_id, state in conn.execute("SELECT user_id, state FROM user_state")}
+    finally:
+        conn.close()
+
+
+def run_with_store(scenario, **store_options):
+    async def run():
+        aio.start()
+        store = UserStateStore(aio.run_read, aio.run_write, **store_options)
+        store.start()
+        try:
+            return await scenario(store)
+        finally:
+            await aio.stop()
+    return asyncio.run(run())
+
+
+def test_write_back_set_then_stop_persists(temp_db):
+    async def scenario(store):
+        await store.set(1, state="search_by_area")
+        await store.set(2, state="search_by_budget")
+        before_stop = stored(temp_db)
+        await store.stop()
+        return before_stop
+
+    before_stop = run_with_store(scenario, flush_interval=3600, durability=WRITE_BACK)
+
+    assert before_stop == {}
+    assert stored(temp_db) == {1: "search_by_area", 2: "search_by_budget"}
+
+
+def test_crash_keeps_last_flushed_rows(temp_db):
+    async def scenario(store):
+        await store.set(1, state="v1")
+        await store.flush()
+        # Не сброшено до «падения» (stop не вызывается)
+        await store.set(1, state="v2")
+        await store.set(2, state="v1")
+        return store.get_stats()["dirty"]
+
+    dirty = run_with_store(scenario, flush_interval=3600, durability=WRITE_BACK)
+
+    assert dirty == 2
+    assert stored(temp_db) == {1: "v1"}
+
+
+def test_dirty_rows_survive_lru_pressure(temp_db):
+    async def scenario(store):
+        for user_id in range(10):
+            await store.set(user_id, state=f"s{user_id}")
+        # Вытеснять некого: все строки грязные, кэш временно больше capacity
+        in_memory = len(store._states)
+        dirty = store.get_stats()["dirty"]
+        await asyncio.sleep(0.1)
+        states = [(await store.get(user_id))["state"] for user_id in range(10)]
+        await store.stop()
+        return in_memory, dirty, states, store.get_stats()
+
+    in_memory, dirty, states, stats = run_with_store(
+        scenario, capacity=3, flush_interval=3600, durability=WRITE_BACK
+    )
+
+    assert in_memory == dirty == 10
+    assert states == [f"s{user_id}" for user_id in range(10)]
+    # Переполнение запустило сброс без таймера, после него лишнее вытеснено
+    assert stats["flushes"] >= 1 and stats["evictions"] > 0
+    assert stored(temp_db) == {user_id: f"s{user_id}" for user_id in range(10)}
+
+
+def test_write_through_is_visible_when_set_returns(temp_db):
+    async def scenario(store):
+        seen = []
+        for state in ("a", "b"):
+            await store.set(1, state=state)
+            seen.append(stored(temp_db).get(1))
+        return seen, store.get_stats()["dirty"]
+
+    seen, dirty = run_with_store(scenario, flush_interval=3600, durability=WRITE_THROUGH)
+
+    assert seen == ["a", "b"]
+    assert dirty == 0
+
+
+def test_write_through_failed_write_keeps_stored_state(temp_db):
+    async def failing_writer(fn, *args):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    async def run():
+        aio.start()
+        store = UserStateStore(aio.run_read, aio.run_write, flush_interval=3600, durability=WRITE_THROUGH)
+        try:
+            await store.set(1, state="a")
+            store.writer = failing_writer
+            try:
+                await store.set(1, state="b")
+            except sqlite3.OperationalError:
+                pass
+            return (await store.get(1))["state"]
+        finally:
+            await aio.stop()
+
+    # Кэш не отдаёт состояние, которого нет в базе
+    assert asyncio.run(run()) == "a"
+    assert stored(temp_db) == {1: "a"}
@@ -0,0 +1,56 @@
+"""
+Каталог ЖК YGroup (services/ygroup.py): одна загрузка на одновременные refresh_catalog()
+"""
+
+import asyncio
+import json
+import os
+
+from services import ygroup
+
+TOTAL = 250
+
+
+def fake_posts(page: int) -> list:
+    size = ygroup.YGROUP_CATALOG_PAGE_SIZE
+    return [{"id": f"f{i}", "name": f"ЖК {i}"} for i in range((page - 1) * size, min(page * size, TOTAL))]
+
+
+def test_overlapping_refreshes_share_one_fetch(tmp_path, monkeypatch):
+    catalog_file = tmp_path / "facilities.json"
+    monkeypatch.setattr(ygroup, "YGROUP_CATALOG_FILE", str(catalog_file))
+    monkeypatch.setattr(ygroup, "_catalog", None)
+    monkeypatch.setattr(ygroup, "_refresh_task", None)
+
+    requested = []
+
+    async def fake_get(url, params=None, timeout=None):
+        requested.append(params["page"])
+        await asyncio.sleep(0.02)
+        return {"data": {"facility_posts": fake_posts(params["page"]), "meta": {"total": TOTAL}}}
+
+    monkeypatch.setattr(ygroup, "_get", fake_get)
+
+    # Файл подменяется целиком: в момент замены временный файл уже полный
+    replaced = []
+    real_replace = os.replace
+
+    def checked_replace(src, dst):
+        with open(src, encoding="utf-8") as f:
+            replaced.append(len(json.load(f)["facilities"]))
+        real_replace(src, dst)
+
+    monkeypatch.setattr(ygroup.os, "replace", checked_replace)
+
+    async def run():
+        return await asyncio.gather(*[ygroup.refresh_catalog() for _ in range(10)])
+
+    catalogs = asyncio.run(run())
+
+    assert sorted(requested) == [1, 2, 3]
+    assert all(c is catalogs[0] for c in catalogs)
+    assert len(catalogs[0]) == TOTAL
+    assert replaced == [TOTAL]
+    with open(catalog_file, encoding="utf-8") as f:
+        assert len(json.load(f)["facilities"]) == TOTAL
+    assert not os.path.exists(f"{catalog_file}.tmp")
@@ -0,0 +1,117 @@
+"""
+HTTP-клиент YGroup (services/ygroup.py::_get) против локального фейкового сервера
+"""
+
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+
+from services import ygroup
+from services.ygroup import YGroupError
+
+
+class FakeYGroup:
+    """
+    Ответы по пути: script — список (status, headers) по очереди, дальше 200;
+    always — (status, headers) на каждый запрос
+    """
+
+    def __init__(self, script: dict = None, always: dict = None, delay: float = 0):
+        self.script = {path: list(responses) for path, responses in (script or {}).items()}
+        self.always = always or {}
+        self.delay = delay
+        self.hits = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        path = request.path
+        self.hits.setdefault(path, []).append(time.monotonic())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if path in self.always:
+            status, headers = self.always[path]
+            return web.Response(status=status, headers=headers)
+        if self.script.get(path):
+            status, headers = self.script[path].pop(0)
+            return web.Response(status=status, headers=headers)
+        return web.json_response({"data": {"path": path}})
+
+
+def run_against(fake: FakeYGroup, requests):
+    """Поднять сервер, выполнить requests(base_url) в том же event loop"""
+    async def run():
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", fake.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            return await requests(f"http://127.0.0.1:{port}")
+        finally:
+            await ygroup.close()
+            await runner.cleanup()
+    return asyncio.run(run())
+
+
+@pytest.fixture(autouse=True)
+def client(monkeypatch):
+    monkeypatch.setattr(ygroup, "_session", None)
+    monkeypatch.setattr(ygroup, "_token_semaphores", {})
+    monkeypatch.setattr(ygroup, "YGROUP_MAX_RETRIES", 2)
+    monkeypatch.setattr(ygroup, "YGROUP_RETRY_BACKOFF", 0.01)
+
+
+def test_retries_5xx_then_succeeds():
+    fake = FakeYGroup({"/flaky": [(500, {}), (502, {})]})
+    result = run_against(fake, lambda base: ygroup._get(f"{base}/flaky"))
+    assert result == {"data": {"path": "/flaky"}}
+    assert len(fake.hits["/flaky"]) == 3
+
+
+def test_gives_up_after_max_retries():
+    fake = FakeYGroup(always={"/down": (503, {})})
+    with pytest.raises(YGroupError, match="HTTP 503"):
+        run_against(fake, lambda base: ygroup._get(f"{base}/down"))
+    assert len(fake.hits["/down"]) == 3
+
+
+def test_client_error_is_not_retried():
+    fake = FakeYGroup(always={"/missing": (404, {})})
+    with pytest.raises(YGroupError):
+        run_against(fake, lambda base: ygroup._get(f"{base}/missing"))
+    assert len(fake.hits["/missing"]) == 1
+
+
+def test_429_waits_for_retry_after():
+    fake = FakeYGroup({"/limited": [(429, {"Retry-After": "0.3"}), (429, {"Retry-After": "0.1"})]})
+    run_against(fake, lambda base: ygroup._get(f"{base}/limited"))
+    first, second, third = fake.hits["/limited"]
+    assert second - first >= 0.3
+    assert 0.1 <= third - second < 0.3
+
+
+def test_token_concurrency_limit(monkeypatch):
+    monkeypatch.setattr(ygroup, "YGROUP_TOKEN_CONCURRENCY", 3)
+    fake = FakeYGroup(delay=0.05)
+
+    async def many(base):
+        return await asyncio.gather(*[ygroup._get(f"{base}/lots/{i}") for i in range(12)])
+
+    results = run_against(fake, many)
+    assert len(results) == 12
+    assert fake.max_in_flight == 3
+
+
+def test_retry_after_http_date():
+    assert ygroup._retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert ygroup._retry_after("2") == 2
+    assert ygroup._retry_after("soon") is None